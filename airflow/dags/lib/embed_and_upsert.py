@@ -1,37 +1,108 @@
 import time
 from typing import List
 from lib.chunking import chunk_documents
-from langchain_community.vectorstores import Milvus
+from pymilvus import (
+    Collection,
+    CollectionSchema,
+    DataType,
+    FieldSchema,
+    connections,
+    utility,
+)
 
 from lib.mongo_utils import get_mongo_collections, get_unembedded_recipes, mark_embedded
+from lib.recipe_to_doc import MAX_INGREDIENTS, MAX_INGREDIENT_LENGTH
+from lib.sparse_encoder import SPARSE_FIELD, encode_document
 
 MILVUS_HOST = "milvus-standalone"
 MILVUS_PORT = "19530"
 COLLECTION_NAME = "recipe_docs"
 MODEL_NAME = "bge-m3"
+EMBEDDING_DIM = 1024
 
+METADATA_FIELDS = ["recipe_id", "title", "level", "cook_time", "source"]
+INGREDIENTS_FIELD = "ingredients"
 
-def embedding_and_upsert(documents, embeddings, recipes_col, sleep_per_doc=1.0):
 
-    vectorstore = Milvus(
-        embedding_function=embeddings,
-        collection_name=COLLECTION_NAME,
-        connection_args={
-            "host": MILVUS_HOST,
-            "port": MILVUS_PORT,
-        },
-        drop_old=False,
-        auto_id=True,
+def create_collection(dim: int = EMBEDDING_DIM) -> Collection:
+    """
+    dense(vector) + sparse(title_sparse) + ingredients(ARRAY) 필드를 가진 컬렉션 생성
+    - 필드명은 기존 LangChain Milvus 컬렉션과 동일 (pk/text/vector/메타데이터)
+    """
+    fields = [
+        FieldSchema("pk", DataType.INT64, is_primary=True, auto_id=True),
+        FieldSchema("text", DataType.VARCHAR, max_length=65535),
+        FieldSchema("vector", DataType.FLOAT_VECTOR, dim=dim),
+        FieldSchema(SPARSE_FIELD, DataType.SPARSE_FLOAT_VECTOR),
+    ] + [
+        FieldSchema(name, DataType.VARCHAR, max_length=65535)
+        for name in METADATA_FIELDS
+    ] + [
+        # 알레르기/비선호 제외 필터 (array_contains_any)
+        FieldSchema(
+            INGREDIENTS_FIELD,
+            DataType.ARRAY,
+            element_type=DataType.VARCHAR,
+            max_capacity=MAX_INGREDIENTS,
+            max_length=MAX_INGREDIENT_LENGTH,
+        ),
+    ]
+    schema = CollectionSchema(fields, enable_dynamic_field=True)
+    col = Collection(COLLECTION_NAME, schema)
+
+    col.create_index(
+        "vector",
+        {"index_type": "HNSW", "metric_type": "L2", "params": {"M": 16, "efConstruction": 200}},
     )
+    col.create_index(
+        SPARSE_FIELD,
+        {"index_type": "SPARSE_INVERTED_INDEX", "metric_type": "IP"},
+    )
+    # 백엔드 제목 인덱스가 recipe_id in [...] 로 조회
+    col.create_index("recipe_id", {"index_type": "INVERTED"})
+    col.create_index(INGREDIENTS_FIELD, {"index_type": "INVERTED"})
+    return col
+
+
+def get_collection() -> Collection:
+    connections.connect(host=MILVUS_HOST, port=MILVUS_PORT)
+
+    if utility.has_collection(COLLECTION_NAME):
+        col = Collection(COLLECTION_NAME)
+    else:
+        col = create_collection()
+
+    col.load()
+    return col
+
+
+def embedding_and_upsert(documents, embeddings, recipes_col, sleep_per_doc=1.0):
+
+    col = get_collection()
+    field_names = {f.name for f in col.schema.fields}
+
+    # sparse 필드가 없는 기존 컬렉션이면 dense만 적재 (hybrid 검색은 컬렉션 재생성 후 사용)
+    has_sparse = SPARSE_FIELD in field_names
+    if not has_sparse:
+        print(f"[WARNING] {COLLECTION_NAME}에 {SPARSE_FIELD} 필드 없음 → dense만 적재")
 
     for doc in documents:
-        vectorstore.add_texts(
-            texts=[doc.page_content],
-            metadatas=[doc.metadata],
-        )
+        row = {
+            "text": doc.page_content,
+            "vector": embeddings.embed_documents([doc.page_content])[0],
+        }
+        for key, value in doc.metadata.items():
+            if key in field_names or col.schema.enable_dynamic_field:
+                row[key] = value
+        if has_sparse:
+            row[SPARSE_FIELD] = encode_document(doc.metadata.get("title", ""))
+
+        col.insert([row])
 
         recipe_id = doc.metadata.get("recipe_id")
         if recipe_id:
             mark_embedded(recipes_col, recipe_id, MODEL_NAME)
 
         time.sleep(sleep_per_doc)
+
+    col.flush()
@@ -1,3 +1,7 @@
+import os
+
+import requests
+
 from lib.embed_and_upsert import embedding_and_upsert
 from langchain_community.embeddings import ClovaXEmbeddings
 from lib.chunking import chunk_documents
@@ -5,6 +9,8 @@ from lib.mongo_utils import get_mongo_collections, get_unembedded_recipes
 from lib.recipe_to_doc import recipe_to_document
 
 MODEL_NAME = "bge-m3"
+BACKEND_URL = os.getenv("BACKEND_URL", "http://backend:8000")
+INTERNAL_API_TOKEN = os.getenv("INTERNAL_API_TOKEN", "")
 
 
 def run_embedding_pipeline():
@@ -20,3 +26,18 @@ def run_embedding_pipeline():
     )
 
     embedding_and_upsert(docs, embeddings, recipes)
+
+
+def notify_backend_refresh():
+    """
+    임베딩 완료 후 백엔드 인메모리 제목 인덱스 재빌드 요청
+    """
+    url = f"{BACKEND_URL}/api/recipe/title-index/refresh"
+    try:
+        headers = {"X-Internal-Token": INTERNAL_API_TOKEN} if INTERNAL_API_TOKEN else {}
+        res = requests.post(url, headers=headers, timeout=30)
+        res.raise_for_status()
+        print(f"[OK] 백엔드 제목 인덱스 갱신: {res.json()}")
+    except Exception as e:
+        # 백엔드가 내려가 있어도 임베딩 결과는 유효하므로 DAG는 실패시키지 않음
+        print(f"[WARNING] 백엔드 제목 인덱스 갱신 실패 ({url}): {e}")
@@ -6,6 +6,8 @@ from datetime import datetime
 from pymongo import MongoClient, ASCENDING
 from pymongo.errors import DuplicateKeyError
 
+from lib.sparse_encoder import normalize_title
+
 
 BASE_URL = "https://www.10000recipe.com"
 LIST_URL = "https://www.10000recipe.com/recipe/list.html"
@@ -39,6 +41,8 @@ def get_mongo():
     meta = db[META_COL]
 
     recipes.create_index([("recipe_id", ASCENDING)], unique=True)
+    # 백엔드 이미지 조회 (제목 정확 매칭 $in)
+    recipes.create_index([("title_norm", ASCENDING)])
 
     return recipes, meta
 
@@ -192,6 +196,7 @@ def crawl_recipe_detail(recipe_id: str):
         "detail_url": url,
         "author": author.get_text(strip=True) if author else None,
         "title": title.get_text(strip=True) if title else None,
+        "title_norm": normalize_title(title.get_text(strip=True)) if title else None,
         "intro": intro.get_text(" ", strip=True) if intro else None,
         "image": img["src"] if img else None,
         "portion": portion.get_text(strip=True) if portion else None,
@@ -1,5 +1,26 @@
 from langchain_core.documents import Document
 
+from lib.sparse_encoder import normalize_title
+
+MAX_INGREDIENTS = 100
+MAX_INGREDIENT_LENGTH = 100
+
+
+def ingredient_terms(ingredients: list) -> list:
+    """
+    재료명 → Milvus ingredients ARRAY 필드 값
+    전체 이름 + 띄어쓰기 단위 단어 (예: "돼지고기 앞다리살" → 돼지고기앞다리살, 돼지고기, 앞다리살)
+    백엔드 exclude_ingredients 필터와 같은 정규화(normalize_title)를 사용
+    """
+    terms = []
+    for ing in ingredients:
+        name = ing.get("name", "") if isinstance(ing, dict) else str(ing)
+        for term in [name] + name.split():
+            norm = normalize_title(term)[:MAX_INGREDIENT_LENGTH]
+            if norm and norm not in terms:
+                terms.append(norm)
+    return terms[:MAX_INGREDIENTS]
+
 
 def recipe_to_document(recipe: dict) -> Document:
     ingredients_text = ", ".join(
@@ -29,6 +50,7 @@ def recipe_to_document(recipe: dict) -> Document:
         "level": recipe.get("level") or "",
         "cook_time": recipe.get("cook_time") or "unknown",
         "source": recipe.get("detail_url") or "",
+        "ingredients": ingredient_terms(recipe.get("ingredients", [])),
     }
 
     return Document(
@@ -2,7 +2,7 @@ from airflow import DAG
 from datetime import datetime, timedelta
 from airflow.operators.python import PythonOperator
 
-from lib.embedding_pipeline import run_embedding_pipeline
+from lib.embedding_pipeline import run_embedding_pipeline, notify_backend_refresh
 
 default_args = {
     "owner": "airflow",
@@ -24,4 +24,9 @@ with DAG(
         op_kwargs={"limit": 150},
     )
 
-    embed_recipes
+    refresh_backend_index = PythonOperator(
+        task_id="refresh_backend_index",
+        python_callable=notify_backend_refresh,
+    )
+
+    embed_recipes >> refresh_backend_index
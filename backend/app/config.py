@@ -37,6 +37,9 @@ class Settings(BaseSettings):
     # RunPod API (LLM/TTS 서버)
     RECIPEU_API_KEY: str = ""
 
+    # 내부 전용 엔드포인트(/api/recipe/title-index/refresh) 인증 토큰 (X-Internal-Token, 비어있으면 로컬 요청만 허용)
+    INTERNAL_API_TOKEN: str = ""
+
     # NAVER
     NAVER_CLIENT_ID: Optional[str] = None
     NAVER_CLIENT_SECRET: Optional[str] = None
@@ -50,6 +53,105 @@ class Settings(BaseSettings):
     COLLECTION_NAME: str = "recipe_docs"
 
     USE_RERANKER: bool = False
+    RERANKER_CONNECT_TIMEOUT: float = 2.0
+    RERANKER_READ_TIMEOUT: float = 5.0
+    RERANKER_MAX_CONNECTIONS: int = 10
+    RERANKER_BREAKER_FAILURES: int = 5
+    RERANKER_BREAKER_RESET: float = 30.0
+    RERANK_CACHE_SIZE: int = 1024
+    RERANK_CACHE_TTL: int = 3600
+
+    # Query Embedding 캐시
+    EMBEDDING_CACHE_SIZE: int = 2048
+    EMBEDDING_CACHE_TTL: int = 86400
+    EMBEDDING_CACHE_PATH: str = ""  # 비어있으면 디스크 계층 비활성화
+
+    # 레시피 이미지 URL 캐시 (recipe_id / 정규화 제목 → image)
+    IMAGE_CACHE_SIZE: int = 4096
+    IMAGE_CACHE_TTL: int = 21600
+    IMAGE_CACHE_NEGATIVE_TTL: int = 300  # 이미지 없음 결과는 짧게
+
+    # title 검색 + 벡터 검색 동시 실행
+    CONCURRENT_RETRIEVAL: bool = True
+    RETRIEVAL_WORKERS: int = 8
+
+    # 검색 모드: "auto" (title_sparse 필드가 있으면 hybrid, 없으면 title_vector)
+    #          | "title_vector" (title like + 벡터) | "hybrid" (title sparse + 벡터, RRF)
+    RETRIEVAL_MODE: str = "auto"
+    HYBRID_RRF_K: int = 60
+
+    # 청크를 recipe_id별로 묶어 서로 다른 레시피 k개 반환
+    GROUP_BY_RECIPE: bool = True
+    GROUP_SIZE: int = 3
+
+    # rewrite와 동시에 원본 질문으로 검색 (재작성 결과가 거의 같으면 재사용)
+    SPECULATIVE_RETRIEVAL: bool = True
+    SPECULATIVE_SIMILARITY: float = 0.85
+
+    # 채팅 의도 분류: 확실한 경우(요리명/수정 키워드/요리 무관) 룰로 판정, 나머지만 LLM
+    INTENT_FAST_PATH: bool = True
+
+    # Chat Agent 답변 시맨틱 캐시 (재작성 질문 임베딩 유사도 + 같은 제약조건이면 답변 재사용)
+    SEMANTIC_CACHE_ENABLED: bool = True
+    SEMANTIC_CACHE_SIZE: int = 256
+    SEMANTIC_CACHE_TTL: int = 21600
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_EPOCH_CHECK: float = 5.0  # 여러 워커(Redis)일 때 무효화 전파 확인 주기(초)
+
+    # Chat Agent 실행 제한 시간(초, 초과 시 그래프 중단)
+    AGENT_RUN_TIMEOUT: float = 20.0
+
+    # LLM 요청 진입 제어 (chat / recipe / voice 공유): 업스트림 모델별 동시 실행 예산 + 사용자별 공정 대기열
+    ADMISSION_BUDGETS: Dict[str, int] = {
+        "HCX-003": 8,       # 채팅 Agent, 기존 레시피 상세화
+        "HCX-DASH-003": 4,  # 레시피 생성
+        "voice-llm": 6,     # 음성 의도 분류 서버
+    }
+    ADMISSION_DEFAULT_BUDGET: int = 4
+    ADMISSION_MAX_QUEUE: int = 32  # 모델별 최대 대기 수 (초과 시 즉시 거절)
+    ADMISSION_MAX_PER_MEMBER: int = 2  # 사용자별 최대 대기 수
+    ADMISSION_MAX_WAIT: float = 15.0
+
+    # 채팅 세션 저장소: "memory" (단일 워커) | "redis" (여러 워커 공유)
+    SESSION_BACKEND: str = "memory"
+    SESSION_TTL: int = 86400
+    SESSION_MAX: int = 5000
+    REDIS_URL: str = "redis://localhost:6379/0"
+
+    # 대화 히스토리 압축: 최근 메시지는 그대로, 이전 레시피 답변은 요약, 호출 지점별 토큰 예산(추정)
+    HISTORY_KEEP_RECENT: int = 4
+    HISTORY_BUDGET_REWRITE: int = 300
+    HISTORY_BUDGET_GENERATE: int = 800
+    HISTORY_BUDGET_QUERY: int = 400
+    HISTORY_BUDGET_RECIPE: int = 1500
+
+    # 문서 관련성 평가: "hybrid" (로컬 점수, 애매한 구간만 LLM) | "local" | "llm"
+    GRADER_MODE: str = "hybrid"
+    GRADER_COSINE_ACCEPT: float = 0.75
+    GRADER_COSINE_REJECT: float = 0.55
+    GRADER_RERANK_ACCEPT: float = 0.6
+    GRADER_RERANK_REJECT: float = 0.2
+    GRADER_LOG_PATH: str = ""  # 평가 로그 JSONL (calibrate_grader.py 입력)
+
+    # LLM 응답 정확 일치 캐시 (get_llm(cache=True) 호출 지점만, 경로가 비어있으면 메모리만)
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_PATH: str = "cache/llm_response.db"
+    LLM_CACHE_SIZE: int = 2048
+    LLM_CACHE_MAX_ENTRIES: int = 50000
+    LLM_CACHE_TTL: int = 86400
+    LLM_CACHE_BYPASS_HEADER: str = "X-LLM-Cache-Bypass"
+
+    # LLM(ChatClovaX) 공용 HTTP 커넥션 풀
+    LLM_MAX_CONNECTIONS: int = 20
+    LLM_MAX_KEEPALIVE: int = 10
+    LLM_CONNECT_TIMEOUT: float = 3.0
+    LLM_READ_TIMEOUT: float = 60.0
+
+    # MySQL write-behind 큐 (session/chatbot/generate/voice INSERT 배치)
+    PERSIST_BATCH_SIZE: int = 50
+    PERSIST_FLUSH_INTERVAL: float = 0.2
+    PERSIST_MAX_RETRIES: int = 3
+    PERSIST_RETRY_BACKOFF: float = 0.5
 
     # MySQL (Naver Cloud)
     MYSQL_HOST: str = ""
@@ -57,6 +159,13 @@ class Settings(BaseSettings):
     MYSQL_USER: str = ""
     MYSQL_PASSWORD: str = ""
     MYSQL_DATABASE: str = ""
+
+    # MySQL 커넥션 풀 (대여 시 ping_interval초 이상 쉰 커넥션만 ping, 0이면 매번)
+    MYSQL_POOL_MIN: int = 2
+    MYSQL_POOL_MAX: int = 10
+    MYSQL_POOL_MAX_LIFETIME: float = 3600
+    MYSQL_POOL_PING_INTERVAL: float = 30
+    MYSQL_POOL_TIMEOUT: float = 10
     
     class Config:
         env_file = ".env"
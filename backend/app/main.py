@@ -1,11 +1,26 @@
 # backend/app/main.py
+import asyncio
 import traceback
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from core.dependencies import get_rag_system
+from core.admission import admission
+from core.metrics import render_gauges, render_prometheus
+from core.session_store import session_store
+from features.chat.scheduler import agent_scheduler
+from features.chat.agent import warmup_chat_agent
+from services.image_resolver import ensure_title_norm, image_resolver
+from services.llm import aclose_llm_clients, get_llm_metrics
+from services.llm_cache import get_llm_cache_stats, is_bypass_value, set_llm_cache_bypass
+from services.persistence import persistence
+from services.rag import get_embedding_cache_stats, get_rerank_cache_stats
+from services.semantic_cache import semantic_cache
+from services.title_index import title_index
+from utils.intent import get_intent_stats
 from features.chat.router import router as chat_router
 from features.chat_external.router import router as chat_external_router
 from features.recipe.router import router as recipe_router
@@ -16,17 +31,7 @@ from features.mypage.router import router as mypage_router, init_utensils
 from features.weather.router import router as weather_router
 from features.ranking.router import router as ranking_router, load_today_ranking_cache
 from features.voice.router import router as voice_router
-from models.mysql_db import get_mysql_connection, init_all_tables
-
-
-def check_mysql_connection() -> bool:
-    """MySQL 연결 확인"""
-    try:
-        conn = get_mysql_connection()
-        conn.close()
-        return True
-    except Exception:
-        return False
+from models.mysql_db import check_mysql_connection, get_mysql_pool, init_all_tables
 
 
 @asynccontextmanager
@@ -38,9 +43,29 @@ async def lifespan(app: FastAPI):
     rag_system = get_rag_system()
     if rag_system:
         print("RAG 시스템 초기화 완료")
+        try:
+            await asyncio.to_thread(title_index.build_from_mongo, rag_system.recipes_collection)
+        except Exception as e:
+            print(f"제목 인덱스 빌드 실패 (Milvus title 검색 사용): {e}")
+        try:
+            await asyncio.to_thread(ensure_title_norm, rag_system.recipes_collection)
+        except Exception as e:
+            print(f"title_norm 백필 실패 (이미지 제목 매칭 누락 가능): {e}")
+        try:
+            warmup_chat_agent(rag_system)
+        except Exception as e:
+            print(f"Chat Agent 워밍업 실패 (첫 연결 시 생성): {e}")
+
+    if settings.INTENT_FAST_PATH:
+        try:
+            from features.voice.text_analyzer import get_kiwi
+            await asyncio.to_thread(get_kiwi)
+        except Exception as e:
+            print(f"Kiwi 로딩 실패 (의도 fast path는 어절 단위로 동작): {e}")
 
     if check_mysql_connection():
-        print("MySQL DB 연결 확인 완료")
+        idle = get_mysql_pool().fill()
+        print(f"MySQL DB 연결 확인 완료 (커넥션 풀 {idle}개)")
         # 모든 테이블 자동 생성
         try:
             init_all_tables()
@@ -65,6 +90,13 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    # 대기 중인 DB 기록 먼저 마무리
+    await persistence.aclose()
+    if rag_system:
+        await rag_system.aclose()
+    await aclose_llm_clients()
+    get_mysql_pool().close_all()
+
     print("\n서버 종료")
 
 
@@ -83,6 +115,14 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+
+@app.middleware("http")
+async def llm_cache_bypass_middleware(request: Request, call_next):
+    """디버깅: 요청 헤더가 있으면 해당 요청의 LLM 응답 캐시 조회 생략"""
+    set_llm_cache_bypass(is_bypass_value(request.headers.get(settings.LLM_CACHE_BYPASS_HEADER)))
+    return await call_next(request)
+
+
 app.include_router(auth_router, prefix="/api/auth", tags=["Auth"])
 app.include_router(user_router, prefix="/api/user", tags=["User"])
 app.include_router(chat_router, prefix="/api/chat", tags=["Chat"])
@@ -104,5 +144,43 @@ async def health_check():
     return {
         "status": "healthy",
         "rag_available": get_rag_system() is not None,
-        "mysql_available": check_mysql_connection()
-    }
\ No newline at end of file
+        "mysql_available": await asyncio.to_thread(check_mysql_connection),
+        "mysql_pool": get_mysql_pool().stats(),
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 텍스트 포맷: 노드/요청 지연시간 히스토그램, 모델별 LLM 지연·토큰, 캐시(LLM 응답 포함) hit율"""
+    llm = get_llm_metrics()["models"]
+    extra = render_gauges("recipe_llm", [
+        ({"model": model}, {k: v for k, v in stats.items() if k != "tokens"})
+        for model, stats in llm.items()
+    ])
+    extra += ["# TYPE recipe_llm_tokens_total counter"] + [
+        f'recipe_llm_tokens_total{{model="{model}",type="{kind}"}} {stats["tokens"].get(kind, 0)}'
+        for model, stats in llm.items()
+        for kind in ("prompt", "completion")
+    ]
+
+    caches = [
+        get_embedding_cache_stats(), get_rerank_cache_stats(), *image_resolver.stats(), semantic_cache.stats(),
+    ]
+    llm_cache = get_llm_cache_stats()
+    if llm_cache:
+        caches.append(llm_cache)
+    extra += render_gauges("recipe_cache", [({"cache": c["name"]}, c) for c in caches])
+
+    extra += render_gauges("recipe_intent", [({"classifier": row["name"]}, row) for row in get_intent_stats()])
+
+    extra += render_gauges("recipe_session_store", [({"backend": session_store.backend}, session_store.stats())])
+    extra += render_gauges("recipe_agent_runs", [({}, agent_scheduler.stats())])
+    extra += render_gauges("recipe_mysql_pool", [({}, get_mysql_pool().stats())])
+    extra += render_gauges("recipe_persistence", [({}, persistence.stats())])
+    extra += render_gauges("recipe_admission", [({"model": model}, stats) for model, stats in admission.stats().items()])
+
+    rag_system = get_rag_system()
+    if rag_system and rag_system.reranker:
+        extra += render_gauges("recipe_reranker", [({}, rag_system.reranker.metrics())])
+
+    return render_prometheus(extra)
@@ -0,0 +1,145 @@
+"""
+문서 관련성 평가 임계값 보정 스크립트 (오프라인)
+
+로그된 질문으로 검색을 다시 돌려 로컬 점수(cosine / rerank)와 HCX-003 평가(yes/no)를 비교하고
+임계값 조합별 일치율 / LLM 호출 비율을 출력한다.
+
+사용법:
+    python calibrate_grader.py --input grader_log.jsonl      # GRADER_LOG_PATH로 쌓인 로그
+    python calibrate_grader.py --input queries.txt --limit 100  # 한 줄에 질문 하나
+"""
+import argparse
+import json
+from collections import Counter
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from core.dependencies import get_rag_system
+from features.chat.agent import document_score, llm_grade, title_matches
+from langchain_core.documents import Document
+
+
+def load_questions(path: str, limit: int) -> List[str]:
+    """JSONL(question 필드) 또는 텍스트(한 줄 한 질문) → 중복 제거된 질문 목록"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                line = json.loads(line).get("question", "")
+            if line:
+                questions.append(line)
+    return list(dict.fromkeys(questions))[:limit]
+
+
+def collect(rag_system, questions: List[str]) -> List[Dict]:
+    """질문별 상위 문서 점수 + LLM 평가"""
+    rows = []
+    for i, question in enumerate(questions, 1):
+        results = rag_system.search_recipes(question, k=3, use_rerank=None)
+        documents = [
+            Document(
+                page_content=doc.get("content", ""),
+                metadata={
+                    "title": doc.get("title", ""),
+                    "vector_score": doc.get("vector_score"),
+                    "hybrid": doc.get("hybrid", False),
+                    "dense_distance": doc.get("dense_distance"),
+                    "rerank_score": doc.get("rerank_score"),
+                },
+            )
+            for doc in results
+        ]
+        if not documents:
+            continue
+
+        scores = {}
+        for doc in documents:
+            kind, score = document_score(doc)
+            if score is not None:
+                scores[kind] = max(scores.get(kind, score), score)
+
+        llm = llm_grade(question, documents) if title_matches(question, documents) else "no"
+        rows.append({"question": question, "scores": scores, "llm": llm})
+        print(f"[{i}/{len(questions)}] {question[:30]} → llm={llm} scores={scores}")
+    return rows
+
+
+def sweep(rows: List[Dict], kind: str, grid: List[float]) -> List[Dict]:
+    """(reject, accept) 조합별 일치율 (애매한 구간은 LLM 호출 → 항상 일치로 간주)"""
+    samples = [(row["scores"][kind], row["llm"]) for row in rows if kind in row["scores"]]
+    if not samples:
+        return []
+
+    report = []
+    for reject in grid:
+        for accept in grid:
+            if accept <= reject:
+                continue
+            counts = Counter()
+            for score, llm in samples:
+                if score >= accept:
+                    counts["agree" if llm == "yes" else "false_accept"] += 1
+                elif score <= reject:
+                    counts["agree" if llm == "no" else "false_reject"] += 1
+                else:
+                    counts["llm_call"] += 1
+            n = len(samples)
+            report.append({
+                "reject": reject,
+                "accept": accept,
+                "agreement": (counts["agree"] + counts["llm_call"]) / n,
+                "llm_call_rate": counts["llm_call"] / n,
+                "false_accept": counts["false_accept"],
+                "false_reject": counts["false_reject"],
+            })
+    report.sort(key=lambda r: (-r["agreement"], r["llm_call_rate"]))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문서 관련성 평가 임계값 보정")
+    parser.add_argument("--input", required=True, help="GRADER_LOG_PATH JSONL 또는 질문 텍스트 파일")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--top", type=int, default=10, help="출력할 임계값 조합 수")
+    parser.add_argument("--save", default="", help="수집 결과 JSON 저장 경로")
+    args = parser.parse_args()
+
+    rag_system = get_rag_system()
+    if not rag_system:
+        raise SystemExit("RAG 시스템 초기화 실패 (CLOVASTUDIO_API_KEY / Milvus 확인)")
+
+    questions = load_questions(args.input, args.limit)
+    print(f"질문 {len(questions)}개 평가 시작")
+    rows = collect(rag_system, questions)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(rows, f, ensure_ascii=False, indent=2)
+
+    llm_yes = sum(1 for row in rows if row["llm"] == "yes")
+    print(f"\nLLM 평가: yes {llm_yes} / no {len(rows) - llm_yes}")
+
+    grids = {
+        "cosine": [round(0.40 + 0.05 * i, 2) for i in range(11)],
+        "rerank": [round(0.05 * i, 2) for i in range(20)],
+    }
+    for kind, grid in grids.items():
+        report = sweep(rows, kind, grid)
+        if not report:
+            continue
+        print(f"\n- {kind} 임계값 (GRADER_{kind.upper()}_REJECT / _ACCEPT)\n")
+        print("| reject | accept | 일치율 | LLM 호출 비율 | 오수락 | 오거절 |")
+        print("|--------|--------|--------|---------------|--------|--------|")
+        for r in report[:args.top]:
+            print(f"| {r['reject']:.2f} | {r['accept']:.2f} | {r['agreement']:.1%} | "
+                  f"{r['llm_call_rate']:.1%} | {r['false_accept']} | {r['false_reject']} |")
+
+
+if __name__ == "__main__":
+    main()
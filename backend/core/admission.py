@@ -0,0 +1,261 @@
+# core/admission.py
+"""
+LLM 호출이 많은 요청(채팅 Agent / 레시피 생성 / 음성)의 진입 제어
+
+- 업스트림 모델별 동시 실행 예산 (ADMISSION_BUDGETS, 없으면 ADMISSION_DEFAULT_BUDGET)
+- 예산이 차면 대기열: 사용자(member_id, 게스트는 세션/IP) 단위 라운드로빈 → 한 사용자가 몰아 보내도 다른 사용자가 밀리지 않음
+- 대기 순번이 바뀔 때마다 on_position 콜백 (WebSocket progress / SSE queue 이벤트)
+- 대기열이 가득 찼거나 사용자별 대기 수 초과 / 최대 대기 시간 초과 → ServiceBusyError (503, 즉시 거절)
+"""
+import asyncio
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional
+
+from app.config import settings
+from core.exceptions import ServiceBusyError
+
+PositionCallback = Callable[[int], Awaitable[None]]
+
+# 게스트 member_id (비회원 0, 음성/마이페이지 게스트 2) → 대기열 키는 세션/IP로 구분
+_GUEST_MEMBER_IDS = (0, 2)
+
+BUSY_MESSAGE = "지금 요청이 많아 처리할 수 없어요. 잠시 후 다시 시도해주세요."
+
+
+def fair_key(member_id: Any, fallback: str = "") -> str:
+    """대기열 공정성 키 (회원: member_id, 게스트: 세션 ID / 클라이언트 IP)"""
+    mid = int(member_id) if str(member_id or "").isdigit() else 0
+    if mid not in _GUEST_MEMBER_IDS:
+        return f"member:{mid}"
+    return f"guest:{fallback or 'anonymous'}"
+
+
+class _Waiter:
+    __slots__ = ("key", "future", "on_position", "position", "enqueued_at")
+
+    def __init__(self, key: str, future: asyncio.Future, on_position: Optional[PositionCallback]):
+        self.key = key
+        self.future = future
+        self.on_position = on_position
+        self.position = 0
+        self.enqueued_at = time.time()
+
+
+class _ModelPool:
+    """모델 1개의 예산 + 사용자별 대기열 (OrderedDict 순서 = 라운드로빈 순서)"""
+
+    def __init__(self, name: str, capacity: int, max_queue: int, max_per_key: int):
+        self.name = name
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_per_key = max_per_key
+        self.in_use = 0
+        self.queues: "OrderedDict[str, Deque[_Waiter]]" = OrderedDict()
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+
+    @property
+    def waiting(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "waiting_keys": len(self.queues),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_ms_total / self.queued, 1) if self.queued else 0.0,
+        }
+
+
+class AdmissionController:
+    """모델별 동시 실행 예산 + 공정 대기열 (이벤트 루프 안에서만 사용)"""
+
+    def __init__(
+        self,
+        budgets: Optional[Dict[str, int]] = None,
+        default_budget: int = 4,
+        max_queue: int = 32,
+        max_per_key: int = 2,
+        max_wait: float = 15.0,
+    ):
+        self.budgets = dict(budgets or {})
+        self.default_budget = default_budget
+        self.max_queue = max_queue
+        self.max_per_key = max_per_key
+        self.max_wait = max_wait
+        self._pools: Dict[str, _ModelPool] = {}
+        self._notify_tasks: set = set()
+
+    def _pool(self, model: str) -> _ModelPool:
+        pool = self._pools.get(model)
+        if pool is None:
+            capacity = self.budgets.get(model, self.default_budget)
+            pool = _ModelPool(model, capacity, self.max_queue, self.max_per_key)
+            self._pools[model] = pool
+        return pool
+
+    async def acquire(
+        self,
+        model: str,
+        key: str,
+        on_position: Optional[PositionCallback] = None,
+        max_wait: Optional[float] = None,
+    ) -> None:
+        """슬롯 확보 (대기 필요 시 순번 알림) → 실패 시 ServiceBusyError"""
+        pool = self._pool(model)
+        if pool.in_use < pool.capacity and not pool.queues:
+            pool.in_use += 1
+            pool.admitted += 1
+            return
+
+        if pool.waiting >= pool.max_queue or len(pool.queues.get(key, ())) >= pool.max_per_key:
+            pool.rejected += 1
+            print(f"[Admission] {model} 거절: key={key}, 사용 {pool.in_use}/{pool.capacity}, 대기 {pool.waiting}")
+            raise ServiceBusyError(retry_after=self._retry_after(pool))
+
+        waiter = _Waiter(key, asyncio.get_running_loop().create_future(), on_position)
+        pool.queues.setdefault(key, deque()).append(waiter)
+        pool.queued += 1
+        self._notify(pool)
+
+        wait = self.max_wait if max_wait is None else max_wait
+        try:
+            await asyncio.wait_for(waiter.future, timeout=wait)
+        except BaseException as e:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # 슬롯을 받은 직후 취소/타임아웃 → 다음 대기자에게 넘김
+                self.release(model)
+            else:
+                self._remove(pool, waiter)
+            if isinstance(e, asyncio.TimeoutError):
+                pool.timeouts += 1
+                print(f"[Admission] {model} 대기 시간 초과: key={key} ({wait:.0f}초)")
+                raise ServiceBusyError(retry_after=self._retry_after(pool)) from None
+            raise
+
+    def release(self, model: str) -> None:
+        """슬롯 반환 → 라운드로빈 순서의 다음 사용자에게 바로 넘김"""
+        pool = self._pool(model)
+        while pool.queues:
+            key, queue = next(iter(pool.queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                pool.queues.move_to_end(key)
+            else:
+                del pool.queues[key]
+            if waiter.future.done():
+                continue
+            waiter.future.set_result(True)
+            pool.admitted += 1
+            pool.wait_ms_total += (time.time() - waiter.enqueued_at) * 1000
+            self._notify(pool)
+            return
+        pool.in_use = max(pool.in_use - 1, 0)
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        model: str,
+        key: str,
+        on_position: Optional[PositionCallback] = None,
+        max_wait: Optional[float] = None,
+    ):
+        await self.acquire(model, key, on_position=on_position, max_wait=max_wait)
+        try:
+            yield
+        finally:
+            self.release(model)
+
+    def _remove(self, pool: _ModelPool, waiter: _Waiter) -> None:
+        queue = pool.queues.get(waiter.key)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        if not queue:
+            del pool.queues[waiter.key]
+        self._notify(pool)
+
+    def _notify(self, pool: _ModelPool) -> None:
+        """라운드로빈 기준 예상 순번 계산 → 바뀐 대기자에게만 알림"""
+        queues: List[Deque[_Waiter]] = list(pool.queues.values())
+        for j, queue in enumerate(queues):
+            for i, waiter in enumerate(queue):
+                ahead = sum(min(len(q), i) for q in queues) + sum(1 for q in queues[:j] if len(q) > i)
+                position = ahead + 1
+                if position == waiter.position:
+                    continue
+                waiter.position = position
+                if waiter.on_position is not None:
+                    task = asyncio.ensure_future(self._send_position(waiter.on_position, position))
+                    self._notify_tasks.add(task)
+                    task.add_done_callback(self._notify_tasks.discard)
+
+    @staticmethod
+    async def _send_position(callback: PositionCallback, position: int) -> None:
+        try:
+            await callback(position)
+        except Exception as e:
+            print(f"[WARNING] 대기 순번 전송 실패: {e}")
+
+    def _retry_after(self, pool: _ModelPool) -> int:
+        avg_wait = pool.wait_ms_total / pool.queued / 1000 if pool.queued else 0
+        return max(1, min(int(avg_wait) + 1, int(self.max_wait)))
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {model: pool.stats() for model, pool in self._pools.items()}
+
+
+async def admit_stream(
+    model: str,
+    key: str,
+    events: Callable[[], AsyncIterator[Dict[str, Any]]],
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    SSE용: 대기 중 {"type": "queue", "position": N} 이벤트 → 슬롯 확보 후 events() 그대로 전달
+    거절 시 {"type": "error", "busy": True} 한 번 보내고 종료
+    """
+    positions: asyncio.Queue = asyncio.Queue()
+    acquire = asyncio.ensure_future(admission.acquire(model, key, on_position=positions.put))
+    try:
+        while not acquire.done():
+            getter = asyncio.ensure_future(positions.get())
+            done, _ = await asyncio.wait({acquire, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield {"type": "queue", "position": getter.result()}
+            else:
+                getter.cancel()
+        try:
+            acquire.result()
+        except ServiceBusyError:
+            yield {"type": "error", "message": BUSY_MESSAGE, "busy": True}
+            return
+        async for event in events():
+            yield event
+    finally:
+        if not acquire.done():
+            acquire.cancel()
+        elif not acquire.cancelled() and acquire.exception() is None:
+            admission.release(model)
+
+
+# 프로세스 단위 싱글톤 (chat / recipe / voice 공유)
+admission = AdmissionController(
+    budgets=settings.ADMISSION_BUDGETS,
+    default_budget=settings.ADMISSION_DEFAULT_BUDGET,
+    max_queue=settings.ADMISSION_MAX_QUEUE,
+    max_per_key=settings.ADMISSION_MAX_PER_MEMBER,
+    max_wait=settings.ADMISSION_MAX_WAIT,
+)
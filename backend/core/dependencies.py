@@ -2,9 +2,12 @@
 """
 FastAPI 의존성 관리
 """
+import hmac
 from functools import lru_cache
 from typing import Optional
 
+from fastapi import Header, HTTPException, Request
+
 from services.rag import RecipeRAGLangChain
 from app.config import settings
 
@@ -36,4 +39,23 @@ def get_rag_system() -> Optional[RecipeRAGLangChain]:
             print(f"RAG 초기화 실패: {e}")
             return None
 
-    return _rag_system
\ No newline at end of file
+    return _rag_system
+
+_LOOPBACK_HOSTS = ("127.0.0.1", "::1", "localhost")
+
+
+def require_internal_token(
+    request: Request,
+    x_internal_token: Optional[str] = Header(default=None),
+) -> None:
+    """
+    내부 전용 엔드포인트 보호 (Airflow DAG 등)
+    INTERNAL_API_TOKEN이 설정되어 있으면 X-Internal-Token 헤더 일치, 없으면 로컬(loopback) 요청만 허용
+    """
+    token = settings.INTERNAL_API_TOKEN
+    if token:
+        if x_internal_token and hmac.compare_digest(x_internal_token, token):
+            return
+    elif request.client and request.client.host in _LOOPBACK_HOSTS:
+        return
+    raise HTTPException(status_code=403, detail="Forbidden")
@@ -34,4 +34,20 @@ class SessionNotFoundError(HTTPException):
         super().__init__(
             status_code=404,
             detail=f"Session {session_id} not found"
-        )
\ No newline at end of file
+        )
+
+class SessionStoreUnavailableError(HTTPException):
+    def __init__(self):
+        super().__init__(
+            status_code=503,
+            detail="Session store not available"
+        )
+
+
+class ServiceBusyError(HTTPException):
+    def __init__(self, retry_after: int = 5):
+        super().__init__(
+            status_code=503,
+            detail="Service busy, try again later",
+            headers={"Retry-After": str(retry_after)}
+        )
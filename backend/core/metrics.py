@@ -0,0 +1,206 @@
+# core/metrics.py
+"""
+요청 단위 메트릭 (contextvar) + 프로세스 누적 히스토그램
+
+- start_request()로 현재 요청(WebSocket 메시지 1건)의 메트릭 컨텍스트 생성
+- timed_node는 노드 시간 기록 + 현재 노드 이름(node_scope) 설정
+- LLM 토큰은 services.llm.LLMMetricsHandler가 on_llm_end에서 현재 노드 기준으로 기록 (현재 컨텍스트 + 전역 카운터)
+- LangGraph sync 노드는 컨텍스트를 복사한 executor에서 실행되므로 같은 RequestMetrics 객체를 공유
+- render_prometheus()로 /metrics 텍스트 포맷 출력
+"""
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 지연시간 버킷 (ms)
+LATENCY_BUCKETS_MS: Tuple[float, ...] = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000, 60000)
+
+
+class Histogram:
+    """누적 버킷 히스토그램 (Prometheus histogram 호환)"""
+
+    def __init__(self, buckets: Iterable[float] = LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        with self._lock:
+            self._sum += value
+            self._count += 1
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self._counts[i] += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self._counts), self._sum, self._count
+
+
+class RequestMetrics:
+    """요청 1건의 노드별 시간/토큰"""
+
+    def __init__(self, kind: str = "chat"):
+        self.kind = kind
+        self.started_at = time.time()
+        self.node_timings: Dict[str, float] = {}
+        self.node_tokens: Dict[str, Dict[str, int]] = {}
+        self.tokens: Dict[str, int] = {"prompt": 0, "completion": 0, "total": 0}
+        self.history_tokens: Dict[str, int] = {"original": 0, "compacted": 0}  # 히스토리 압축 전/후 (추정)
+
+    def add_tokens(self, node: str, prompt: int, completion: int, total: int) -> None:
+        per_node = self.node_tokens.setdefault(node, {"prompt": 0, "completion": 0, "total": 0})
+        for bucket in (per_node, self.tokens):
+            bucket["prompt"] += prompt
+            bucket["completion"] += completion
+            bucket["total"] += total
+
+    def elapsed_ms(self) -> float:
+        return (time.time() - self.started_at) * 1000
+
+
+_current: ContextVar[Optional[RequestMetrics]] = ContextVar("request_metrics", default=None)
+_current_node: ContextVar[Optional[str]] = ContextVar("metrics_node", default=None)
+
+_lock = threading.Lock()
+_node_latency: Dict[str, Histogram] = {}
+_request_latency: Dict[str, Histogram] = {}
+_node_tokens: Dict[Tuple[str, str], int] = {}  # (node, prompt|completion) -> tokens
+_history_tokens: Dict[Tuple[str, str], int] = {}  # (call site, original|compacted) -> 추정 tokens
+
+
+def start_request(kind: str = "chat") -> RequestMetrics:
+    """현재 태스크에 새 요청 메트릭 컨텍스트 설정"""
+    metrics = RequestMetrics(kind)
+    _current.set(metrics)
+    return metrics
+
+
+def current_metrics() -> RequestMetrics:
+    """현재 요청 메트릭 (컨텍스트 밖이면 버려지는 임시 객체)"""
+    metrics = _current.get()
+    if metrics is None:
+        metrics = start_request("unscoped")
+    return metrics
+
+
+@contextmanager
+def node_scope(node: str):
+    """이 블록 안의 LLM 호출 토큰을 node로 기록"""
+    token = _current_node.set(node)
+    try:
+        yield
+    finally:
+        _current_node.reset(token)
+
+
+def current_node() -> str:
+    """현재 노드 이름 (그래프 밖 호출이면 "unscoped")"""
+    return _current_node.get() or "unscoped"
+
+
+def _histogram(registry: Dict[str, Histogram], name: str) -> Histogram:
+    hist = registry.get(name)
+    if hist is None:
+        with _lock:
+            hist = registry.setdefault(name, Histogram())
+    return hist
+
+
+def record_node_timing(node: str, elapsed_ms: float) -> None:
+    current_metrics().node_timings[node] = elapsed_ms
+    _histogram(_node_latency, node).observe(elapsed_ms)
+
+
+def record_tokens(node: str, prompt: int, completion: int, total: int) -> None:
+    current_metrics().add_tokens(node, prompt, completion, total)
+    with _lock:
+        _node_tokens[(node, "prompt")] = _node_tokens.get((node, "prompt"), 0) + prompt
+        _node_tokens[(node, "completion")] = _node_tokens.get((node, "completion"), 0) + completion
+
+
+def record_history_saving(site: str, original: int, compacted: int) -> None:
+    """히스토리 압축 전/후 토큰(추정) 기록"""
+    metrics = current_metrics()
+    metrics.history_tokens["original"] += original
+    metrics.history_tokens["compacted"] += compacted
+    with _lock:
+        for kind, value in (("original", original), ("compacted", compacted)):
+            _history_tokens[(site, kind)] = _history_tokens.get((site, kind), 0) + value
+
+
+def finish_request(metrics: Optional[RequestMetrics] = None) -> float:
+    """요청 종료 → 전체 소요시간 히스토그램 기록, 소요시간(ms) 반환"""
+    metrics = metrics or current_metrics()
+    elapsed = metrics.elapsed_ms()
+    _histogram(_request_latency, metrics.kind).observe(elapsed)
+    return elapsed
+
+
+# ─────────────────────────────────────────────
+# Prometheus 텍스트 포맷
+# ─────────────────────────────────────────────
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _render_histograms(name: str, label: str, registry: Dict[str, Histogram], help_text: str) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for key, hist in sorted(registry.items()):
+        counts, total, count = hist.snapshot()
+        for bound, bucket_count in zip(hist.buckets, counts):
+            lines.append(f"{name}_bucket{_labels({label: key, 'le': bound})} {bucket_count}")
+        lines.append(f"{name}_bucket{_labels({label: key, 'le': '+Inf'})} {count}")
+        lines.append(f"{name}_sum{_labels({label: key})} {total:.3f}")
+        lines.append(f"{name}_count{_labels({label: key})} {count}")
+    return lines
+
+
+def render_gauges(name: str, rows: Iterable[Tuple[Dict[str, Any], Dict[str, Any]]]) -> List[str]:
+    """
+    (labels, stats dict) 목록 → 숫자 필드마다 gauge 1줄
+    예: render_gauges("recipe_cache", [({"cache": "rerank"}, {"hits": 3, "size": 10})])
+    """
+    lines = [f"# TYPE {name} gauge"]
+    for labels, stats in rows:
+        for field, value in stats.items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            lines.append(f"{name}{_labels({**labels, 'field': field})} {value}")
+    return lines
+
+
+def render_prometheus(extra: Optional[List[str]] = None) -> str:
+    with _lock:
+        node_tokens = sorted(_node_tokens.items())
+        history_tokens = sorted(_history_tokens.items())
+
+    lines = _render_histograms(
+        "recipe_node_latency_ms", "node", _node_latency, "LangGraph 노드 실행 시간 (ms)"
+    )
+    lines += _render_histograms(
+        "recipe_request_latency_ms", "kind", _request_latency, "요청 전체 처리 시간 (ms)"
+    )
+    lines += ["# HELP recipe_node_tokens_total 노드별 LLM 토큰", "# TYPE recipe_node_tokens_total counter"]
+    lines += [
+        f"recipe_node_tokens_total{_labels({'node': node, 'type': kind})} {value}"
+        for (node, kind), value in node_tokens
+    ]
+    lines += ["# HELP recipe_history_tokens_total 히스토리 압축 전/후 프롬프트 토큰 (추정)",
+              "# TYPE recipe_history_tokens_total counter"]
+    lines += [
+        f"recipe_history_tokens_total{_labels({'site': site, 'type': kind})} {value}"
+        for (site, kind), value in history_tokens
+    ]
+    lines += extra or []
+    return "\n".join(lines) + "\n"
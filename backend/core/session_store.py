@@ -0,0 +1,282 @@
+# core/session_store.py
+"""
+채팅 세션 저장소 (WebSocket 채팅 ↔ /api/recipe/generate-from-chat 공유)
+
+- SESSION_BACKEND="memory": 프로세스 내 LRU + TTL (단일 워커)
+- SESSION_BACKEND="redis": Redis 프로토콜 서버에 직렬화 저장 (여러 uvicorn 워커 공유)
+  → redis-py 호환 클라이언트(get / set(ex=) / delete / expire)면 무엇이든 주입 가능 (테스트용 fakeredis 등)
+- 메시지는 [role, content(, extra)] 배열, 수정 이력은 빈 값 제거 후 JSON, 1KB 이상이면 zlib 압축
+- 저장소에 없는 세션은 db_session_id가 있으면 MySQL chatbot 테이블에서 메시지를 복원 (lazy rehydration, 읽기 전용)
+- 저장소 조회 오류는 SessionStoreUnavailableError (없는 세션과 구분 → 기존 세션을 빈 세션으로 덮어쓰지 않음)
+- load/save는 블로킹 호출 (Redis 왕복, 복원 시 MySQL 조회) → async 핸들러에서는 asyncio.to_thread로 호출
+"""
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from core.exceptions import SessionStoreUnavailableError
+
+_ROLE_CODES = {"user": "u", "assistant": "a", "system": "s"}
+_CODE_ROLES = {code: role for role, code in _ROLE_CODES.items()}
+_DB_ROLES = {"USER": "user", "AGENT": "assistant"}
+
+# zlib 압축 여부 표시 (첫 바이트)
+_RAW, _ZLIB = b"j", b"z"
+_COMPRESS_MIN_BYTES = 1024
+
+
+def new_session(member_id: int = 0, db_session_id: Optional[int] = None) -> Dict[str, Any]:
+    """빈 세션"""
+    return {
+        "messages": [],
+        "user_constraints": {},
+        "last_documents": [],
+        "last_agent_response": "",
+        "db_session_id": db_session_id,
+        "member_id": member_id,
+        "temp_allowed_dislikes": [],  # 세션 내 임시 허용된 비선호 음식
+        "modification_history": [],  # 레시피 수정 이력 (누적)
+    }
+
+
+# ─────────────────────────────────────────────
+# 직렬화
+# ─────────────────────────────────────────────
+def _pack_message(message: Dict[str, Any]) -> List[Any]:
+    role = message.get("role", "")
+    packed = [_ROLE_CODES.get(role, role), message.get("content", "")]
+    extra = {k: v for k, v in message.items() if k not in ("role", "content") and v not in (None, "", [], {})}
+    if extra:
+        packed.append(extra)
+    return packed
+
+
+def _unpack_message(packed: List[Any]) -> Dict[str, Any]:
+    message = {"role": _CODE_ROLES.get(packed[0], packed[0]), "content": packed[1]}
+    if len(packed) > 2:
+        message.update(packed[2])
+    return message
+
+
+def _compact(value: Any) -> Any:
+    """빈 값 필드 제거 (수정 이력의 빈 remove/add 목록 등)"""
+    if isinstance(value, dict):
+        return {k: _compact(v) for k, v in value.items() if v not in (None, [], {})}
+    if isinstance(value, list):
+        return [_compact(v) for v in value]
+    return value
+
+
+def dumps_session(session: Dict[str, Any]) -> bytes:
+    data = {k: v for k, v in session.items() if k not in ("messages", "modification_history")}
+    data["m"] = [_pack_message(m) for m in session.get("messages", [])]
+    data["h"] = _compact(session.get("modification_history", []))
+    payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+    if len(payload) >= _COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(payload)
+    return _RAW + payload
+
+
+def loads_session(blob: bytes) -> Dict[str, Any]:
+    if isinstance(blob, str):
+        blob = blob.encode("utf-8")
+    kind, payload = blob[:1], blob[1:]
+    if kind == _ZLIB:
+        payload = zlib.decompress(payload)
+    data = json.loads(payload)
+
+    session = new_session()
+    session.update({k: v for k, v in data.items() if k not in ("m", "h")})
+    session["messages"] = [_unpack_message(m) for m in data.get("m", [])]
+    session["modification_history"] = data.get("h", [])
+    return session
+
+
+# ─────────────────────────────────────────────
+# 저장소
+# ─────────────────────────────────────────────
+class SessionStore:
+    """세션 저장소 인터페이스"""
+
+    backend = "base"
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """세션 조회 (없으면 None, 저장소 오류면 SessionStoreUnavailableError)"""
+        raise NotImplementedError
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": f"session_{self.backend}"}
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    def load(
+        self,
+        session_id: str,
+        db_session_id: Optional[int] = None,
+        member_id: int = 0,
+        create: bool = True,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        조회 → 없으면 chatbot 테이블에서 복원 → 그래도 없으면 새 세션 (create=False면 None)
+        저장소 오류는 그대로 전파 (키가 실제로 없을 때만 새 세션 저장)
+        """
+        session = self.get(session_id)
+        if session is not None:
+            return session
+
+        db_session_id = int(db_session_id) if str(db_session_id or "").isdigit() else None
+        if db_session_id:
+            session = rehydrate_session(db_session_id, member_id)
+            if session is not None:
+                self.save(session_id, session)
+                return session
+
+        if not create:
+            return None
+        session = new_session(member_id, db_session_id)
+        self.save(session_id, session)
+        return session
+
+
+class MemorySessionStore(SessionStore):
+    """프로세스 내 LRU + TTL (접근 시 만료 시간 연장)"""
+
+    backend = "memory"
+
+    def __init__(self, maxsize: int = 5000, ttl: Optional[float] = 86400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            item = self._data.get(session_id)
+            if item is None:
+                return None
+            session, expires_at = item
+            if expires_at is not None and expires_at < time.time():
+                del self._data[session_id]
+                self.evicted += 1
+                return None
+            self._data[session_id] = (session, self._expires_at())
+            self._data.move_to_end(session_id)
+            return session
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        # 같은 dict 객체를 보관 → 메모리 백엔드에서는 save 전 변경도 그대로 보임
+        with self._lock:
+            self._data[session_id] = (session, self._expires_at())
+            self._data.move_to_end(session_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evicted += 1
+
+    def delete(self, session_id: str) -> None:
+        with self._lock:
+            self._data.pop(session_id, None)
+
+    def _expires_at(self) -> Optional[float]:
+        return time.time() + self.ttl if self.ttl else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": "session_memory", "size": len(self._data), "maxsize": self.maxsize, "evicted": self.evicted}
+
+
+class RedisSessionStore(SessionStore):
+    """Redis 프로토콜 저장소 (워커 간 공유, 키 TTL로 만료)"""
+
+    backend = "redis"
+
+    def __init__(self, client=None, url: str = "", ttl: Optional[int] = 86400, prefix: str = "chat:session:"):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+        self.errors = 0
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}{session_id}"
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            blob = self.client.get(self._key(session_id))
+            if blob is None:
+                return None
+            if self.ttl:
+                self.client.expire(self._key(session_id), self.ttl)
+            return loads_session(blob)
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARNING] 세션 조회 실패 ({session_id}): {e}")
+            raise SessionStoreUnavailableError() from e
+
+    def save(self, session_id: str, session: Dict[str, Any]) -> None:
+        try:
+            self.client.set(self._key(session_id), dumps_session(session), ex=self.ttl or None)
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARNING] 세션 저장 실패 ({session_id}): {e}")
+
+    def delete(self, session_id: str) -> None:
+        try:
+            self.client.delete(self._key(session_id))
+        except Exception as e:
+            self.errors += 1
+            print(f"[WARNING] 세션 삭제 실패 ({session_id}): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {"name": "session_redis", "errors": self.errors}
+
+
+# ─────────────────────────────────────────────
+# MySQL chatbot 테이블 연동
+# ─────────────────────────────────────────────
+def rehydrate_session(db_session_id: int, member_id: int = 0) -> Optional[Dict[str, Any]]:
+    """chatbot 테이블 메시지로 세션 복원 (행이 없으면 None)"""
+    try:
+        from models.mysql_db import get_session_chats
+        rows = get_session_chats(int(db_session_id))
+    except Exception as e:
+        print(f"[WARNING] 세션 복원 실패 (db_session_id={db_session_id}): {e}")
+        return None
+    if not rows:
+        return None
+
+    session = new_session(member_id or rows[0].get("member_id", 0), int(db_session_id))
+    session["messages"] = [
+        {"role": _DB_ROLES.get(row.get("role"), "user"), "content": row.get("text") or ""}
+        for row in rows
+    ]
+    print(f"[OK] 세션 복원: db_session_id={db_session_id}, 메시지 {len(rows)}개")
+    return session
+
+
+def _create_store() -> SessionStore:
+    if settings.SESSION_BACKEND == "redis":
+        try:
+            store = RedisSessionStore(url=settings.REDIS_URL, ttl=settings.SESSION_TTL)
+            store.client.ping()
+            print(f"[OK] 세션 저장소: redis ({settings.REDIS_URL})")
+            return store
+        except Exception as e:
+            print(f"[WARNING] Redis 세션 저장소 연결 실패 → 메모리 사용: {e}")
+    return MemorySessionStore(maxsize=settings.SESSION_MAX, ttl=settings.SESSION_TTL)
+
+
+# 프로세스 단위 싱글톤
+session_store = _create_store()
@@ -3,8 +3,14 @@
 Chat Agent - Adaptive RAG
 """
 import os
+import json
 import time
-from typing import TypedDict, List, Literal
+import asyncio
+import inspect
+import re
+import threading
+from difflib import SequenceMatcher
+from typing import TypedDict, List, Literal, Optional, Tuple
 from langgraph.graph import StateGraph, END
 from langchain_core.documents import Document
 from langchain_core.output_parsers import StrOutputParser
@@ -12,85 +18,56 @@ from langchain_core.output_parsers import StrOutputParser
 # prompts.py에서 프롬프트 import
 from .prompts import REWRITE_PROMPT, GRADE_PROMPT, GENERATE_PROMPT
 from services.search import get_search_service
+from app.config import settings
+from features.chat.scheduler import check_cancelled
+from services.history import format_history
+from services.llm import get_llm
+from services.semantic_cache import constraints_key, semantic_cache
+from core.metrics import current_metrics, current_node, node_scope, record_node_timing
+from services.sparse import normalize_title
 
 
 # ─────────────────────────────────────────────
 # 토큰 사용량 추적 헬퍼 함수
 # ─────────────────────────────────────────────
-# 요청별 토큰 누적 (요청당 초기화됨)
-_token_accumulator: dict = {"prompt": 0, "completion": 0, "total": 0}
-# 노드별 토큰 정보 저장 (노드명 -> {prompt, completion, total})
-_node_tokens: dict = {}
+# 요청별 토큰/시간은 core.metrics의 요청 컨텍스트(contextvar)에 기록
+# (동시 WebSocket 세션끼리 섞이지 않음)
 
-def print_token_usage(response, context_name: str = "LLM"):
-    """LLM 응답에서 실제 토큰 사용량 출력 및 누적 (개선 버전)"""
+def print_token_usage(context_name: str = "LLM"):
+    """현재 노드의 LLM 토큰 사용량 출력 (기록은 services.llm.LLMMetricsHandler가 on_llm_end에서 수행)"""
     print(f"\n{'='*60}")
     print(f"[{context_name}] HCX API 토큰 사용량 (실측)")
     print(f"{'='*60}")
 
-    # 개선: usage_metadata 우선 확인 (LangChain 표준)
-    usage = None
-    source = ""
-
-    if hasattr(response, 'usage_metadata'):
-        usage = response.usage_metadata
-        source = "usage_metadata"
-    elif hasattr(response, 'response_metadata'):
-        usage = response.response_metadata.get('token_usage')
-        source = "response_metadata.token_usage"
-
-    if usage:
-        # 개선: 소스에 따라 필드명 분기
-        if source == "usage_metadata":
-            prompt_tokens = usage.get('input_tokens', 0)
-            completion_tokens = usage.get('output_tokens', 0)
-            total_tokens = usage.get('total_tokens', 0)
-        else:
-            prompt_tokens = usage.get('prompt_tokens', 0)
-            completion_tokens = usage.get('completion_tokens', 0)
-            total_tokens = usage.get('total_tokens', 0)
-
-        # Fallback: total_tokens이 없으면 계산
-        if total_tokens == 0:
-            total_tokens = prompt_tokens + completion_tokens
-
-        # 전체 누적
-        _token_accumulator["prompt"] += prompt_tokens
-        _token_accumulator["completion"] += completion_tokens
-        _token_accumulator["total"] += total_tokens
-
-        # 노드별 저장 (누적)
-        if context_name not in _node_tokens:
-            _node_tokens[context_name] = {"prompt": 0, "completion": 0, "total": 0}
-        _node_tokens[context_name]["prompt"] += prompt_tokens
-        _node_tokens[context_name]["completion"] += completion_tokens
-        _node_tokens[context_name]["total"] += total_tokens
-
-        print(f"📥 입력 토큰 (prompt):     {prompt_tokens:,} tokens")
-        print(f"📤 출력 토큰 (completion): {completion_tokens:,} tokens")
-        print(f"📊 총 토큰 (total):        {total_tokens:,} tokens")
-        print(f"🔍 토큰 소스: {source}")
+    tokens = current_metrics().node_tokens.get(current_node())
+    if tokens:
+        print(f"📥 입력 토큰 (prompt):     {tokens['prompt']:,} tokens")
+        print(f"📤 출력 토큰 (completion): {tokens['completion']:,} tokens")
+        print(f"📊 총 토큰 (total):        {tokens['total']:,} tokens")
     else:
-        print(f"⚠️  토큰 사용량 정보를 찾을 수 없습니다.")
-        print(f"응답 객체 속성: {dir(response)}")
-        if hasattr(response, 'response_metadata'):
-            print(f"response_metadata: {response.response_metadata}")
-        if hasattr(response, 'usage_metadata'):
-            print(f"usage_metadata: {response.usage_metadata}")
+        print(f"⚠️  토큰 사용량 정보를 찾을 수 없습니다. (응답 캐시 hit 또는 usage 미제공)")
 
     print(f"{'='*60}\n")
 
 def print_token_summary():
-    """누적된 토큰 사용량 요약 출력 (마크다운 형식)"""
-    if _token_accumulator["total"] == 0:
+    """현재 요청의 토큰 사용량 요약 출력 (마크다운 형식)"""
+    metrics = current_metrics()
+    totals = metrics.tokens
+    node_tokens = metrics.node_tokens
+    node_timings = metrics.node_timings
+    if totals["total"] == 0:
         return
 
     print(f"\n{'🔷'*30}")
     print(f"{'  '*10}📊 전체 토큰 사용량 요약")
     print(f"{'🔷'*30}")
-    print(f"📥 총 입력 토큰 (prompt):     {_token_accumulator['prompt']:,} tokens")
-    print(f"📤 총 출력 토큰 (completion): {_token_accumulator['completion']:,} tokens")
-    print(f"📊 총합 (total):              {_token_accumulator['total']:,} tokens")
+    print(f"📥 총 입력 토큰 (prompt):     {totals['prompt']:,} tokens")
+    print(f"📤 총 출력 토큰 (completion): {totals['completion']:,} tokens")
+    print(f"📊 총합 (total):              {totals['total']:,} tokens")
+    history = metrics.history_tokens
+    if history["original"] > history["compacted"]:
+        print(f"🗜️ 히스토리 압축 절약 (추정): {history['original'] - history['compacted']:,} tokens "
+              f"({history['original']:,} → {history['compacted']:,})")
     print(f"{'🔷'*30}\n")
 
     # 1) 노드별 토큰/시간 요약 표 (마크다운)
@@ -114,9 +91,9 @@ def print_token_summary():
 
     # 노드 순서대로 출력
     for node_name in node_order:
-        tokens = _node_tokens.get(node_name, {"prompt": 0, "completion": 0, "total": 0})
+        tokens = node_tokens.get(node_name, {"prompt": 0, "completion": 0, "total": 0})
         meta = node_metadata.get(node_name, {"step": "-", "desc": node_name, "timing_key": node_name})
-        timing_ms = _node_timings.get(meta["timing_key"], 0)
+        timing_ms = node_timings.get(meta["timing_key"], 0)
         timing_sec = timing_ms / 1000 if timing_ms else 0
 
         if tokens["total"] > 0 or timing_sec > 0:
@@ -130,20 +107,20 @@ def print_token_summary():
     print("\n- 📊 전체 합계 요약\n")
     print("| 구분 | Prompt Tokens | Completion Tokens | Total Tokens |")
     print("|------|---------------|-------------------|--------------|")
-    print(f"| 합계 | {_token_accumulator['prompt']:,} | {_token_accumulator['completion']:,} | {_token_accumulator['total']:,} |")
+    print(f"| 합계 | {totals['prompt']:,} | {totals['completion']:,} | {totals['total']:,} |")
 
     # 3) 성능 병목 표: 동작 플로우 순서대로 (마크다운)
-    if _node_timings:
+    if node_timings:
         print("\n- ⚡ 성능 병목 분석\n")
         print("| 동작 | Node | Latency(s) | 비율 |")
         print("|------|------|------------|------|")
 
         # 동작 플로우 순서 정의
         node_order = ["check_relevance", "rewrite", "retrieve", "check_constraints", "grade", "web_search", "generate"]
-        total_time = sum(_node_timings.values())
+        total_time = sum(node_timings.values())
 
         for order, node_name in enumerate(node_order, 1):
-            ms = _node_timings.get(node_name, 0)
+            ms = node_timings.get(node_name, 0)
             if ms > 0:
                 sec = ms / 1000
                 ratio = (ms / total_time * 100) if total_time > 0 else 0
@@ -155,33 +132,341 @@ def print_token_summary():
 
         print("="*100 + "\n")
 
-    # 초기화
-    _token_accumulator["prompt"] = 0
-    _token_accumulator["completion"] = 0
-    _token_accumulator["total"] = 0
-    _node_tokens.clear()
-    _node_timings.clear()
-
 
 # ─────────────────────────────────────────────
 # 노드별 타이밍 래퍼
 # ─────────────────────────────────────────────
-# 누적 타이밍을 저장할 전역 딕셔너리 (요청당 초기화됨)
-_node_timings: dict = {}
+def _record_node_timing(name: str, start: float):
+    elapsed_ms = (time.time() - start) * 1000
+    record_node_timing(name, elapsed_ms)
+    elapsed_sec = elapsed_ms / 1000
+    print(f"  ⏱️  [Node: {name}] {elapsed_sec:.1f}초")
+
 
 def timed_node(name: str, fn):
-    """노드 함수를 감싸서 실행 시간을 자동 로깅"""
+    """노드 함수를 감싸서 실행 시간을 자동 로깅 (sync/async 노드 모두 지원, 시작 전 취소 여부 확인)"""
+    if inspect.iscoroutinefunction(fn):
+        async def async_wrapper(state: "ChatAgentState") -> "ChatAgentState":
+            check_cancelled(name)
+            start = time.time()
+            with node_scope(name):
+                result = await fn(state)
+            _record_node_timing(name, start)
+            return result
+        return async_wrapper
+
     def wrapper(state: "ChatAgentState") -> "ChatAgentState":
+        check_cancelled(name)
         start = time.time()
-        result = fn(state)
-        elapsed_ms = (time.time() - start) * 1000
-        _node_timings[name] = elapsed_ms
-        elapsed_sec = elapsed_ms / 1000
-        print(f"  ⏱️  [Node: {name}] {elapsed_sec:.1f}초")
+        with node_scope(name):
+            result = fn(state)
+        _record_node_timing(name, start)
         return result
     return wrapper
 
 
+# ─────────────────────────────────────────────
+# generate 노드 토큰 스트리밍 / 후처리
+# ─────────────────────────────────────────────
+class StreamingAnswerFilter:
+    """
+    스트리밍 중 후처리 (줄 단위 판단)
+    - 조리법 섹션 헤더가 나오면 이후 전부 버림
+    - 알레르기/비선호 문구 줄은 버림
+    - 줄 앞부분만으로 판단이 안 되면 판단될 때까지 보류, 나머지는 즉시 전달
+    소개/재료 형식 정리는 최종 버퍼(clean_generation)에서만 적용
+    """
+
+    _STOP = re.compile(r"^\s*(\*\*)?조리법(\*\*)?[\s:：]")
+    _DROP = re.compile(r"^\s*(\*알레르기|알레르기 재료|비선호 음식)")
+    _MARKERS = ("조리법:", "조리법 ", "**조리법", "*알레르기", "알레르기 재료", "비선호 음식")
+
+    def __init__(self):
+        self._line = ""
+        self._emitted = 0
+        self._decision = None  # None(보류) | "emit" | "drop"
+        self._stopped = False
+
+    def _decide(self, line: str, complete: bool):
+        if self._STOP.match(line) or (complete and line.strip() in ("조리법", "**조리법**")):
+            return "stop"
+        if self._DROP.match(line):
+            return "drop"
+        head = line.lstrip()
+        if not complete and any(marker.startswith(head) for marker in self._MARKERS):
+            return None
+        return "emit"
+
+    def _consume_line(self, line: str, complete: bool) -> str:
+        if self._decision is None:
+            decision = self._decide(line, complete)
+            if decision == "stop":
+                self._stopped = True
+                return ""
+            if decision is None:
+                return ""
+            self._decision = decision
+
+        if self._decision == "drop":
+            return ""
+        out = line[self._emitted:]
+        self._emitted = len(line)
+        return out
+
+    def feed(self, text: str) -> str:
+        if self._stopped:
+            return ""
+        self._line += text
+        out = []
+        while "\n" in self._line and not self._stopped:
+            line, self._line = self._line.split("\n", 1)
+            kept = self._consume_line(line, complete=True)
+            if not self._stopped and self._decision != "drop":
+                out.append(kept + "\n")
+            self._emitted, self._decision = 0, None
+        if self._line and not self._stopped:
+            out.append(self._consume_line(self._line, complete=False))
+        return "".join(out)
+
+    def flush(self) -> str:
+        if self._stopped or not self._line:
+            return ""
+        out = self._consume_line(self._line, complete=True)
+        self._line, self._emitted, self._decision = "", 0, None
+        return out
+
+
+def _get_writer():
+    """LangGraph custom stream writer (astream(stream_mode="custom")가 아니면 no-op)"""
+    try:
+        from langgraph.config import get_stream_writer
+        return get_stream_writer()
+    except Exception:
+        return lambda _event: None
+
+
+def clean_generation(answer: str) -> str:
+    """generate 노드 최종 답변 후처리 (조리법 섹션 제거, 알레르기 문구 제거, 소개/재료 형식 정리)"""
+    # 후처리: 조리법 제거 (채팅용, 재료만 출력)
+    # "조리법:" 또는 "1. " 로 시작하는 부분 이후 제거
+
+    # 조리법 섹션 찾기 (여러 패턴 지원)
+    cooking_patterns = [
+        r'\n조리법[\s:：]+.*',  # "조리법:" 또는 "조리법 :"
+        r'\n\*\*조리법\*\*[\s:：]+.*',  # "**조리법:**"
+    ]
+
+    cleaned_answer = answer
+    for pattern in cooking_patterns:
+        # 해당 패턴부터 끝까지 제거
+        match = re.search(pattern, cleaned_answer, re.DOTALL | re.IGNORECASE)
+        if match:
+            cleaned_answer = cleaned_answer[:match.start()].strip()
+            print(f"   [후처리] 조리법 제거됨")
+            break
+
+    # 알레르기/비선호 관련 텍스트 제거 (출력에 포함되면 안됨)
+    allergy_patterns = [
+        r'\*알레르기.*?\n',  # "*알레르기 재료 ..."
+        r'알레르기 재료.*?\n',  # "알레르기 재료 (절대 사용 금지): ..."
+        r'비선호 음식.*?\n',  # "비선호 음식 (피해야 함): ..."
+    ]
+
+    for pattern in allergy_patterns:
+        cleaned_answer = re.sub(pattern, '', cleaned_answer, flags=re.IGNORECASE)
+
+    # 볼드 없는 형식을 볼드 형식으로 통일 (웹 검색 결과 대응)
+    if '소개:' in cleaned_answer and '**소개:**' not in cleaned_answer:
+        cleaned_answer = re.sub(r'(?<!\*)소개:\s*', '**소개:** ', cleaned_answer, count=1)
+    if '재료:' in cleaned_answer and '**재료:**' not in cleaned_answer:
+        cleaned_answer = re.sub(r'(?<!\*)재료:\s*', '**재료:** ', cleaned_answer, count=1)
+
+    # 소개 문구 정제: 이모티콘, 캐주얼 표현 제거
+    if '**소개:**' in cleaned_answer:
+        # 소개 섹션 추출 (같은 줄만, DOTALL 사용하지 않음)
+        intro_match = re.search(r'\*\*소개:\*\*\s*(.+)', cleaned_answer)
+        if intro_match:
+            intro_text = intro_match.group(1).strip()
+
+            # 이모티콘 제거 (ᄒ.ᄒ, ᄏᄏ, :), ^^, 등)
+            intro_text = re.sub(r'[ᄀ-ᄒ]{2,}', '', intro_text)  # ᄏᄏ, ᄒᄒ 등
+            intro_text = re.sub(r'[:;]\)|:\(|:\)|^^|ㅎㅎ|ㅋㅋ', '', intro_text)
+
+            # 캐주얼 표현 제거
+            casual_phrases = [
+                r'알려드릴게요[!\s]*',
+                r'드릴게요[!\s]*',
+                r'[~]+',
+                r'요[~]+',
+                r'답니다[:\s]*\)',
+                r'하죠[!\s]*',
+                r'그만큼.*?있답니다',
+                r'레시피를 알려드릴게요',
+                r'소개해드릴게요',
+            ]
+            for phrase in casual_phrases:
+                intro_text = re.sub(phrase, '', intro_text)
+
+            # 다중 공백 정리
+            intro_text = re.sub(r'\s+', ' ', intro_text).strip()
+
+            # 마침표로 끝나지 않으면 추가
+            if intro_text and not intro_text.endswith('.'):
+                intro_text += '.'
+
+            # 소개 문구 교체 (같은 줄만 교체, DOTALL 사용하지 않음)
+            cleaned_answer = re.sub(
+                r'\*\*소개:\*\*\s*.+',
+                f'**소개:** {intro_text}',
+                cleaned_answer,
+                count=1
+            )
+            print(f"   [후처리] 소개 정제됨: {intro_text[:50]}...")
+
+    # 재료 형식 정리: 줄바꿈 제거, 쉼표로 변환
+    # "- 재료명 양" 형식을 "재료명 양," 형식으로 변환
+    if '**재료:**' in cleaned_answer:
+        # 재료 섹션 추출
+        parts = cleaned_answer.split('**재료:**')
+        if len(parts) == 2:
+            before_ingredients = parts[0]
+            ingredients_section = parts[1].strip()
+
+            # 줄바꿈으로 구분된 재료들을 쉼표로 변환
+            # "- 재료명 양" → "재료명 양"
+            ingredients_lines = []
+            for line in ingredients_section.split('\n'):
+                line = line.strip()
+                if line and not line.startswith('**'):  # 다음 섹션 시작 전까지
+                    # "- " 제거
+                    line = re.sub(r'^[-\*]\s*', '', line)
+                    if line:
+                        ingredients_lines.append(line)
+                elif line.startswith('**'):
+                    # 다음 섹션 발견, 중단
+                    break
+
+            # 쉼표로 연결
+            ingredients_text = ', '.join(ingredients_lines)
+
+            # 재구성
+            cleaned_answer = f"{before_ingredients}**재료:** {ingredients_text}"
+            print(f"   [후처리] 재료 형식 정리됨")
+
+    return cleaned_answer
+
+
+def _is_similar_query(original: str, rewritten: str) -> bool:
+    """재작성 결과가 원본과 (정규화 기준) 같거나 거의 같은지"""
+    a, b = normalize_title(original), normalize_title(rewritten)
+    if a == b:
+        return True
+    return SequenceMatcher(None, a, b).ratio() >= settings.SPECULATIVE_SIMILARITY
+
+
+# ─────────────────────────────────────────────
+# 문서 관련성 평가 (로컬 점수 + LLM fallback)
+# ─────────────────────────────────────────────
+def document_score(doc: Document, use_rerank: bool = True) -> Tuple[Optional[str], Optional[float]]:
+    """
+    검색 단계에서 이미 계산된 점수 → (종류, 관련도)
+    - rerank: CLOVA reranker 점수 (높을수록 관련)
+    - cosine: L2² 거리 d → 1 - d/2 (bge-m3 임베딩은 정규화됨, title 매칭은 d=0)
+    - hybrid: RRF 점수는 절대값 해석이 안 되므로 dense 구간 거리(dense_distance)로 cosine 계산 (없으면 (None, None))
+    """
+    rerank_score = doc.metadata.get("rerank_score")
+    if use_rerank and rerank_score is not None:
+        return "rerank", float(rerank_score)
+
+    vector_score = doc.metadata.get("vector_score")
+    if doc.metadata.get("hybrid"):
+        vector_score = doc.metadata.get("dense_distance")
+    if vector_score is None:
+        return None, None
+    return "cosine", 1.0 - float(vector_score) / 2.0
+
+
+def local_grade(documents: List[Document]) -> Tuple[str, Optional[str], Optional[float]]:
+    """최고 관련도 기준 'yes' / 'no' / 'ambiguous' + (종류, 점수)"""
+    # reranker 실패 시 모든 점수가 1.0으로 채워지므로 벡터 점수로 대체
+    rerank_scores = [doc.metadata.get("rerank_score") for doc in documents[:3]]
+    use_rerank = any(sc is not None and sc != 1.0 for sc in rerank_scores)
+
+    scored = [document_score(doc, use_rerank) for doc in documents[:3]]
+    scored = [(kind, score) for kind, score in scored if score is not None]
+    if not scored:
+        return "ambiguous", None, None
+
+    kind, best = max(scored, key=lambda item: item[1])
+    if kind == "rerank":
+        accept, reject = settings.GRADER_RERANK_ACCEPT, settings.GRADER_RERANK_REJECT
+    else:
+        accept, reject = settings.GRADER_COSINE_ACCEPT, settings.GRADER_COSINE_REJECT
+
+    if best >= accept:
+        return "yes", kind, best
+    if best <= reject:
+        return "no", kind, best
+    return "ambiguous", kind, best
+
+
+def title_matches(question: str, documents: List[Document]) -> bool:
+    """질문 단어/정규화 질문이 상위 문서 제목에 포함되는지"""
+    question_lower = question.lower()
+    question_norm = normalize_title(question)
+
+    for doc in documents[:3]:
+        title = doc.metadata.get("title", "").lower()
+        # 띄어쓰기 차이 무시 ("돼지 불고기" == "돼지불고기")
+        if (question_norm and question_norm in normalize_title(title)) or any(
+            word in title
+            for word in question_lower.split()
+            if len(word) > 1
+        ):
+            return True
+    return False
+
+
+def llm_grade(question: str, documents: List[Document]) -> str:
+    """HCX-003 yes/no 평가 → 'yes' | 'no'"""
+    context_text = "\n".join([
+        f"- {doc.page_content[:200]}"
+        for doc in documents[:3]
+    ])
+
+    llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=10, cache=True)
+    chain = GRADE_PROMPT | llm | StrOutputParser()
+    score = chain.invoke({
+        "question": question,
+        "context": context_text
+    })
+
+    print_token_usage("관련성 평가")
+    print(f"   평가: {score}")
+    return "yes" if "yes" in score.lower() else "no"
+
+
+def _log_grade(question, documents, kind, best, local_verdict, decision, llm_verdict) -> None:
+    """GRADER_LOG_PATH가 있으면 평가 결과를 JSONL로 기록 (calibrate_grader.py 입력)"""
+    if not settings.GRADER_LOG_PATH:
+        return
+    record = {
+        "ts": time.time(),
+        "question": question,
+        "titles": [doc.metadata.get("title", "") for doc in documents[:3]],
+        "kind": kind,
+        "best": best,
+        "local": local_verdict,
+        "llm": llm_verdict,
+        "decision": decision,
+    }
+    try:
+        with open(settings.GRADER_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    except OSError as e:
+        print(f"   [WARNING] 평가 로그 기록 실패: {e}")
+
+
 class ChatAgentState(TypedDict):
     """Agent 상태"""
     question: str
@@ -193,83 +478,221 @@ class ChatAgentState(TypedDict):
     user_constraints: dict
     constraint_warning: str
     modification_history: list  # 레시피 수정 이력
+    search_engine: str  # 웹 검색 엔진 (없으면 SEARCH_ENGINE 환경변수)
+    speculative_hit: bool  # rewrite 단계의 추측 검색 결과를 documents로 사용했는지
+    answer_cache_hit: bool  # 시맨틱 캐시 답변을 그대로 사용했는지
+    cache_epoch: int  # 조회 시점의 시맨틱 캐시 epoch (도중에 무효화되면 저장 안 함)
+
+
+# ─────────────────────────────────────────────
+# 프로세스 단위 그래프 / 검색 서비스 캐시
+# ─────────────────────────────────────────────
+DEFAULT_SEARCH_ENGINE = os.getenv("SEARCH_ENGINE", "serper")
+
+_search_services: dict = {}
+_compiled_agent = None
+_compiled_for = None  # 그래프가 바인딩된 rag_system
+_agent_lock = threading.Lock()
+
+
+def _get_search_service(engine: str = None):
+    """검색 엔진별 서비스 1회 생성 후 재사용"""
+    engine = (engine or DEFAULT_SEARCH_ENGINE).lower()
+    service = _search_services.get(engine)
+    if service is None:
+        service = _search_services.setdefault(engine, get_search_service(engine))
+    return service
+
+
+def get_chat_agent(rag_system):
+    """컴파일된 Chat Agent (프로세스당 1회 생성, 요청별 상태는 ChatAgentState로 전달)"""
+    global _compiled_agent, _compiled_for
+
+    if _compiled_agent is not None and _compiled_for is rag_system:
+        return _compiled_agent
+
+    with _agent_lock:
+        if _compiled_agent is None or _compiled_for is not rag_system:
+            _compiled_agent = create_chat_agent(rag_system)
+            _compiled_for = rag_system
+    return _compiled_agent
+
+
+def warmup_chat_agent(rag_system) -> None:
+    """서버 시작 시 그래프 컴파일 + 기본 검색 서비스 생성"""
+    t_start = time.time()
+    get_chat_agent(rag_system)
+    _get_search_service()
+    print(f"[Agent] 워밍업 완료 ({(time.time() - t_start) * 1000:.0f}ms)")
 
 
 def create_chat_agent(rag_system):
-    """Chat Agent 생성 - Adaptive RAG + 네이버 검색"""
+    """Chat Agent 그래프 생성 - Adaptive RAG + 웹 검색 (직접 호출 대신 get_chat_agent 사용)"""
 
-    search_engine = os.getenv("SEARCH_ENGINE", "serper")
-    search_service = get_search_service(search_engine)
-    print(f"[Agent] 검색 엔진: {search_engine}")
+    print(f"[Agent] 기본 검색 엔진: {DEFAULT_SEARCH_ENGINE}")
     
     # ===== 노드 함수 =====
 
-    def rewrite_query(state: ChatAgentState) -> ChatAgentState:
-        """쿼리 재작성"""
+    async def _search_documents(question: str) -> List[Document]:
+        """RAG 검색 결과 → Document 목록"""
+        # use_rerank=None -> RAG 시스템 설정(USE_RERANKER) 따름
+        results = await rag_system.asearch_recipes(question, k=3, use_rerank=None)
+
+        return [
+            Document(
+                page_content=doc.get("content", ""),
+                metadata={
+                    "title": doc.get("title", ""),
+                    "cook_time": doc.get("cook_time", ""),
+                    "level": doc.get("level", ""),
+                    "recipe_id": doc.get("recipe_id", ""),
+                    "vector_score": doc.get("vector_score"),
+                    "hybrid": doc.get("hybrid", False),
+                    "dense_distance": doc.get("dense_distance"),
+                    "rerank_score": doc.get("rerank_score"),
+                }
+            )
+            for doc in results
+        ]
+
+    async def _timed_search(question: str) -> tuple:
+        start = time.time()
+        documents = await _search_documents(question)
+        return documents, (time.time() - start) * 1000
+
+    async def rewrite_query(state: ChatAgentState) -> ChatAgentState:
+        """쿼리 재작성 (SPECULATIVE_RETRIEVAL이면 원본 질문 검색을 동시에 시작)"""
         print("[Agent] 쿼리 재작성 중...")
 
         question = state["question"]
         history = state.get("chat_history", [])
 
-        formatted_history = "\n".join(history[-5:]) if isinstance(history, list) else str(history)
+        formatted_history = (
+            format_history(history, settings.HISTORY_BUDGET_REWRITE, keep_recent=2, site="쿼리 재작성", max_items=5)
+            if isinstance(history, list) else str(history)
+        )
 
-        try:
-            from langchain_naver import ChatClovaX
-            llm = ChatClovaX(model="HCX-DASH-001", temperature=0.2, max_tokens=50)
-            chain = REWRITE_PROMPT | llm | StrOutputParser()
-            better_question = chain.invoke({
-                "history": formatted_history,
-                "question": question
-            })
-            print_token_usage(better_question, "쿼리 재작성")
+        speculative = None
+        if settings.SPECULATIVE_RETRIEVAL:
+            speculative = asyncio.create_task(_timed_search(question))
 
-            print(f"   원본: {question}")
-            print(f"   재작성: {better_question}")
+        try:
+            t_rewrite = time.time()
+            try:
+                llm = get_llm(model="HCX-DASH-001", temperature=0.2, max_tokens=50, cache=True)
+                chain = REWRITE_PROMPT | llm | StrOutputParser()
+                better_question = await chain.ainvoke({
+                    "history": formatted_history,
+                    "question": question
+                })
+                print_token_usage("쿼리 재작성")
+
+                print(f"   원본: {question}")
+                print(f"   재작성: {better_question}")
+
+                # 재작성 결과가 원본보다 3배 이상 길거나 문장형이면 원본 사용
+                if len(better_question) > len(question) * 3 or any(kw in better_question for kw in ["확인되지", "않습니다", "말씀하신", "궁금하신"]):
+                    print(f"   재작성 결과 이상 → 원본 사용")
+                    better_question = question
 
-            # 재작성 결과가 원본보다 3배 이상 길거나 문장형이면 원본 사용
-            if len(better_question) > len(question) * 3 or any(kw in better_question for kw in ["확인되지", "않습니다", "말씀하신", "궁금하신"]):
-                print(f"   재작성 결과 이상 → 원본 사용")
+            except Exception as e:
+                print(f"   재작성 실패: {e}")
                 better_question = question
+            rewrite_ms = (time.time() - t_rewrite) * 1000
 
-            return {
+            result = {
                 "question": better_question,
-                "original_question": question
+                "original_question": question,
+                "speculative_hit": False,
             }
+            if speculative is None:
+                return result
 
+            if not _is_similar_query(question, better_question):
+                print("   [추측 검색] 재작성 결과가 달라 폐기 → retrieve에서 재검색")
+                return result
+
+            try:
+                documents, search_ms = await speculative
+            except Exception as e:
+                print(f"   [추측 검색] 실패: {e} → retrieve에서 재검색")
+                return result
+
+            # 재작성과 겹친 검색 시간 = 순차 실행 대비 절약된 시간
+            record_node_timing("retrieve(speculative)", search_ms)
+            record_node_timing("speculative_saved", min(search_ms, rewrite_ms))
+            print(f"   [추측 검색] 원본 질문 검색 결과 사용 ({len(documents)}개, {min(search_ms, rewrite_ms) / 1000:.1f}초 절약)")
+            result.update({"documents": documents, "speculative_hit": True})
+            return result
+        finally:
+            # 예외/취소(타임아웃, 연결 종료)로 빠져나가도 추측 검색이 남아 돌지 않도록
+            if speculative is not None and not speculative.done():
+                speculative.cancel()
+
+    def _semantic_cacheable(state: ChatAgentState) -> bool:
+        # 수정 이력이 있거나 질문이 알레르기/비선호 재료를 언급하면(경고 필요) 같은 질문이라도 답변이 달라짐
+        return (
+            settings.SEMANTIC_CACHE_ENABLED
+            and not state.get("modification_history")
+            and not state.get("constraint_warning")
+        )
+
+    async def semantic_cache_lookup(state: ChatAgentState) -> ChatAgentState:
+        """재작성 질문 임베딩으로 시맨틱 캐시 조회 (hit면 검색/평가/생성 생략)"""
+        if not _semantic_cacheable(state):
+            return {"answer_cache_hit": False}
+
+        epoch = semantic_cache.epoch
+        try:
+            embedding = await rag_system.aembed_query(state["question"])
+            entry = semantic_cache.lookup(embedding, constraints_key(state.get("user_constraints")))
         except Exception as e:
-            print(f"   재작성 실패: {e}")
-            return {
-                "question": question,
-                "original_question": question
-            }
+            print(f"[Agent] 시맨틱 캐시 조회 실패: {e}")
+            return {"answer_cache_hit": False, "cache_epoch": epoch}
+
+        if entry is None:
+            return {"answer_cache_hit": False, "cache_epoch": epoch}
+
+        print(f"[Agent] ⚡ 시맨틱 캐시 hit ({entry['score']:.3f}): {entry['question'][:30]}")
+        return {
+            "answer_cache_hit": True,
+            "generation": entry["answer"],
+            "documents": entry["documents"],
+        }
+
+    async def _store_answer(state: ChatAgentState, answer: str) -> None:
+        """생성된 답변을 시맨틱 캐시에 저장 (임베딩은 조회 때 캐시되어 API 재호출 없음)"""
+        if not _semantic_cacheable(state) or "cache_epoch" not in state:
+            return
+        try:
+            embedding = await rag_system.aembed_query(state["question"])
+            semantic_cache.store(
+                embedding,
+                constraints_key(state.get("user_constraints")),
+                state["question"],
+                answer,
+                state.get("documents", []),
+                epoch=state["cache_epoch"],
+            )
+        except Exception as e:
+            print(f"[Agent] 시맨틱 캐시 저장 실패: {e}")
+
+    async def retrieve(state: ChatAgentState) -> ChatAgentState:
+        """RAG 검색 (Reranker 사용, 추측 검색 결과가 있으면 재사용)"""
+        if state.get("speculative_hit"):
+            print("[Agent] RAG 검색 스킵 (추측 검색 결과 사용)")
+            return {}
 
-    def retrieve(state: ChatAgentState) -> ChatAgentState:
-        """RAG 검색 (Reranker 사용)"""
         print("[Agent] RAG 검색 중...")
-        
-        question = state["question"]
-        
-        # use_rerank=None -> RAG 시스템 설정(USE_RERANKER) 따름
-        results = rag_system.search_recipes(question, k=3, use_rerank=None)
-        
-        documents = [
-            Document(
-                page_content=doc.get("content", ""),
-                metadata={
-                    "title": doc.get("title", ""),
-                    "cook_time": doc.get("cook_time", ""),
-                    "level": doc.get("level", "")
-                }
-            )
-            for doc in results
-        ]
-        
+
+        documents = await _search_documents(state["question"])
+
         print(f"   검색 결과: {len(documents)}개")
         for i, doc in enumerate(documents[:3], 1):
             print(f"   {i}. {doc.metadata.get('title', '')[:40]}...")
-        
+
         return {"documents": documents}
-    
+
     def check_constraints(state: ChatAgentState) -> ChatAgentState:
         """제약 조건 체크 (알레르기, 비선호 음식)"""
         print("[Agent] 제약 조건 체크 중...")
@@ -309,7 +732,7 @@ def create_chat_agent(rag_system):
             return {"constraint_warning": ""}
 
     def grade_documents(state: ChatAgentState) -> ChatAgentState:
-        """문서 관련성 평가"""
+        """문서 관련성 평가 (GRADER_MODE: local 점수 우선, 애매한 구간만 LLM)"""
         print("[Agent] 관련성 평가 중...")
         
         question = state["question"]
@@ -320,41 +743,28 @@ def create_chat_agent(rag_system):
             return {"web_search_needed": "yes"}
         
         try:
-            question_lower = question.lower()
-            
-            found_exact_match = False
-            for doc in documents[:3]:
-                title = doc.metadata.get("title", "").lower()
-                if question_lower in title or any(
-                    word in title 
-                    for word in question_lower.split() 
-                    if len(word) > 1
-                ):
-                    found_exact_match = True
-                    break
-            
-            if not found_exact_match:
-                print("   제목 매칭 실패 → 웹 검색")
-                return {"web_search_needed": "yes"}
-            
-            context_text = "\n".join([
-                f"- {doc.page_content[:200]}"
-                for doc in documents[:3]
-            ])
-
-            from langchain_naver import ChatClovaX
-            llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=10)
-            chain = GRADE_PROMPT | llm | StrOutputParser()
-            score = chain.invoke({
-                "question": question,
-                "context": context_text
-            })
-
-            print_token_usage(score, "관련성 평가")
-            
-            print(f"   평가: {score}")
-            
-            if "yes" in score.lower():
+            verdict, kind, best = local_grade(documents)
+            if best is not None:
+                print(f"   로컬 평가: {verdict} ({kind}={best:.3f})")
+
+            if settings.GRADER_MODE != "llm" and verdict != "ambiguous":
+                decision = verdict
+                llm_verdict = None
+            elif settings.GRADER_MODE == "local":
+                # 애매한 구간도 LLM 없이 제목 매칭으로 결정
+                decision = "yes" if title_matches(question, documents) else "no"
+                llm_verdict = None
+            else:
+                if not title_matches(question, documents):
+                    print("   제목 매칭 실패 → 웹 검색")
+                    _log_grade(question, documents, kind, best, verdict, "no", None)
+                    return {"web_search_needed": "yes"}
+                llm_verdict = llm_grade(question, documents)
+                decision = llm_verdict
+
+            _log_grade(question, documents, kind, best, verdict, decision, llm_verdict)
+
+            if decision == "yes":
                 print("   DB 충분 → 생성")
                 return {"web_search_needed": "no"}
             else:
@@ -370,6 +780,7 @@ def create_chat_agent(rag_system):
         print("[Agent] 웹 검색 실행 중...")
 
         question = state["question"]
+        search_service = _get_search_service(state.get("search_engine"))
         documents = search_service.search(query=question, max_results=3)
 
         for i, doc in enumerate(documents, 1):
@@ -402,9 +813,8 @@ def create_chat_agent(rag_system):
 
 **요약 (3문장, 재료/시간/난이도 위주, 광고 제거, 정확한 양 유지):**"""
 
-                from langchain_naver import ChatClovaX
                 from langchain_core.messages import HumanMessage
-                llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=300)
+                llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=300, cache=True)
                 result = llm.invoke([HumanMessage(content=summarize_prompt)])
                 summary = result.content.strip()
 
@@ -422,8 +832,8 @@ def create_chat_agent(rag_system):
             print(f"   요약 실패: {e}, 원본 사용")
             return {"documents": documents}
 
-    def generate(state: ChatAgentState) -> ChatAgentState:
-        """답변 생성"""
+    async def generate(state: ChatAgentState) -> ChatAgentState:
+        """답변 생성 (토큰 스트리밍)"""
         print("[Agent] 답변 생성 중...")
         
         question = state["original_question"]
@@ -432,7 +842,11 @@ def create_chat_agent(rag_system):
         constraint_warning = state.get("constraint_warning", "")
         user_constraints = state.get("user_constraints", {})
         
-        formatted_history = "\n".join(history[-10:]) if isinstance(history, list) else str(history)
+        formatted_history = (
+            format_history(history, settings.HISTORY_BUDGET_GENERATE, keep_recent=settings.HISTORY_KEEP_RECENT,
+                           site="답변 생성", max_items=10)
+            if isinstance(history, list) else str(history)
+        )
 
         # 웹 검색 결과는 이미 요약되어 있으므로 전체 사용, DB 검색 결과는 800자로 제한
         context_text = "\n\n".join([
@@ -450,7 +864,8 @@ def create_chat_agent(rag_system):
     답변:"""
                 
                 from langchain_core.messages import HumanMessage
-                result = rag_system.chat_model.invoke([HumanMessage(content=alt_prompt)])
+                # async 노드 → 이벤트 루프를 막지 않도록 ainvoke
+                result = await rag_system.chat_model.ainvoke([HumanMessage(content=alt_prompt)])
                 answer = f"{constraint_warning}\n\n{result.content.strip()}"
                 
                 return {"generation": answer}
@@ -551,126 +966,35 @@ def create_chat_agent(rag_system):
             print(f"{'='*60}\n")
 
             # max_tokens 명시적 설정 (토큰 절약)
-            from langchain_naver import ChatClovaX
-            llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=1000)
+            llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=1000)
             chain = GENERATE_PROMPT | llm | StrOutputParser()
-            answer = chain.invoke({
+
+            # 토큰 스트리밍: 청크마다 필터를 거쳐 agent_delta 커스텀 이벤트로 전달
+            # (최종 답변 후처리는 전체 버퍼에 적용 → agent_message로 확정)
+            writer = _get_writer()
+            delta_filter = StreamingAnswerFilter()
+            chunks = []
+            async for chunk in chain.astream({
                 "context": context_text,
                 "question": enhanced_question,
                 "history": formatted_history,
                 "servings": servings,
                 "modification_constraints": modification_constraints  # 수정 제약사항 추가
-            })
-
-            print_token_usage(answer, "답변 생성")
+            }):
+                chunks.append(chunk)
+                delta = delta_filter.feed(chunk)
+                if delta:
+                    writer({"type": "agent_delta", "content": delta})
+            tail = delta_filter.flush()
+            if tail:
+                writer({"type": "agent_delta", "content": tail})
+            answer = "".join(chunks)
+
+            print_token_usage("답변 생성")
             print(f"\n[DEBUG] LLM 원본 응답:\n{answer}\n[/DEBUG]\n")
 
-            # 후처리: 조리법 제거 (채팅용, 재료만 출력)
-            # "조리법:" 또는 "1. " 로 시작하는 부분 이후 제거
-            import re
-
-            # 조리법 섹션 찾기 (여러 패턴 지원)
-            cooking_patterns = [
-                r'\n조리법[\s:：]+.*',  # "조리법:" 또는 "조리법 :"
-                r'\n\*\*조리법\*\*[\s:：]+.*',  # "**조리법:**"
-            ]
-
-            cleaned_answer = answer
-            for pattern in cooking_patterns:
-                # 해당 패턴부터 끝까지 제거
-                match = re.search(pattern, cleaned_answer, re.DOTALL | re.IGNORECASE)
-                if match:
-                    cleaned_answer = cleaned_answer[:match.start()].strip()
-                    print(f"   [후처리] 조리법 제거됨")
-                    break
-
-            # 알레르기/비선호 관련 텍스트 제거 (출력에 포함되면 안됨)
-            allergy_patterns = [
-                r'\*알레르기.*?\n',  # "*알레르기 재료 ..."
-                r'알레르기 재료.*?\n',  # "알레르기 재료 (절대 사용 금지): ..."
-                r'비선호 음식.*?\n',  # "비선호 음식 (피해야 함): ..."
-            ]
-
-            for pattern in allergy_patterns:
-                cleaned_answer = re.sub(pattern, '', cleaned_answer, flags=re.IGNORECASE)
-
-            # 볼드 없는 형식을 볼드 형식으로 통일 (웹 검색 결과 대응)
-            if '소개:' in cleaned_answer and '**소개:**' not in cleaned_answer:
-                cleaned_answer = re.sub(r'(?<!\*)소개:\s*', '**소개:** ', cleaned_answer, count=1)
-            if '재료:' in cleaned_answer and '**재료:**' not in cleaned_answer:
-                cleaned_answer = re.sub(r'(?<!\*)재료:\s*', '**재료:** ', cleaned_answer, count=1)
-
-            # 소개 문구 정제: 이모티콘, 캐주얼 표현 제거
-            if '**소개:**' in cleaned_answer:
-                # 소개 섹션 추출 (같은 줄만, DOTALL 사용하지 않음)
-                intro_match = re.search(r'\*\*소개:\*\*\s*(.+)', cleaned_answer)
-                if intro_match:
-                    intro_text = intro_match.group(1).strip()
-
-                    # 이모티콘 제거 (ᄒ.ᄒ, ᄏᄏ, :), ^^, 등)
-                    intro_text = re.sub(r'[ᄀ-ᄒ]{2,}', '', intro_text)  # ᄏᄏ, ᄒᄒ 등
-                    intro_text = re.sub(r'[:;]\)|:\(|:\)|^^|ㅎㅎ|ㅋㅋ', '', intro_text)
-
-                    # 캐주얼 표현 제거
-                    casual_phrases = [
-                        r'알려드릴게요[!\s]*',
-                        r'드릴게요[!\s]*',
-                        r'[~]+',
-                        r'요[~]+',
-                        r'답니다[:\s]*\)',
-                        r'하죠[!\s]*',
-                        r'그만큼.*?있답니다',
-                        r'레시피를 알려드릴게요',
-                        r'소개해드릴게요',
-                    ]
-                    for phrase in casual_phrases:
-                        intro_text = re.sub(phrase, '', intro_text)
-
-                    # 다중 공백 정리
-                    intro_text = re.sub(r'\s+', ' ', intro_text).strip()
-
-                    # 마침표로 끝나지 않으면 추가
-                    if intro_text and not intro_text.endswith('.'):
-                        intro_text += '.'
-
-                    # 소개 문구 교체 (같은 줄만 교체, DOTALL 사용하지 않음)
-                    cleaned_answer = re.sub(
-                        r'\*\*소개:\*\*\s*.+',
-                        f'**소개:** {intro_text}',
-                        cleaned_answer,
-                        count=1
-                    )
-                    print(f"   [후처리] 소개 정제됨: {intro_text[:50]}...")
-
-            # 재료 형식 정리: 줄바꿈 제거, 쉼표로 변환
-            # "- 재료명 양" 형식을 "재료명 양," 형식으로 변환
-            if '**재료:**' in cleaned_answer:
-                # 재료 섹션 추출
-                parts = cleaned_answer.split('**재료:**')
-                if len(parts) == 2:
-                    before_ingredients = parts[0]
-                    ingredients_section = parts[1].strip()
-
-                    # 줄바꿈으로 구분된 재료들을 쉼표로 변환
-                    # "- 재료명 양" → "재료명 양"
-                    ingredients_lines = []
-                    for line in ingredients_section.split('\n'):
-                        line = line.strip()
-                        if line and not line.startswith('**'):  # 다음 섹션 시작 전까지
-                            # "- " 제거
-                            line = re.sub(r'^[-\*]\s*', '', line)
-                            if line:
-                                ingredients_lines.append(line)
-                        elif line.startswith('**'):
-                            # 다음 섹션 발견, 중단
-                            break
-
-                    # 쉼표로 연결
-                    ingredients_text = ', '.join(ingredients_lines)
-
-                    # 재구성
-                    cleaned_answer = f"{before_ingredients}**재료:** {ingredients_text}"
-                    print(f"   [후처리] 재료 형식 정리됨")
+            cleaned_answer = clean_generation(answer)
+            await _store_answer(state, cleaned_answer)
 
             print(f"   생성 완료: {cleaned_answer[:50]}...")
             return {"generation": cleaned_answer}
@@ -682,7 +1006,11 @@ def create_chat_agent(rag_system):
             return {"generation": "답변 생성에 실패했습니다."}
 
     # ===== 그래프 구성 =====
-    
+
+    def decide_after_cache(state: ChatAgentState) -> Literal["retrieve", "end"]:
+        """시맨틱 캐시 hit면 바로 종료"""
+        return "end" if state.get("answer_cache_hit") else "retrieve"
+
     def decide_to_generate(state: ChatAgentState) -> Literal["web_search", "generate"]:
         """grade 노드 이후 분기 결정"""
         if state.get("web_search_needed") == "yes":
@@ -694,6 +1022,7 @@ def create_chat_agent(rag_system):
 
     # ── 모든 노드를 timed_node로 감싸기 ──
     workflow.add_node("rewrite",          timed_node("rewrite",          rewrite_query))
+    workflow.add_node("semantic_cache",   timed_node("semantic_cache",   semantic_cache_lookup))
     workflow.add_node("retrieve",         timed_node("retrieve",         retrieve))
     workflow.add_node("check_constraints",timed_node("check_constraints",check_constraints))
     workflow.add_node("grade",            timed_node("grade",            grade_documents))
@@ -703,9 +1032,15 @@ def create_chat_agent(rag_system):
 
     workflow.set_entry_point("rewrite")
 
-    workflow.add_edge("rewrite", "retrieve")
-    workflow.add_edge("retrieve", "check_constraints")
-    workflow.add_edge("check_constraints", "grade")
+    # 제약 조건 체크는 캐시 조회 전 (경고가 필요한 질문은 캐시 hit로 경고 없이 답하지 않도록)
+    workflow.add_edge("rewrite", "check_constraints")
+    workflow.add_edge("check_constraints", "semantic_cache")
+    workflow.add_conditional_edges(
+        "semantic_cache",
+        decide_after_cache,
+        {"retrieve": "retrieve", "end": END}
+    )
+    workflow.add_edge("retrieve", "grade")
 
     workflow.add_conditional_edges(
         "grade",
@@ -721,5 +1056,4 @@ def create_chat_agent(rag_system):
     compiled = workflow.compile()
 
     print("[Agent] Adaptive RAG Agent 생성 완료")
-    print(f"[Agent] 검색 엔진: {search_engine}")
     return compiled
\ No newline at end of file
@@ -4,23 +4,34 @@ Chat Agent WebSocket 라우터 - Adaptive RAG + 레시피 수정
 """
 import logging
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
-from typing import Dict
+from typing import Dict, Optional
 import json
 import asyncio
 import time
-from langchain_naver import ChatClovaX
 
 from core.websocket import manager
 from core.dependencies import get_rag_system
-from features.chat.agent import create_chat_agent, _node_timings
-from models.mysql_db import create_session, add_chat_message
+from app.config import settings
+from services.llm import get_llm
+from services.llm_cache import is_bypass_value, set_llm_cache_bypass
+from features.chat.agent import get_chat_agent
+from features.chat.scheduler import RunCancelled, agent_scheduler
+from core.admission import BUSY_MESSAGE, fair_key
+from core.exceptions import ServiceBusyError, SessionStoreUnavailableError
+from core.metrics import current_metrics, finish_request, start_request
+from core.session_store import session_store
+from services.persistence import persistence
 from utils.intent import detect_chat_intent, Intent, extract_allergy_dislike, extract_ingredients_from_modification
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-chat_sessions: Dict[str, dict] = {}
+
+async def _save_session(session_id: str, session: dict) -> None:
+    """세션 저장소 반영"""
+    # Redis 백엔드는 네트워크 왕복 → 이벤트 루프 밖에서
+    await asyncio.to_thread(session_store.save, session_id, session)
 
 
 # ─────────────────────────────────────────────
@@ -60,13 +71,17 @@ def print_token_usage(response, context_name: str = "LLM"):
 
 
 def _print_timing_summary(total_ms: float):
-    if not _node_timings:
+    """요청 종료 시 호출: 현재 요청의 노드별 시간 출력 + 요청 지연시간 히스토그램 기록"""
+    metrics = current_metrics()
+    finish_request(metrics)
+    node_timings = metrics.node_timings
+    if not node_timings:
         return
     logger.info("┌─────────────────────────────────────────┐")
     logger.info("│          Node Timing Summary            │")
     logger.info("├─────────────────────────────────────────┤")
-    for name, ms in _node_timings.items():
-        bar_len = int(ms / max(max(_node_timings.values()), 1) * 20)
+    for name, ms in node_timings.items():
+        bar_len = int(ms / max(max(node_timings.values()), 1) * 20)
         bar = "█" * bar_len + "░" * (20 - bar_len)
         pct = (ms / total_ms * 100) if total_ms > 0 else 0
         sec = ms / 1000
@@ -75,7 +90,101 @@ def _print_timing_summary(total_ms: float):
     total_sec = total_ms / 1000
     logger.info(f"│  {'TOTAL':<18} {'':20} {total_sec:>5.1f}초        │")
     logger.info("└─────────────────────────────────────────┘")
-    _node_timings.clear()
+
+
+async def _run_chat_agent(
+    websocket: WebSocket,
+    session: dict,
+    session_id: str,
+    agent,
+    agent_state: dict,
+    start_time: float,
+    disconnected: asyncio.Event,
+) -> None:
+    """
+    스케줄러로 Agent 실행 → 세션 캐시/메시지 반영 + agent_message 전송
+    타임아웃/연결 종료 시 실행 중인 그래프도 중단 (LLM 호출 중단)
+    """
+    try:
+        start_request("chat")
+        result = await agent_scheduler.run(
+            agent, agent_state, websocket, session_id,
+            disconnected=disconnected,
+            timeout=settings.AGENT_RUN_TIMEOUT,
+            start_time=start_time,
+            admission_key=fair_key(session.get("member_id"), session_id),
+        )
+
+        total_ms = (time.time() - start_time) * 1000
+        _print_timing_summary(total_ms)
+
+        # 캐시 저장
+        agent_docs = result.get("documents", [])
+        agent_response = result.get("generation", "")
+
+        if agent_docs:
+            session["last_documents"] = [
+                {
+                    "content": doc.page_content,
+                    "title": doc.metadata.get("title", ""),
+                    "cook_time": doc.metadata.get("cook_time", ""),
+                    "level": doc.metadata.get("level", ""),
+                    "recipe_id": doc.metadata.get("recipe_id", ""),
+                }
+                for doc in agent_docs
+            ]
+            logger.info(f"[WS] 세션 캐시 저장: {len(agent_docs)}개 문서")
+
+        if agent_response:
+            session["last_agent_response"] = agent_response
+            logger.info(f"[WS] Agent 답변 캐시: {agent_response[:60]}...")
+
+        response = agent_response or "답변을 생성할 수 없습니다."
+
+        session["messages"].append({
+            "role": "assistant",
+            "content": response
+        })
+
+        await websocket.send_json({
+            "type": "agent_message",
+            "content": response
+        })
+
+        total_sec = total_ms / 1000
+        logger.info(f"[WS] 응답 완료 (총 {total_sec:.1f}초)")
+
+    except asyncio.TimeoutError:
+        elapsed = time.time() - start_time
+        logger.warning(f"[WS] ⏱Agent 타임아웃 ({elapsed:.1f}초)")
+        _print_timing_summary(elapsed * 1000)
+
+        await websocket.send_json({
+            "type": "agent_message",
+            "content": f"죄송합니다. 응답 시간이 너무 오래 걸렸어요 ({int(elapsed)}초). 다시 시도해주세요."
+        })
+
+    except ServiceBusyError:
+        logger.warning(f"[WS] 요청 과다로 Agent 실행 거절 (session={session_id})")
+        await websocket.send_json({
+            "type": "agent_message",
+            "content": BUSY_MESSAGE
+        })
+
+    except RunCancelled:
+        elapsed = time.time() - start_time
+        logger.info(f"[WS] 연결 종료로 Agent 실행 중단 ({elapsed:.1f}초)")
+        _print_timing_summary(elapsed * 1000)
+
+    except Exception as e:
+        elapsed = time.time() - start_time
+        logger.error(f"[WS] Agent 실행 에러 ({elapsed:.1f}초): {e}", exc_info=True)
+        _print_timing_summary(elapsed * 1000)
+
+        await websocket.send_json({
+            "type": "error",
+            "message": f"오류가 발생했습니다 ({int(elapsed)}초). 다시 시도해주세요."
+        })
 
 
 async def handle_recipe_modification(websocket: WebSocket, session: Dict, user_input: str):
@@ -150,7 +259,7 @@ async def handle_recipe_modification(websocket: WebSocket, session: Dict, user_i
 
 답변:"""
     
-    llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=800)
+    llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=800)
 
     try:
         result = llm.invoke(modification_prompt)
@@ -294,6 +403,14 @@ async def chat_websocket(
     await websocket.accept()
     logger.info(f"[WS] Connected: {session_id}")
 
+    # 디버깅: 헤더(또는 브라우저용 ?llm_cache_bypass=1)가 있으면 이 연결의 LLM 응답 캐시 조회 생략
+    if is_bypass_value(
+        websocket.headers.get(settings.LLM_CACHE_BYPASS_HEADER)
+        or websocket.query_params.get("llm_cache_bypass")
+    ):
+        set_llm_cache_bypass(True)
+        logger.info(f"[WS] LLM 응답 캐시 bypass: {session_id}")
+
     if not rag_system:
         logger.warning("[WS] RAG 시스템 없음")
         await websocket.send_json({"type": "error", "message": "RAG 시스템을 사용할 수 없습니다."})
@@ -301,10 +418,10 @@ async def chat_websocket(
         return
 
     try:
-        agent = create_chat_agent(rag_system)
+        agent = get_chat_agent(rag_system)
         if not agent:
             raise ValueError("Agent 생성 실패")
-        logger.info("[WS] Adaptive RAG Agent 생성 완료")
+        logger.info("[WS] Adaptive RAG Agent 준비 완료")
     except Exception as e:
         logger.error(f"[WS] Agent 생성 에러: {e}", exc_info=True)
         await websocket.send_json({"type": "error", "message": f"Agent 생성 실패: {str(e)}"})
@@ -317,21 +434,43 @@ async def chat_websocket(
     db_session_id = None
     member_id = 0  # 기본값, init_context에서 업데이트
 
-    if session_id not in chat_sessions:
-        chat_sessions[session_id] = {
-            "messages": [],
-            "user_constraints": {},
-            "last_documents": [],
-            "last_agent_response": "",
-            "db_session_id": None,
-            "member_id": 0,
-            "temp_allowed_dislikes": [],  # 세션 내 임시 허용된 비선호 음식
-            "modification_history": [],  # 레시피 수정 이력 (누적)
-        }
+    # 세션 조회 (다른 워커/재시작 후면 저장소 또는 chatbot 테이블에서 복원)
+    try:
+        session = await asyncio.to_thread(
+            session_store.load, session_id, db_session_id=websocket.query_params.get("db_session_id")
+        )
+    except SessionStoreUnavailableError:
+        # 빈 세션으로 진행하면 종료 시 저장에서 기존 대화를 덮어씀 → 연결 종료
+        await websocket.send_json({"type": "error", "message": "세션을 불러오지 못했어요. 잠시 후 다시 시도해주세요."})
+        await websocket.close()
+        manager.disconnect(session_id)
+        return
+
+    # 수신 전용 태스크: Agent 실행 중에도 연결 종료를 감지해 실행을 취소
+    inbox: asyncio.Queue = asyncio.Queue()
+    disconnected = asyncio.Event()
+
+    async def _receive_loop():
+        try:
+            while True:
+                await inbox.put(await websocket.receive_text())
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.warning(f"[WS] 수신 종료: {e}")
+        finally:
+            disconnected.set()
+            await inbox.put(None)
+
+    receiver_task = asyncio.create_task(_receive_loop())
 
     try:
         while True:
-            data = await websocket.receive_text()
+            # 직전 메시지 처리 결과 반영 (저장소 저장)
+            await _save_session(session_id, session)
+            data = await inbox.get()
+            if data is None:
+                raise WebSocketDisconnect()
             message = json.loads(data)
             msg_type = message.get("type")
             logger.info(f"[WS] 메시지 수신: {msg_type}")
@@ -341,11 +480,11 @@ async def chat_websocket(
                 initial_history = message.get("initial_history", [])
                 modification_history = message.get("modification_history", [])  # ✅ 수정 이력 받기
 
-                chat_sessions[session_id]["user_constraints"] = member_info
+                session["user_constraints"] = member_info
 
                 # 수정 이력 복원 (재생성으로 돌아온 경우)
                 if modification_history:
-                    chat_sessions[session_id]["modification_history"] = modification_history
+                    session["modification_history"] = modification_history
                     logger.info(f"[WS] 🔄 수정 이력 복원: {len(modification_history)}개")
                     for i, mod in enumerate(modification_history, 1):
                         logger.info(f"     [{i}] type={mod.get('type')}, request='{mod.get('request')}'")
@@ -361,15 +500,13 @@ async def chat_websocket(
                     member_id = 0
 
                 if member_id > 0:
-                    chat_sessions[session_id]["member_id"] = member_id
+                    session["member_id"] = member_id
 
                     # DB 세션이 아직 없으면 생성
-                    if not chat_sessions[session_id].get("db_session_id"):
+                    if not session.get("db_session_id"):
                         try:
-                            from models.mysql_db import create_session
-                            db_result = create_session(member_id=member_id)
-                            db_session_id = db_result.get("session_id") if db_result else None
-                            chat_sessions[session_id]["db_session_id"] = db_session_id
+                            db_session_id = await persistence.submit_session(member_id)
+                            session["db_session_id"] = db_session_id
 
                             # 클라이언트로 db_session_id 전송
                             if db_session_id:
@@ -380,7 +517,7 @@ async def chat_websocket(
                                 })
                                 logger.info(f"[WS] DB 세션 생성 완료: db_session_id={db_session_id}, member_id={member_id}")
                             else:
-                                logger.warning(f"[WS] DB 세션 생성 결과가 None: db_result={db_result}")
+                                logger.warning(f"[WS] DB 세션 생성 결과가 None (member_id={member_id})")
                         except Exception as e:
                             logger.error(f"[WS] DB 세션 생성 실패: {e}", exc_info=True)
                 else:
@@ -388,7 +525,7 @@ async def chat_websocket(
 
                 # 초기 히스토리 설정 (레시피 수정 모드용)
                 if initial_history:
-                    chat_sessions[session_id]["messages"].extend(initial_history)
+                    session["messages"].extend(initial_history)
                     logger.info(f"[WS] 초기 히스토리 {len(initial_history)}개 추가")
 
                 logger.info(f"[WS] 컨텍스트 설정: {member_info.get('names', [])}, member_id={member_id}")
@@ -404,11 +541,11 @@ async def chat_websocket(
                 if confirmation == "no":
                     # 거절 → 다른 레시피 제안
                     reject_msg = "알겠습니다. 다른 레시피를 검색해드릴까요? 또는 기존 레시피를 수정해드릴 수도 있습니다."
-                    chat_sessions[session_id]["messages"].append({
+                    session["messages"].append({
                         "role": "assistant",
                         "content": reject_msg
                     })
-                    chat_sessions[session_id].pop("pending_constraint_search", None)
+                    session.pop("pending_constraint_search", None)
 
                     await websocket.send_json({
                         "type": "agent_message",
@@ -419,7 +556,7 @@ async def chat_websocket(
 
                 elif confirmation == "yes":
                     # 승인 → pending_constraint_search로 레시피 생성 진행 & 제약사항에서 제거
-                    pending = chat_sessions[session_id].get("pending_constraint_search")
+                    pending = session.get("pending_constraint_search")
                     if not pending:
                         logger.warning("[WS] pending_constraint_search가 없음")
                         await websocket.send_json({
@@ -435,7 +572,7 @@ async def chat_websocket(
                     logger.info(f"[WS] 제약사항에서 제거할 재료: {conflicted_ingredients}")
 
                     # modification_history에서 충돌 재료 제거 (이번 세션에서만)
-                    modification_history = chat_sessions[session_id].get("modification_history", [])
+                    modification_history = session.get("modification_history", [])
                     updated_history = []
                     for mod in modification_history:
                         if mod.get("type") in ["remove", "replace"]:
@@ -453,24 +590,24 @@ async def chat_websocket(
                         else:
                             updated_history.append(mod)
 
-                    chat_sessions[session_id]["modification_history"] = updated_history
+                    session["modification_history"] = updated_history
                     logger.info(f"[WS] 업데이트된 수정 이력: {len(updated_history)}개")
 
                     # pending_constraint_search 정리
-                    chat_sessions[session_id].pop("pending_constraint_search", None)
+                    session.pop("pending_constraint_search", None)
 
                     # 레시피 검색 진행 (아래의 레시피 검색 모드 로직으로 점프)
                     logger.info(f"[WS] 레시피 검색 모드 시작 (제약사항 충돌 승인 후)")
 
                     chat_history = [
                         f"{msg['role']}: {msg['content']}"
-                        for msg in chat_sessions[session_id]["messages"]
+                        for msg in session["messages"]
                     ]
 
                     await websocket.send_json({"type": "thinking", "message": "레시피 검색 중..."})
 
                     # 업데이트된 수정 이력 전달
-                    modification_history = chat_sessions[session_id].get("modification_history", [])
+                    modification_history = session.get("modification_history", [])
                     logger.info(f"[WS] 수정 이력 전달: {len(modification_history)}개")
                     if modification_history:
                         for i, mod in enumerate(modification_history, 1):
@@ -483,105 +620,12 @@ async def chat_websocket(
                         "documents": [],
                         "generation": "",
                         "web_search_needed": "no",
-                        "user_constraints": chat_sessions[session_id]["user_constraints"],
+                        "user_constraints": session["user_constraints"],
                         "constraint_warning": "",
                         "modification_history": modification_history
                     }
 
-                    async def progress_notifier():
-                        steps = [
-                            (0, "쿼리 재작성 중..."),
-                            (3, "레시피 검색 중..."),
-                            (6, "관련성 평가 중..."),
-                            (10, "답변 생성 중..."),
-                            (15, "거의 완료...")
-                        ]
-                        for delay, msg in steps:
-                            await asyncio.sleep(delay if delay == 0 else 3)
-                            if time.time() - start_time < 20:
-                                await websocket.send_json({
-                                    "type": "progress",
-                                    "message": f"{msg} ({int(time.time() - start_time)}초)"
-                                })
-                            else:
-                                break
-
-                    notifier_task = asyncio.create_task(progress_notifier())
-
-                    try:
-                        _node_timings.clear()
-
-                        async def run_agent():
-                            loop = asyncio.get_event_loop()
-                            return await loop.run_in_executor(None, agent.invoke, agent_state)
-
-                        result = await asyncio.wait_for(run_agent(), timeout=20.0)
-
-                        total_ms = (time.time() - start_time) * 1000
-                        _print_timing_summary(total_ms)
-
-                        # 캐시 저장
-                        agent_docs = result.get("documents", [])
-                        agent_response = result.get("generation", "")
-
-                        if agent_docs:
-                            chat_sessions[session_id]["last_documents"] = [
-                                {
-                                    "content": doc.page_content,
-                                    "title": doc.metadata.get("title", ""),
-                                    "cook_time": doc.metadata.get("cook_time", ""),
-                                    "level": doc.metadata.get("level", ""),
-                                    "recipe_id": doc.metadata.get("recipe_id", ""),
-                                }
-                                for doc in agent_docs
-                            ]
-                            logger.info(f"[WS] 세션 캐시 저장: {len(agent_docs)}개 문서")
-
-                        if agent_response:
-                            chat_sessions[session_id]["last_agent_response"] = agent_response
-                            logger.info(f"[WS] Agent 답변 캐시: {agent_response[:60]}...")
-
-                        response = agent_response or "답변을 생성할 수 없습니다."
-
-                        chat_sessions[session_id]["messages"].append({
-                            "role": "assistant",
-                            "content": response
-                        })
-
-                        await websocket.send_json({
-                            "type": "agent_message",
-                            "content": response
-                        })
-
-                        total_sec = total_ms / 1000
-                        logger.info(f"[WS] 응답 완료 (총 {total_sec:.1f}초)")
-
-                    except asyncio.TimeoutError:
-                        elapsed = time.time() - start_time
-                        logger.warning(f"[WS] ⏱Agent 타임아웃 ({elapsed:.1f}초)")
-                        _print_timing_summary(elapsed * 1000)
-
-                        await websocket.send_json({
-                            "type": "agent_message",
-                            "content": f"죄송합니다. 응답 시간이 너무 오래 걸렸어요 ({int(elapsed)}초). 다시 시도해주세요."
-                        })
-
-                    except Exception as e:
-                        elapsed = time.time() - start_time
-                        logger.error(f"[WS] Agent 실행 에러 ({elapsed:.1f}초): {e}", exc_info=True)
-                        _print_timing_summary(elapsed * 1000)
-
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"오류가 발생했습니다 ({int(elapsed)}초). 다시 시도해주세요."
-                        })
-
-                    finally:
-                        notifier_task.cancel()
-                        try:
-                            await notifier_task
-                        except asyncio.CancelledError:
-                            pass
+                    await _run_chat_agent(websocket, session, session_id, agent, agent_state, start_time, disconnected)
 
                     # 레시피 생성 완료 후 다음 메시지 처리를 위해 continue
                     continue
@@ -600,11 +644,11 @@ async def chat_websocket(
                 if confirmation == "no":
                     # 거절 → 다른 레시피 제안
                     reject_msg = "알겠습니다. 다른 레시피를 검색해드릴까요?"
-                    chat_sessions[session_id]["messages"].append({
+                    session["messages"].append({
                         "role": "assistant",
                         "content": reject_msg
                     })
-                    chat_sessions[session_id].pop("pending_search", None)
+                    session.pop("pending_search", None)
 
                     await websocket.send_json({
                         "type": "agent_message",
@@ -615,7 +659,7 @@ async def chat_websocket(
 
                 elif confirmation == "yes":
                     # 승인 → pending_search로 레시피 생성 진행
-                    pending = chat_sessions[session_id].get("pending_search")
+                    pending = session.get("pending_search")
                     if not pending:
                         logger.warning("[WS] pending_search가 없음")
                         await websocket.send_json({
@@ -631,16 +675,16 @@ async def chat_websocket(
                     logger.info(f"[WS] 임시 제외할 비선호: {matched_dislikes}")
 
                     # 세션에 임시 허용 목록 추가 (이번 세션 내에서만 유효)
-                    if "temp_allowed_dislikes" not in chat_sessions[session_id]:
-                        chat_sessions[session_id]["temp_allowed_dislikes"] = []
-                    chat_sessions[session_id]["temp_allowed_dislikes"].extend(matched_dislikes)
-                    chat_sessions[session_id]["temp_allowed_dislikes"] = list(set(chat_sessions[session_id]["temp_allowed_dislikes"]))
+                    if "temp_allowed_dislikes" not in session:
+                        session["temp_allowed_dislikes"] = []
+                    session["temp_allowed_dislikes"].extend(matched_dislikes)
+                    session["temp_allowed_dislikes"] = list(set(session["temp_allowed_dislikes"]))
 
-                    logger.info(f"[WS] 세션 내 임시 허용된 비선호: {chat_sessions[session_id]['temp_allowed_dislikes']}")
+                    logger.info(f"[WS] 세션 내 임시 허용된 비선호: {session['temp_allowed_dislikes']}")
 
                     # user_constraints에서 매칭된 비선호 임시 제거 (사용자가 "예"를 눌렀으므로)
                     # B는 변경하지 않음! 이번 검색에만 임시로 제거
-                    original_constraints = chat_sessions[session_id]["user_constraints"]
+                    original_constraints = session["user_constraints"]
                     modified_constraints = original_constraints.copy()
 
                     # 비선호 목록에서 매칭된 항목만 임시 제거
@@ -653,7 +697,7 @@ async def chat_websocket(
                     logger.info(f"[WS] 임시 수정된 제약 조건: allergies={modified_constraints.get('allergies', [])}, dislikes={modified_constraints.get('dislikes', [])}")
 
                     # pending_search 정리
-                    chat_sessions[session_id].pop("pending_search", None)
+                    session.pop("pending_search", None)
 
                     # 레시피 검색 진행 (아래의 레시피 검색 모드 로직으로 점프)
                     # 레시피 검색 모드 (RAG 사용)
@@ -661,13 +705,13 @@ async def chat_websocket(
 
                     chat_history = [
                         f"{msg['role']}: {msg['content']}"
-                        for msg in chat_sessions[session_id]["messages"]
+                        for msg in session["messages"]
                     ]
 
                     await websocket.send_json({"type": "thinking", "message": "레시피 검색 중..."})
 
                     # 수정 이력 가져오기
-                    modification_history = chat_sessions[session_id].get("modification_history", [])
+                    modification_history = session.get("modification_history", [])
                     logger.info(f"[WS] 🔧 수정 이력 전달: {len(modification_history)}개")
                     if modification_history:
                         for i, mod in enumerate(modification_history, 1):
@@ -685,100 +729,7 @@ async def chat_websocket(
                         "modification_history": modification_history 
                     }
 
-                    async def progress_notifier():
-                        steps = [
-                            (0, "쿼리 재작성 중..."),
-                            (3, "레시피 검색 중..."),
-                            (6, "관련성 평가 중..."),
-                            (10, "답변 생성 중..."),
-                            (15, "거의 완료...")
-                        ]
-                        for delay, msg in steps:
-                            await asyncio.sleep(delay if delay == 0 else 3)
-                            if time.time() - start_time < 20:
-                                await websocket.send_json({
-                                    "type": "progress",
-                                    "message": f"{msg} ({int(time.time() - start_time)}초)"
-                                })
-                            else:
-                                break
-
-                    notifier_task = asyncio.create_task(progress_notifier())
-
-                    try:
-                        _node_timings.clear()
-
-                        async def run_agent():
-                            loop = asyncio.get_event_loop()
-                            return await loop.run_in_executor(None, agent.invoke, agent_state)
-
-                        result = await asyncio.wait_for(run_agent(), timeout=20.0)
-
-                        total_ms = (time.time() - start_time) * 1000
-                        _print_timing_summary(total_ms)
-
-                        # 캐시 저장
-                        agent_docs = result.get("documents", [])
-                        agent_response = result.get("generation", "")
-
-                        if agent_docs:
-                            chat_sessions[session_id]["last_documents"] = [
-                                {
-                                    "content": doc.page_content,
-                                    "title": doc.metadata.get("title", ""),
-                                    "cook_time": doc.metadata.get("cook_time", ""),
-                                    "level": doc.metadata.get("level", ""),
-                                    "recipe_id": doc.metadata.get("recipe_id", ""),
-                                }
-                                for doc in agent_docs
-                            ]
-                            logger.info(f"[WS] 세션 캐시 저장: {len(agent_docs)}개 문서")
-
-                        if agent_response:
-                            chat_sessions[session_id]["last_agent_response"] = agent_response
-                            logger.info(f"[WS] Agent 답변 캐시: {agent_response[:60]}...")
-
-                        response = agent_response or "답변을 생성할 수 없습니다."
-
-                        chat_sessions[session_id]["messages"].append({
-                            "role": "assistant",
-                            "content": response
-                        })
-
-                        await websocket.send_json({
-                            "type": "agent_message",
-                            "content": response
-                        })
-
-                        total_sec = total_ms / 1000
-                        logger.info(f"[WS] 응답 완료 (총 {total_sec:.1f}초)")
-
-                    except asyncio.TimeoutError:
-                        elapsed = time.time() - start_time
-                        logger.warning(f"[WS] ⏱Agent 타임아웃 ({elapsed:.1f}초)")
-                        _print_timing_summary(elapsed * 1000)
-
-                        await websocket.send_json({
-                            "type": "agent_message",
-                            "content": f"죄송합니다. 응답 시간이 너무 오래 걸렸어요 ({int(elapsed)}초). 다시 시도해주세요."
-                        })
-
-                    except Exception as e:
-                        elapsed = time.time() - start_time
-                        logger.error(f"[WS] Agent 실행 에러 ({elapsed:.1f}초): {e}", exc_info=True)
-                        _print_timing_summary(elapsed * 1000)
-
-                        await websocket.send_json({
-                            "type": "error",
-                            "message": f"오류가 발생했습니다 ({int(elapsed)}초). 다시 시도해주세요."
-                        })
-
-                    finally:
-                        notifier_task.cancel()
-                        try:
-                            await notifier_task
-                        except asyncio.CancelledError:
-                            pass
+                    await _run_chat_agent(websocket, session, session_id, agent, agent_state, start_time, disconnected)
 
                     # 레시피 생성 완료 후 다음 메시지 처리를 위해 continue
                     continue
@@ -798,7 +749,7 @@ async def chat_websocket(
                 # PII(개인정보) + 욕설/비속어 + 유해 입력 감지
                 try:
                     from langchain_core.messages import HumanMessage as _HM
-                    safety_llm = ChatClovaX(model="HCX-DASH-001", temperature=0.1, max_tokens=10)
+                    safety_llm = get_llm(model="HCX-DASH-001", temperature=0.1, max_tokens=10)
                     safety_result = safety_llm.invoke([_HM(content=f"""입력의 유해성을 판단하세요.
 
 입력: "{content}"
@@ -820,7 +771,7 @@ async def chat_websocket(
                         logger.info(f"[WS] AI Safety 감지 → 차단: {content[:50]}")
                         block_msg = "해당 내용에는 응답할 수 없습니다. 적절한 내용으로 다시 질문해주세요."
 
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": block_msg
                         })
@@ -838,22 +789,22 @@ async def chat_websocket(
                     logger.warning(f"[WS] AI Safety 감지 실패 (무시하고 진행): {e}")
 
                 # 사용자 메시지 히스토리에 추가
-                chat_sessions[session_id]["messages"].append({
+                session["messages"].append({
                     "role": "user",
                     "content": content
                 })
 
                 # 의도 분류
-                user_intent = detect_chat_intent(content, chat_sessions[session_id]["messages"])
+                user_intent = detect_chat_intent(content, session["messages"])
                 logger.info(f"[WS] 의도 분류: {user_intent}")
 
                 # 알러지/비선호 감지 (회원만, 레시피 검색/수정이 아닐 때만)
-                member_id = chat_sessions[session_id].get("member_id", 0)
+                member_id = session.get("member_id", 0)
                 if member_id > 0 and user_intent not in [Intent.RECIPE_SEARCH, Intent.RECIPE_MODIFY]:
                     # chat_history를 전달하여 레시피 존재 여부 확인
                     allergy_dislike_data = extract_allergy_dislike(
                         content,
-                        chat_history=chat_sessions[session_id]["messages"]
+                        chat_history=session["messages"]
                     )
                     if allergy_dislike_data.get("type"):
                         detected_type = allergy_dislike_data["type"]
@@ -867,7 +818,7 @@ async def chat_websocket(
                         else:
                             response_msg = "알겠습니다."
 
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": response_msg
                         })
@@ -897,7 +848,7 @@ async def chat_websocket(
                         logger.info(f"[WS] RAG 검색 결과 없음 → 외부 챗봇 리다이렉트")
                         redirect_msg = "레시피 외의 질문은 외부 챗봇을 이용해 주세요."
 
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": redirect_msg
                         })
@@ -919,7 +870,7 @@ async def chat_websocket(
                     # 대화 히스토리 포함
                     chat_history_text = "\n".join([
                         f"{msg['role']}: {msg['content'][:200]}"
-                        for msg in chat_sessions[session_id]["messages"][-5:]
+                        for msg in session["messages"][-5:]
                     ])
 
                     question_prompt = f"""요리 전문가로서 질문에 답변하세요.
@@ -939,11 +890,11 @@ async def chat_websocket(
 답변:"""
 
                     try:
-                        llm = ChatClovaX(model="HCX-DASH-001", temperature=0.2, max_tokens=200)
+                        llm = get_llm(model="HCX-DASH-001", temperature=0.2, max_tokens=200)
                         result = llm.invoke(question_prompt)
                         answer = result.content.strip()
 
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": answer
                         })
@@ -965,7 +916,7 @@ async def chat_websocket(
                 # 3. 레시피 수정 모드 처리
                 if user_intent == Intent.RECIPE_MODIFY:
                     # 알레르기 재료 체크 (추가/대체 요청에 알레르기 재료가 포함되어 있는지)
-                    user_constraints = chat_sessions[session_id].get("user_constraints", {})
+                    user_constraints = session.get("user_constraints", {})
                     user_allergies = user_constraints.get("allergies", [])
 
                     if user_allergies:
@@ -976,7 +927,7 @@ async def chat_websocket(
                             allergy_block_msg = f"알레르기 재료({', '.join(matched_allergies)})가 포함되어 있어 해당 수정을 진행할 수 없습니다. 다른 재료로 변경해주세요."
                             logger.info(f"[WS] 레시피 수정 시 알레르기 재료 감지 → 차단: {matched_allergies}")
 
-                            chat_sessions[session_id]["messages"].append({
+                            session["messages"].append({
                                 "role": "assistant",
                                 "content": allergy_block_msg
                             })
@@ -993,7 +944,7 @@ async def chat_websocket(
 
                     modification_success = await handle_recipe_modification(
                         websocket,
-                        chat_sessions[session_id],
+                        session,
                         content
                     )
 
@@ -1009,7 +960,7 @@ async def chat_websocket(
 
                 # 수정 이력의 제약사항과 충돌 체크 (모든 사용자)
                 if user_intent == Intent.RECIPE_SEARCH:
-                    modification_history = chat_sessions[session_id].get("modification_history", [])
+                    modification_history = session.get("modification_history", [])
 
                     # remove/replace 타입에서 제거할 재료(remove_ingredients)만 수집
                     constrained_ingredients = []
@@ -1034,13 +985,13 @@ async def chat_websocket(
                             logger.info(f"[WS] 제약사항 충돌 감지: {conflicted_ingredients}")
 
                             # pending_constraint_search 상태 저장
-                            chat_sessions[session_id]["pending_constraint_search"] = {
+                            session["pending_constraint_search"] = {
                                 "query": content,
                                 "conflicted_ingredients": conflicted_ingredients
                             }
 
                             # 히스토리에 경고 메시지 추가
-                            chat_sessions[session_id]["messages"].append({
+                            session["messages"].append({
                                 "role": "assistant",
                                 "content": warning_msg
                             })
@@ -1059,12 +1010,12 @@ async def chat_websocket(
 
                 # 알러지/비선호 재료가 포함된 검색인지 확인 (회원만)
                 if user_intent == Intent.RECIPE_SEARCH and member_id > 0:
-                    user_constraints = chat_sessions[session_id].get("user_constraints", {})
+                    user_constraints = session.get("user_constraints", {})
                     user_allergies = user_constraints.get("allergies", [])
                     user_dislikes = user_constraints.get("dislikes", [])
 
                     # 세션 내 임시 허용된 비선호 음식 가져오기
-                    temp_allowed = chat_sessions[session_id].get("temp_allowed_dislikes", [])
+                    temp_allowed = session.get("temp_allowed_dislikes", [])
 
                     # 검색어에 알러지/비선호 재료가 포함되어 있는지 확인
                     matched_allergies = [item for item in user_allergies if item in content]
@@ -1078,7 +1029,7 @@ async def chat_websocket(
                         logger.info(f"[WS] 알러지 재료 감지 → 생성 차단: {matched_allergies}")
 
                         # 히스토리에 차단 메시지 추가
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": allergy_block_msg
                         })
@@ -1100,14 +1051,14 @@ async def chat_websocket(
                         logger.info(f"[WS] 비선호 음식 감지: {matched_dislikes}")
 
                         # pending_search 상태 저장 (비선호만 저장)
-                        chat_sessions[session_id]["pending_search"] = {
+                        session["pending_search"] = {
                             "query": content,
                             "user_constraints": user_constraints,
                             "matched_dislikes": matched_dislikes
                         }
 
                         # 히스토리에 경고 메시지 추가
-                        chat_sessions[session_id]["messages"].append({
+                        session["messages"].append({
                             "role": "assistant",
                             "content": warning_msg
                         })
@@ -1126,13 +1077,13 @@ async def chat_websocket(
 
                 chat_history = [
                     f"{msg['role']}: {msg['content']}"
-                    for msg in chat_sessions[session_id]["messages"]
+                    for msg in session["messages"]
                 ]
 
                 await websocket.send_json({"type": "thinking", "message": "레시피 검색 중..."})
 
                 # 수정 이력 가져오기
-                modification_history = chat_sessions[session_id].get("modification_history", [])
+                modification_history = session.get("modification_history", [])
                 logger.info(f"[WS] 수정 이력 전달: {len(modification_history)}개")
                 if modification_history:
                     for i, mod in enumerate(modification_history, 1):
@@ -1145,121 +1096,30 @@ async def chat_websocket(
                     "documents": [],
                     "generation": "",
                     "web_search_needed": "no",
-                    "user_constraints": chat_sessions[session_id]["user_constraints"],
+                    "user_constraints": session["user_constraints"],
                     "constraint_warning": "",
                     "modification_history": modification_history  
                 }
 
-                async def progress_notifier():
-                    steps = [
-                        (0, "쿼리 재작성 중..."), 
-                        (3, "레시피 검색 중..."), 
-                        (6, "관련성 평가 중..."), 
-                        (10, "답변 생성 중..."), 
-                        (15, "거의 완료...")
-                    ]
-                    for delay, msg in steps:
-                        await asyncio.sleep(delay if delay == 0 else 3)
-                        if time.time() - start_time < 20:
-                            await websocket.send_json({
-                                "type": "progress", 
-                                "message": f"{msg} ({int(time.time() - start_time)}초)"
-                            })
-                        else:
-                            break
-
-                notifier_task = asyncio.create_task(progress_notifier())
-
-                try:
-                    _node_timings.clear()
-
-                    async def run_agent():
-                        loop = asyncio.get_event_loop()
-                        return await loop.run_in_executor(None, agent.invoke, agent_state)
-
-                    result = await asyncio.wait_for(run_agent(), timeout=20.0)
-
-                    total_ms = (time.time() - start_time) * 1000
-                    _print_timing_summary(total_ms)
-
-                    # 캐시 저장
-                    agent_docs = result.get("documents", [])
-                    agent_response = result.get("generation", "")
-
-                    if agent_docs:
-                        chat_sessions[session_id]["last_documents"] = [
-                            {
-                                "content": doc.page_content,
-                                "title": doc.metadata.get("title", ""),
-                                "cook_time": doc.metadata.get("cook_time", ""),
-                                "level": doc.metadata.get("level", ""),
-                                "recipe_id": doc.metadata.get("recipe_id", ""),
-                            }
-                            for doc in agent_docs
-                        ]
-                        logger.info(f"[WS] 세션 캐시 저장: {len(agent_docs)}개 문서")
-
-                    if agent_response:
-                        chat_sessions[session_id]["last_agent_response"] = agent_response
-                        logger.info(f"[WS] Agent 답변 캐시: {agent_response[:60]}...")
-
-                    response = agent_response or "답변을 생성할 수 없습니다."
-
-                    chat_sessions[session_id]["messages"].append({
-                        "role": "assistant", 
-                        "content": response
-                    })
-                    
-                    await websocket.send_json({
-                        "type": "agent_message", 
-                        "content": response
-                    })
-                    
-                    total_sec = total_ms / 1000
-                    logger.info(f"[WS] 응답 완료 (총 {total_sec:.1f}초)")
-
-                except asyncio.TimeoutError:
-                    elapsed = time.time() - start_time
-                    logger.warning(f"[WS] Agent 타임아웃 ({elapsed:.1f}초)")
-                    _print_timing_summary(elapsed * 1000)
-                    
-                    await websocket.send_json({
-                        "type": "agent_message",
-                        "content": f"죄송합니다. 응답 시간이 너무 오래 걸렸어요 ({int(elapsed)}초). 다시 시도해주세요."
-                    })
-                    
-                except Exception as e:
-                    elapsed = time.time() - start_time
-                    logger.error(f"[WS] Agent 실행 에러 ({elapsed:.1f}초): {e}", exc_info=True)
-                    _print_timing_summary(elapsed * 1000)
-                    
-                    await websocket.send_json({
-                        "type": "error", 
-                        "message": f"오류가 발생했습니다 ({int(elapsed)}초). 다시 시도해주세요."
-                    })
-                    
-                finally:
-                    notifier_task.cancel()
-                    try:
-                        await notifier_task
-                    except asyncio.CancelledError:
-                        pass
+                await _run_chat_agent(websocket, session, session_id, agent, agent_state, start_time, disconnected)
 
     except WebSocketDisconnect:
         logger.info(f"[WS] Disconnected: {session_id}")
     except Exception as e:
         logger.error(f"[WS] 에러: {e}", exc_info=True)
     finally:
+        receiver_task.cancel()
+        await _save_session(session_id, session)
         manager.disconnect(session_id)
         logger.info(f"[WS] Closed: {session_id}")
 
 
 @router.get("/session/{session_id}")
-async def get_chat_session(session_id: str):
+async def get_chat_session(session_id: str, db_session_id: Optional[int] = None):
     logger.info(f"[Chat API] 세션 조회: {session_id}")
-    if session_id not in chat_sessions:
+    session = await asyncio.to_thread(session_store.load, session_id, db_session_id=db_session_id, create=False)
+    if session is None:
         raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다")
-    session = chat_sessions[session_id]
     return {
         "session_id": session_id,
         "messages": session.get("messages", []),
@@ -0,0 +1,208 @@
+# features/chat/scheduler.py
+"""
+Chat Agent 실행 스케줄러
+
+- 동시 실행 수는 core.admission (모델 "HCX-003" 예산, 사용자별 공정 대기열, 대기 순번 progress 전송)
+- 타임아웃(진입 허가 후부터 계산, 대기 시간은 ADMISSION_MAX_WAIT로 따로 제한) / 클라이언트 연결 종료 시 실행 취소
+  · 실행 중인 LLM 호출(async)은 태스크 취소로 즉시 중단
+  · sync 노드(executor 스레드)는 끝까지 돌지만, 다음 노드 시작 전 check_cancelled()에서 중단
+- 진행 상황(progress)은 고정 sleep 대신 실제 노드 완료 시점에 전송, 첫 토큰(agent_delta) 이후 중단
+"""
+import asyncio
+import itertools
+import time
+from contextvars import ContextVar
+from typing import Any, Dict, Optional
+
+from fastapi import WebSocket
+
+from core.admission import admission
+
+
+class RunCancelled(Exception):
+    """실행 취소 (timeout | disconnect)"""
+
+
+class AgentRun:
+    """실행 1건의 취소 플래그"""
+
+    def __init__(self, run_id: int, session_id: str):
+        self.run_id = run_id
+        self.session_id = session_id
+        self.started_at = time.time()
+        self.cancelled = False
+        self.reason = ""
+
+    def cancel(self, reason: str) -> None:
+        self.cancelled = True
+        self.reason = reason
+
+
+_current_run: ContextVar[Optional[AgentRun]] = ContextVar("agent_run", default=None)
+
+
+def check_cancelled(node: str = "") -> None:
+    """노드 시작 전 호출: 현재 실행이 취소됐으면 RunCancelled"""
+    run = _current_run.get()
+    if run is not None and run.cancelled:
+        print(f"[Scheduler] run#{run.run_id} 취소됨 ({run.reason}) → {node} 건너뜀")
+        raise RunCancelled(run.reason)
+
+
+# 노드 완료 → 다음 단계 안내
+_NEXT_STEP = {
+    "rewrite": "레시피 검색 중...",
+    "retrieve": "관련성 평가 중...",
+    "web_search": "답변 생성 중...",
+}
+
+
+def _progress_after(node: str, update: Any) -> Optional[str]:
+    if node == "grade":
+        needs_web = isinstance(update, dict) and update.get("web_search_needed") == "yes"
+        return "웹 검색 중..." if needs_web else "답변 생성 중..."
+    return _NEXT_STEP.get(node)
+
+
+class AgentRunScheduler:
+    """진입 제어 + 취소 가능한 Agent 실행"""
+
+    def __init__(self, model: str = "HCX-003"):
+        self.model = model  # 진입 제어 예산 구분 (Agent 답변 생성 모델)
+        self._ids = itertools.count(1)
+        self.active: Dict[int, AgentRun] = {}
+        self.waiting = 0
+        self.counts = {"started": 0, "completed": 0, "timeout": 0, "disconnect": 0, "failed": 0}
+
+    async def run(
+        self,
+        agent,
+        agent_state: dict,
+        websocket: WebSocket,
+        session_id: str,
+        disconnected: Optional[asyncio.Event] = None,
+        timeout: float = 20.0,
+        start_time: Optional[float] = None,
+        admission_key: str = "",
+    ) -> dict:
+        """
+        Agent 실행 → 최종 state
+        timeout은 진입 허가(admission.acquire) 이후부터 계산
+        timeout 초과 시 asyncio.TimeoutError, 연결 종료 시 RunCancelled("disconnect"),
+        대기열 초과 시 ServiceBusyError
+        """
+        run = AgentRun(next(self._ids), session_id)
+        start_time = start_time or run.started_at
+        admitted = asyncio.Event()
+        task = asyncio.create_task(
+            self._execute(run, agent, agent_state, websocket, start_time, admission_key or session_id, admitted)
+        )
+        gate = asyncio.create_task(admitted.wait())
+        waiters = {task}
+        watcher = None
+        if disconnected is not None:
+            watcher = asyncio.create_task(disconnected.wait())
+            waiters.add(watcher)
+
+        try:
+            # 1) 진입 대기 (ADMISSION_MAX_WAIT 초과 시 task가 ServiceBusyError로 끝남)
+            done, _ = await asyncio.wait(waiters | {gate}, return_when=asyncio.FIRST_COMPLETED)
+            if gate in done and not done & waiters:
+                # 2) 실행: 여기서부터 timeout
+                done, _ = await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            gate.cancel()
+            if watcher is not None:
+                watcher.cancel()
+
+        if task in done:
+            return task.result()
+
+        reason = "disconnect" if watcher is not None and watcher in done else "timeout"
+        run.cancel(reason)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.counts[reason] += 1
+        print(f"[Scheduler] run#{run.run_id} 취소 ({reason}, {time.time() - run.started_at:.1f}초)")
+        if reason == "timeout":
+            raise asyncio.TimeoutError()
+        raise RunCancelled(reason)
+
+    async def _execute(
+        self,
+        run: AgentRun,
+        agent,
+        agent_state: dict,
+        websocket: WebSocket,
+        start_time: float,
+        key: str,
+        admitted: asyncio.Event,
+    ) -> dict:
+        async def _on_position(position: int) -> None:
+            await self._send_progress(websocket, f"요청이 많아 대기 중... ({position}번째)", start_time)
+
+        self.waiting += 1
+        try:
+            await admission.acquire(self.model, key, on_position=_on_position)
+        finally:
+            self.waiting -= 1
+        run.started_at = time.time()
+        admitted.set()
+
+        token = _current_run.set(run)
+        self.active[run.run_id] = run
+        self.counts["started"] += 1
+        try:
+            result = await self._stream(run, agent, agent_state, websocket, start_time)
+            self.counts["completed"] += 1
+            return result
+        except (asyncio.CancelledError, RunCancelled):
+            raise
+        except Exception:
+            self.counts["failed"] += 1
+            raise
+        finally:
+            self.active.pop(run.run_id, None)
+            _current_run.reset(token)
+            admission.release(self.model)
+
+    async def _stream(self, run: AgentRun, agent, agent_state: dict, websocket: WebSocket, start_time: float) -> dict:
+        """generate 노드 토큰은 agent_delta로 즉시 전달, 노드 완료마다 progress 전송 (첫 토큰 전까지)"""
+        final_state = agent_state
+        streaming = False
+        await self._send_progress(websocket, "쿼리 재작성 중...", start_time)
+
+        async for mode, chunk in agent.astream(agent_state, stream_mode=["custom", "updates", "values"]):
+            if run.cancelled:
+                raise RunCancelled(run.reason)
+            if mode == "values":
+                final_state = chunk
+            elif mode == "updates":
+                if streaming:
+                    continue
+                for node, update in chunk.items():
+                    message = _progress_after(node, update)
+                    if message:
+                        await self._send_progress(websocket, message, start_time)
+            elif chunk.get("type") == "agent_delta":
+                streaming = True
+                await websocket.send_json({"type": "agent_delta", "content": chunk["content"]})
+        return final_state
+
+    @staticmethod
+    async def _send_progress(websocket: WebSocket, message: str, start_time: float) -> None:
+        await websocket.send_json({
+            "type": "progress",
+            "message": f"{message} ({int(time.time() - start_time)}초)"
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": len(self.active),
+            "waiting": self.waiting,
+            **self.counts,
+        }
+
+
+# 프로세스 단위 싱글톤
+agent_scheduler = AgentRunScheduler()
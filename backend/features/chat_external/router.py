@@ -8,6 +8,8 @@ import os
 import logging
 from dotenv import load_dotenv
 
+from services.llm import get_llm
+
 # 환경변수 로드
 load_dotenv()
 
@@ -34,19 +36,12 @@ async def external_chat_websocket(websocket: WebSocket, session_id: str):
         return
     
     try:
-        try:
-            from langchain_naver import ChatClovaX
-            logger.info("[External WS] langchain_naver 사용")
-        except ImportError:
-            from langchain_community.chat_models import ChatClovaX
-            logger.info("[External WS] langchain_community 사용")
-        
-        chat_model = ChatClovaX(
+        chat_model = get_llm(
             model="HCX-DASH-001",
             temperature=0.2,
             max_tokens=500,
         )
-        logger.info("[External WS] ChatClovaX 초기화 완료")
+        logger.info("[External WS] ChatClovaX 준비 완료 (공용 클라이언트)")
         
         while True:
             data = await websocket.receive_text()
@@ -13,9 +13,7 @@ from core.dependencies import get_rag_system
 from core.exceptions import SessionNotFoundError
 from features.cooking.agent import CookingAgent
 from features.cooking.session import CookingSession
-from models.mysql_db import (
-    create_session, add_chat_message, save_voice
-)
+from services.persistence import persistence
 
 
 router = APIRouter()
@@ -68,8 +66,7 @@ async def cooking_websocket(
                     db_session_id = None
                     if member_id > 0:
                         try:
-                            db_session = create_session(member_id)
-                            db_session_id = db_session.get("session_id")
+                            db_session_id = await persistence.submit_session(member_id)
                             print(f"[Cook WS] MySQL 세션 생성: {db_session_id}")
                         except Exception as e:
                             print(f"[Cook WS] MySQL 세션 생성 실패: {e}")
@@ -92,17 +89,15 @@ async def cooking_websocket(
                         # TTS를 voice 테이블에 저장
                         if db_session_id and member_id > 0:
                             try:
-                                # 먼저 chatbot 메시지 추가 (AGENT 역할)
-                                chat_result = add_chat_message(
+                                # 먼저 chatbot 메시지 추가 (AGENT 역할) → chat_id 확정 후 voice 저장 (write-behind)
+                                chat_id = persistence.submit_chat(
                                     member_id=member_id,
                                     session_id=db_session_id,
                                     role="AGENT",
                                     text=msg,
                                     msg_type="DEFAULT"
                                 )
-                                chat_id = chat_result.get("chat_id")
-                                # voice 저장
-                                save_voice(
+                                persistence.submit_voice(
                                     chat_id=chat_id,
                                     member_id=member_id,
                                     voice_type="TTS",
@@ -141,18 +136,16 @@ async def cooking_websocket(
                 db_session_id = session_data.get("db_session_id")
                 user_text = data.get("text", "")
 
-                # 사용자 메시지 저장
-                user_chat_id = None
+                # 사용자 메시지 저장 (write-behind)
                 if db_session_id and member_id > 0:
                     try:
-                        chat_result = add_chat_message(
+                        persistence.submit_chat(
                             member_id=member_id,
                             session_id=db_session_id,
                             role="USER",
                             text=user_text,
                             msg_type="DEFAULT"
                         )
-                        user_chat_id = chat_result.get("chat_id")
                     except Exception as e:
                         print(f"[Cook WS] 사용자 메시지 저장 실패: {e}")
 
@@ -167,15 +160,14 @@ async def cooking_websocket(
                 # Agent 응답 저장 + TTS voice 저장
                 if db_session_id and member_id > 0:
                     try:
-                        chat_result = add_chat_message(
+                        chat_id = persistence.submit_chat(
                             member_id=member_id,
                             session_id=db_session_id,
                             role="AGENT",
                             text=result["response"],
                             msg_type="DEFAULT"
                         )
-                        chat_id = chat_result.get("chat_id")
-                        save_voice(
+                        persistence.submit_voice(
                             chat_id=chat_id,
                             member_id=member_id,
                             voice_type="TTS",
@@ -233,17 +225,16 @@ async def upload_audio(
         # STT 결과 저장 (사용자 음성 입력)
         if db_session_id and member_id > 0 and result.get("user_text"):
             try:
-                # 사용자 메시지 저장
-                user_chat = add_chat_message(
+                # 사용자 메시지 저장 (write-behind, voice는 chat_id 확정 후)
+                user_chat_id = persistence.submit_chat(
                     member_id=member_id,
                     session_id=db_session_id,
                     role="USER",
                     text=result["user_text"],
                     msg_type="DEFAULT"
                 )
-                user_chat_id = user_chat.get("chat_id")
                 # STT voice 저장
-                save_voice(
+                persistence.submit_voice(
                     chat_id=user_chat_id,
                     member_id=member_id,
                     voice_type="STT",
@@ -252,16 +243,15 @@ async def upload_audio(
                 )
 
                 # Agent 응답 저장
-                agent_chat = add_chat_message(
+                agent_chat_id = persistence.submit_chat(
                     member_id=member_id,
                     session_id=db_session_id,
                     role="AGENT",
                     text=result["response"],
                     msg_type="DEFAULT"
                 )
-                agent_chat_id = agent_chat.get("chat_id")
                 # TTS voice 저장
-                save_voice(
+                persistence.submit_voice(
                     chat_id=agent_chat_id,
                     member_id=member_id,
                     voice_type="TTS",
@@ -5,6 +5,7 @@ from fastapi import APIRouter, HTTPException, Query
 from typing import List
 from datetime import datetime, timedelta
 from features.ranking.schemas import RecipeDetail, RecipePreview, RankingResponse
+from services.image_resolver import image_resolver
 
 router = APIRouter()
 
@@ -83,6 +84,9 @@ async def load_today_ranking_cache():
 
     RANKING_CACHE["updated_at"] = now
 
+    # 랭킹 레시피 이미지는 이미 조회했으므로 이미지 캐시도 채움
+    image_resolver.prime(recipes_raw)
+
     print(f"✅ 랭킹 캐시 완료 ({len(previews)}개)")
 
 
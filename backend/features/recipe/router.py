@@ -5,10 +5,16 @@ Recipe REST API 라우터
 import os
 import json
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from pymongo import MongoClient
 
-from core.dependencies import get_rag_system
+from core.admission import admission, fair_key
+from core.dependencies import get_rag_system, require_internal_token
+from core.session_store import session_store
+from services.image_resolver import ensure_title_norm
+from services.semantic_cache import semantic_cache
+from services.title_index import title_index
 from core.exceptions import RAGNotAvailableError
 from features.recipe.service import RecipeService
 from features.recipe.schemas import RecipeGenerateRequest
@@ -16,8 +22,9 @@ from .prompts import RECIPE_QUERY_EXTRACTION_PROMPT, RECIPE_GENERATION_PROMPT
 from models.mysql_db import (
     save_my_recipe, get_my_recipes, get_my_recipe, delete_my_recipe, update_my_recipe,
     get_member_personalization, get_member_by_id,
-    create_generate, get_generate, get_session_generates
+    get_generate, get_session_generates
 )
+from services.persistence import persistence
 
 router = APIRouter()
 
@@ -210,10 +217,19 @@ def get_user_profile_from_db(member_id: int) -> dict:
     }
 
 
+def _log_generate_saved(future: asyncio.Future) -> None:
+    if future.cancelled():
+        return
+    if future.exception() is not None:
+        print(f"[Recipe API] generate 저장 실패: {future.exception()}")
+    else:
+        print(f"[Recipe API] generate 테이블 저장 완료: ID={future.result()}")
+
+
 @router.post("/generate")
 async def generate_recipe(
     request: RecipeGenerateRequest,
-    background_tasks: BackgroundTasks,
+    http_request: Request,
     rag_system = Depends(get_rag_system)
 ):
     """레시피 생성 (대화 히스토리 반영) - generate 테이블에 저장"""
@@ -237,40 +253,32 @@ async def generate_recipe(
 
     service = RecipeService(rag_system, None, user_profile)
 
+    client_host = http_request.client.host if http_request.client else ""
+    queue_key = fair_key(member_id, client_host)
+
     try:
-        recipe_data = await service.generate_recipe(
-            chat_history=request.chat_history,
-            member_info=request.member_info
-        )
+        # 진입 제어: 대기열이 가득 차면 503 (ServiceBusyError)
+        async with admission.slot("HCX-DASH-003", queue_key):
+            recipe_data = await service.generate_recipe(
+                chat_history=request.chat_history,
+                member_info=request.member_info
+            )
 
-        generate_id = None
-        # 백그라운드로 generate 테이블에 저장
-        def save_to_generate():
-            nonlocal generate_id
-            try:
-                # session_id가 없으면 None으로 저장 (직접 호출 시)
-                session_id = request.member_info.get('session_id') if request.member_info else None
-                if session_id and str(session_id).isdigit():
-                    session_id = int(session_id)
-                else:
-                    session_id = None
-
-                result = create_generate(
-                    session_id=session_id,
-                    member_id=member_id,
-                    recipe_name=recipe_data.get('title', '추천 레시피'),
-                    ingredients=recipe_data.get('ingredients', []),
-                    steps=recipe_data.get('steps', []),
-                    gen_type="FIRST"
-                )
-                generate_id = result.get('generate_id')
-                print(f"[Recipe API] generate 테이블 저장 완료: ID={generate_id}")
-            except Exception as e:
-                print(f"[Recipe API] generate 저장 실패: {e}")
+        # generate 테이블 저장은 write-behind 큐로 (session_id가 없으면 None으로 저장 - 직접 호출 시)
+        session_id = request.member_info.get('session_id') if request.member_info else None
+        session_id = int(session_id) if session_id and str(session_id).isdigit() else None
 
-        background_tasks.add_task(save_to_generate)
+        saved = persistence.submit_generate(
+            session_id=session_id,
+            member_id=member_id,
+            recipe_name=recipe_data.get('title', '추천 레시피'),
+            ingredients=recipe_data.get('ingredients', []),
+            steps=recipe_data.get('steps', []),
+            gen_type="FIRST"
+        )
+        saved.add_done_callback(_log_generate_saved)
 
-        # 즉시 응답 (generate_id는 백그라운드 저장 후 결정됨)
+        # 즉시 응답 (generate_id는 큐 기록 후 결정됨)
         return {
             "recipe": recipe_data,
             "member_id": member_id,
@@ -278,6 +286,8 @@ async def generate_recipe(
             "constraints": request.member_info or {}
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Recipe API] 에러 발생: {e}")
         import traceback
@@ -288,7 +298,7 @@ async def generate_recipe(
 @router.post("/generate-from-chat")
 async def generate_recipe_from_chat(
     session_id: str,
-    background_tasks: BackgroundTasks,
+    db_session_id: Optional[int] = None,
     rag_system = Depends(get_rag_system)
 ):
     """채팅 세션에서 레시피 생성 → generate 테이블에 저장"""
@@ -296,15 +306,14 @@ async def generate_recipe_from_chat(
     print("[Recipe API] 채팅 세션에서 레시피 생성")
     print("="*60)
 
-    from features.chat.router import chat_sessions
-
-    if session_id not in chat_sessions:
+    # 다른 워커에서 열린 세션도 공유 저장소(또는 chatbot 테이블)에서 조회
+    session = await asyncio.to_thread(session_store.load, session_id, db_session_id=db_session_id, create=False)
+    if session is None:
         raise HTTPException(status_code=404, detail="세션을 찾을 수 없습니다")
 
     if not rag_system:
         raise RAGNotAvailableError()
 
-    session = chat_sessions[session_id]
     messages = session.get("messages", [])
     user_constraints = session.get("user_constraints", {})
     db_session_id = session.get("db_session_id")  # MySQL session.session_id
@@ -352,19 +361,21 @@ async def generate_recipe_from_chat(
         if existing_recipe:
             # 기존 레시피로부터 상세 조리 과정 생성 (RAG 없이)
             print(f"[Recipe API] 기존 레시피 사용 → RAG 검색 생략")
-            recipe_json = await service.generate_recipe_from_existing(
-                recipe_content=existing_recipe,
-                member_info=user_constraints
-            )
+            async with admission.slot("HCX-003", fair_key(member_id, session_id)):
+                recipe_json = await service.generate_recipe_from_existing(
+                    recipe_content=existing_recipe,
+                    member_info=user_constraints
+                )
         else:
             # 레시피가 없으면 RAG로 검색 후 생성
             print(f"[Recipe API] 기존 레시피 없음 → RAG 검색 진행")
             last_agent_msg = [m for m in messages if m.get("role") in ("assistant", "AGENT")]
             chat_for_recipe = last_agent_msg[-1:] if last_agent_msg else messages[-1:]
-            recipe_json = await service.generate_recipe(
-                chat_history=chat_for_recipe,
-                member_info=user_constraints
-            )
+            async with admission.slot("HCX-DASH-003", fair_key(member_id, session_id)):
+                recipe_json = await service.generate_recipe(
+                    chat_history=chat_for_recipe,
+                    member_info=user_constraints
+                )
 
         print(f"[Recipe API] 레시피 생성 완료: {recipe_json.get('title')}")
         print(f"[Recipe API] 이미지: {recipe_json.get('image', 'None')[:60]}...")
@@ -376,13 +387,14 @@ async def generate_recipe_from_chat(
         if member_id > 0:
             print(f"[Recipe API] generate 저장 시도 - member_id: {member_id}, db_session_id: {db_session_id}")
             try:
-                # 해당 세션의 이전 생성 개수 확인
-                existing = get_session_generates(db_session_id) if db_session_id else []
+                # 해당 세션의 이전 생성 개수 확인 (큐에 남은 이전 generate부터 기록)
+                await persistence.flush()
+                existing = await asyncio.to_thread(get_session_generates, db_session_id) if db_session_id else []
                 print(f"이전 생성 개수: {existing}")
                 gen_order = len(existing) + 1
                 gen_type = "FIRST" if gen_order == 1 else "RETRY"
 
-                result = create_generate(
+                generate_id = await persistence.submit_generate(
                     session_id=db_session_id,
                     member_id=member_id,
                     recipe_name=recipe_json.get('title', '추천 레시피'),
@@ -391,7 +403,6 @@ async def generate_recipe_from_chat(
                     gen_type=gen_type,
                     gen_order=gen_order
                 )
-                generate_id = result.get('generate_id')
                 print(f"[Recipe API] ✅ generate 저장 완료: generate_id={generate_id}, db_session_id={db_session_id}, gen_order={gen_order}")
             except Exception as e:
                 print(f"[Recipe API] ❌ generate 저장 실패: {e}")
@@ -411,6 +422,8 @@ async def generate_recipe_from_chat(
             "generate_id": generate_id
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[Recipe API] 레시피 생성 실패: {e}")
         import traceback
@@ -418,6 +431,33 @@ async def generate_recipe_from_chat(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/autocomplete")
+async def autocomplete_recipes(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(default=10, ge=1, le=30),
+):
+    """레시피 제목 자동완성 (인메모리 제목 인덱스)"""
+    return {"query": q, "results": title_index.autocomplete(q, limit)}
+
+
+@router.post("/title-index/refresh", dependencies=[Depends(require_internal_token)])
+async def refresh_title_index(rag_system = Depends(get_rag_system)):
+    """제목 인덱스 재빌드 + 신규 레시피 title_norm 백필 + 시맨틱 답변 캐시 무효화 (임베딩 DAG 완료 시 호출)"""
+    if not rag_system:
+        raise RAGNotAvailableError()
+
+    count = await asyncio.to_thread(title_index.build_from_mongo, rag_system.recipes_collection)
+    backfilled = await asyncio.to_thread(ensure_title_norm, rag_system.recipes_collection)
+    # 새 레시피가 들어왔으므로 이전 검색 결과 기반 답변은 무효화
+    invalidated = semantic_cache.clear()
+    return {
+        "success": True,
+        "count": count,
+        "title_norm_backfilled": backfilled,
+        "semantic_cache_invalidated": invalidated,
+    }
+
+
 @router.get("/list")
 async def list_recipes(
     member_id: int = Query(default=0),
@@ -8,6 +8,10 @@ import json
 from pymongo import MongoClient
 from typing import List, Dict, Any
 from toon_format import decode as toon_decode
+from app.config import settings
+from services.history import format_history
+from services.image_resolver import image_resolver
+from services.llm import get_llm
 from .prompts import RECIPE_QUERY_EXTRACTION_PROMPT, RECIPE_GENERATION_PROMPT, RECIPE_DETAIL_EXPANSION_PROMPT
 
 
@@ -320,15 +324,18 @@ class RecipeService:
         
         print(f"[RecipeService] 생성된 검색 쿼리: {search_query}")
         
-        # 2. RAG 검색
-        retrieved_docs = self.rag.search_recipes(search_query, k=3, use_rerank=False)
+        # 2. RAG 검색 (알레르기/비선호 재료는 Milvus 필터로 검색 단계에서 제외)
+        exclude_ingredients = self._get_excluded_ingredients(member_info)
+        retrieved_docs = await self.rag.asearch_recipes(
+            search_query, k=3, use_rerank=False, exclude_ingredients=exclude_ingredients
+        )
         
-        print(f"[RecipeService] RAG 검색 결과: {len(retrieved_docs)}개")
+        print(f"[RecipeService] RAG 검색 결과: {len(retrieved_docs)}개 (제외 재료: {exclude_ingredients})")
         
         # 웹 검색 여부 판단
         from_web_search = not retrieved_docs or len(retrieved_docs) == 0
         
-        # 3. 알레르기/비선호 필터링
+        # 3. 알레르기/비선호 필터링 (Milvus 필터는 재료 단어 정확 일치라 "새우젓"/"땅콩버터" 같은 복합 재료를 놓침 → 부분 문자열 검사로 한 번 더)
         filtered_docs = self._filter_by_constraints(retrieved_docs, member_info)
         
         print(f"[RecipeService] 필터링 후: {len(filtered_docs)}개")
@@ -477,8 +484,7 @@ class RecipeService:
             tools=tools
         )
 
-        from langchain_naver import ChatClovaX
-        llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=2000)
+        llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=2000)
 
         try:
             result = llm.invoke(prompt)
@@ -511,27 +517,12 @@ class RecipeService:
 
             print(f"[RecipeService] 정제된 제목: '{title}' → '{clean_title}'")
 
-            # ✅ 정확한 제목 매칭만 시도 (공백 무시)
+            # ✅ 정확한 제목 매칭만 (공백/대소문자/특수문자 무시)
             # 예: "매운 돼지불고기"는 "매운돼지불고기", "매운 돼지 불고기" 모두 매칭
-            clean_title_no_space = clean_title.replace(" ", "")
-
-            # 공백 제거한 제목으로 검색
-            recipe = self.recipes_collection.find_one(
-                {"title": {"$regex": f"^{re.escape(clean_title_no_space)}$", "$options": "i"}},
-                {"image": 1, "recipe_id": 1, "title": 1, "_id": 0}
-            )
-
-            # 못 찾으면 원본 제목으로 재시도
-            if not recipe:
-                recipe = self.recipes_collection.find_one(
-                    {"title": {"$regex": f"^{re.escape(clean_title)}$", "$options": "i"}},
-                    {"image": 1, "recipe_id": 1, "title": 1, "_id": 0}
-                )
-
-            if recipe and "image" in recipe:
-                image_url = recipe["image"]
-                matched_title = recipe.get("title", "")
-                print(f"[RecipeService] MongoDB 제목 매칭 성공: {matched_title}")
+            # title_norm 인덱스 + image_resolver 캐시 사용
+            image_url = image_resolver.resolve_title(self.recipes_collection, clean_title)
+            if image_url:
+                print(f"[RecipeService] MongoDB 제목 매칭 성공: {clean_title}")
                 print(f"[RecipeService] 이미지: {image_url[:60]}...")
                 return image_url
 
@@ -543,21 +534,15 @@ class RecipeService:
             return ""
     
     def _get_image_from_mongo(self, recipe_id: str) -> str:
-        """MongoDB에서 레시피 이미지 URL 가져오기"""
+        """MongoDB에서 레시피 이미지 URL 가져오기 (image_resolver 캐시 경유)"""
         try:
-            recipe = self.recipes_collection.find_one(
-                {"recipe_id": recipe_id},
-                {"image": 1, "_id": 0}
-            )
-            
-            if recipe and "image" in recipe:
-                image_url = recipe["image"]
+            image_url = image_resolver.resolve_id(self.recipes_collection, recipe_id)
+            if image_url:
                 print(f"[RecipeService] MongoDB 이미지: {image_url[:50]}...")
-                return image_url
             else:
                 print(f"[RecipeService] MongoDB에 이미지 없음: recipe_id={recipe_id}")
-                return ""
-                
+            return image_url
+
         except Exception as e:
             print(f"[RecipeService] MongoDB 이미지 조회 실패: {e}")
             return ""
@@ -577,10 +562,10 @@ class RecipeService:
     ) -> str:
         """LLM으로 검색 쿼리 추출"""
         
-        conversation = "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in chat_history[-10:]
-        ])
+        conversation = format_history(
+            chat_history, settings.HISTORY_BUDGET_QUERY, keep_recent=settings.HISTORY_KEEP_RECENT,
+            site="검색 쿼리 추출", max_items=10,
+        )
         
         servings = len(member_info.get('names', [])) if member_info else 1
         allergies = ', '.join(member_info.get('allergies', [])) if member_info else '없음'
@@ -594,8 +579,7 @@ class RecipeService:
             dislikes=dislikes
         )
         
-        from langchain_naver import ChatClovaX
-        llm = ChatClovaX(model="HCX-DASH-001", temperature=0.2, max_tokens=50)
+        llm = get_llm(model="HCX-DASH-001", temperature=0.2, max_tokens=50, cache=True)
         
         try:
             result = llm.invoke(prompt)
@@ -621,16 +605,24 @@ class RecipeService:
         
         return ' '.join(food_keywords[:5]) if food_keywords else "한식 요리"
     
+    @staticmethod
+    def _get_excluded_ingredients(member_info: Dict) -> List[str]:
+        """알레르기 + 비선호 재료 목록"""
+        if not member_info:
+            return []
+        return list(member_info.get("allergies") or []) + list(member_info.get("dislikes") or [])
+
     def _filter_by_constraints(
         self,
         recipes: List[Dict],
         member_info: Dict
     ) -> List[Dict]:
-        """알레르기/비선호 필터링"""
+        """알레르기/비선호 필터링 (결과가 부족하면 비선호만 완화, 알레르기 재료는 항상 제외)"""
         
         if not member_info:
             return recipes[:5]
         
+        safe = []
         filtered = []
         
         for recipe in recipes:
@@ -644,6 +636,7 @@ class RecipeService:
                 )
                 if has_allergen:
                     continue
+            safe.append(recipe)
             
             # 비선호 재료 체크
             if member_info.get("dislikes"):
@@ -660,7 +653,7 @@ class RecipeService:
                 break
         
         if len(filtered) < 3:
-            return recipes[:3]
+            return safe[:3]
         
         return filtered
     
@@ -672,10 +665,10 @@ class RecipeService:
     ) -> Dict:
         """LLM으로 최종 레시피 JSON 생성"""
         
-        conversation = "\n".join([
-            f"{msg['role']}: {msg['content']}"
-            for msg in chat_history
-        ])
+        conversation = format_history(
+            chat_history, settings.HISTORY_BUDGET_RECIPE, keep_recent=settings.HISTORY_KEEP_RECENT,
+            site="레시피 생성",
+        )
         
         context_text = "\n\n".join([
             f"[레시피 {i+1}] {doc.get('title')}\n{doc.get('content', '')[:800]}"
@@ -697,8 +690,7 @@ class RecipeService:
             context=context_text
         )
         
-        from langchain_naver import ChatClovaX
-        llm = ChatClovaX(model="HCX-DASH-003", temperature=0.2, max_tokens=2000)
+        llm = get_llm(model="HCX-DASH-003", temperature=0.2, max_tokens=2000)
         
         try:
             result = llm.invoke(prompt)
@@ -11,25 +11,32 @@
   GET  /history/{id}  - 음성 대화 기록 조회
   GET  /health        - 상태 확인
 """
-from fastapi import APIRouter, UploadFile, File, Form
+from fastapi import APIRouter, UploadFile, File, Form, Request
 from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from typing import List
+import asyncio
 import json
 import logging
 
+from core.admission import admit_stream, fair_key
 from features.voice.service import (
     process_voice_pipeline,
     process_text_pipeline,
     transcribe_and_analyze,
 )
-from models.mysql_db import create_session, add_chat_message, get_session_chats
+from models.mysql_db import get_session_chats
+from services.persistence import persistence
 
 logger = logging.getLogger("voice_router")
 
 router = APIRouter()
 
 
+def _client_host(request: Request) -> str:
+    return request.client.host if request.client else ""
+
+
 @router.post("/stt")
 async def stt_with_analysis(
     audio: UploadFile = File(..., description="VAD로 감지된 음성 파일"),
@@ -60,6 +67,7 @@ async def stt_with_analysis(
 
 @router.post("/process-text")
 async def process_text(
+    request: Request,
     text: str = Form(..., description="STT 완료된 최종 텍스트"),
     current_step: str = Form("", description="현재 조리 단계 설명"),
     current_cook: str = Form("", description="현재 요리 제목"),
@@ -67,6 +75,7 @@ async def process_text(
     step_index: int = Form(0, description="현재 단계 인덱스 (0부터)"),
     total_steps: int = Form(1, description="총 단계 수"),
     history: str = Form("[]", description="대화 기록 JSON ([{role, content}, ...])"),
+    member_id: int = Form(0, description="회원 ID (대기열 공정성, 게스트는 IP 기준)"),
 ):
     """
     텍스트 → LLM → TTS SSE 엔드포인트
@@ -80,8 +89,10 @@ async def process_text(
         - step_index: 현재 단계 인덱스
         - total_steps: 총 단계 수
         - history: 대화 기록 JSON 문자열
+        - member_id: 회원 ID (선택)
 
     Response (SSE stream):
+        - {"type": "queue", "position": N}  (요청이 많아 대기 중일 때)
         - {"type": "llm", "intent": "...", "text": "...", "action": "..."}
         - {"type": "tts_chunk", "audio": "<base64>", "sample_rate": 32000}
         - {"type": "done"}
@@ -93,8 +104,8 @@ async def process_text(
     except (json.JSONDecodeError, TypeError):
         history_list = []
 
-    async def event_generator():
-        async for event in process_text_pipeline(
+    def pipeline():
+        return process_text_pipeline(
             text,
             current_step,
             current_cook=current_cook,
@@ -102,7 +113,12 @@ async def process_text(
             step_index=step_index,
             total_steps=total_steps,
             history=history_list
-        ):
+        )
+
+    queue_key = fair_key(member_id, _client_host(request))
+
+    async def event_generator():
+        async for event in admit_stream("voice-llm", queue_key, pipeline):
             yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
 
     return StreamingResponse(
@@ -118,12 +134,14 @@ async def process_text(
 
 @router.post("/process")
 async def process_voice(
+    request: Request,
     audio: UploadFile = File(..., description="VAD로 감지된 음성 파일"),
     current_step: str = Form("", description="현재 조리 단계 설명"),
     current_cook: str = Form("", description="현재 요리 제목"),
     recipe_context: str = Form("", description="전체 레시피 정보"),
     step_index: int = Form(0, description="현재 단계 인덱스 (0부터)"),
     total_steps: int = Form(1, description="총 단계 수"),
+    member_id: int = Form(0, description="회원 ID (대기열 공정성, 게스트는 IP 기준)"),
 ):
     """
     음성 처리 SSE 엔드포인트 (기존 호환용 - 전체 파이프라인)
@@ -137,6 +155,7 @@ async def process_voice(
         - total_steps: 총 단계 수
 
     Response (SSE stream):
+        - {"type": "queue", "position": N}  (요청이 많아 대기 중일 때)
         - {"type": "stt", "text": "..."}
         - {"type": "llm", "intent": "...", "text": "...", "action": "..."}
         - {"type": "tts_chunk", "audio": "<base64>", "sample_rate": 32000}
@@ -145,15 +164,20 @@ async def process_voice(
     """
     audio_bytes = await audio.read()
 
-    async def event_generator():
-        async for event in process_voice_pipeline(
+    def pipeline():
+        return process_voice_pipeline(
             audio_bytes,
             current_step,
             current_cook=current_cook,
             recipe_context=recipe_context,
             step_index=step_index,
             total_steps=total_steps
-        ):
+        )
+
+    queue_key = fair_key(member_id, _client_host(request))
+
+    async def event_generator():
+        async for event in admit_stream("voice-llm", queue_key, pipeline):
             yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
 
     return StreamingResponse(
@@ -186,8 +210,8 @@ class SaveHistoryRequest(BaseModel):
 async def create_voice_session(req: SessionRequest):
     """음성 세션 생성 → session_id 반환"""
     try:
-        session = create_session(req.member_id)
-        return {"session_id": session["session_id"]}
+        session_id = await persistence.submit_session(req.member_id)
+        return {"session_id": session_id}
     except Exception as e:
         logger.error(f"[voice/session] 세션 생성 실패: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -195,19 +219,14 @@ async def create_voice_session(req: SessionRequest):
 
 @router.post("/save-history")
 async def save_voice_history(req: SaveHistoryRequest):
-    """음성 대화 기록을 chatbot 테이블에 저장 (type=VOICE)"""
+    """음성 대화 기록을 chatbot 테이블에 저장 (type=VOICE, multi-row INSERT 1회)"""
     try:
-        saved = 0
-        for msg in req.messages:
-            add_chat_message(
-                member_id=req.member_id,
-                session_id=req.session_id,
-                role=msg.role,
-                text=msg.text,
-                msg_type="VOICE",
-            )
-            saved += 1
-        return {"saved": saved, "session_id": req.session_id}
+        futures = [
+            persistence.submit_chat(req.member_id, req.session_id, msg.role, msg.text, msg_type="VOICE")
+            for msg in req.messages
+        ]
+        await asyncio.gather(*futures)
+        return {"saved": len(futures), "session_id": req.session_id}
     except Exception as e:
         logger.error(f"[voice/save-history] 저장 실패: {e}")
         return JSONResponse(content={"error": str(e)}, status_code=500)
@@ -4,17 +4,23 @@ Kiwi 형태소 분석기를 사용한 문장 완성도 분석
 - COMPLETE: 완성된 문장 (종결어미, 명사형 종결 등)
 - INCOMPLETE: 미완성 문장 (연결어미, 조사 등)
 """
+import threading
+
 from kiwipiepy import Kiwi
 
 _kiwi = None
+_kiwi_lock = threading.Lock()
 
 
-def _get_kiwi():
+def get_kiwi():
+    """Kiwi 싱글톤 (음성 문장 완성도 분석 + 채팅 의도 fast path 공용)"""
     global _kiwi
     if _kiwi is None:
-        print("[TextAnalyzer] Kiwi 형태소 분석기 로딩 중...")
-        _kiwi = Kiwi()
-        print("[TextAnalyzer] Kiwi 준비 완료")
+        with _kiwi_lock:
+            if _kiwi is None:
+                print("[TextAnalyzer] Kiwi 형태소 분석기 로딩 중...")
+                _kiwi = Kiwi()
+                print("[TextAnalyzer] Kiwi 준비 완료")
     return _kiwi
 
 
@@ -29,7 +35,7 @@ def analyze_completeness(text: str) -> str:
         return "INCOMPLETE"
 
     try:
-        kiwi = _get_kiwi()
+        kiwi = get_kiwi()
         tokens = kiwi.tokenize(clean_text)
         if not tokens:
             return "INCOMPLETE"
@@ -6,9 +6,13 @@ Tables: member, family, personalization, utensil, member_utensil,
 """
 import json
 import logging
-import pymysql
+import threading
+import time
+from collections import deque
 from contextlib import contextmanager
-from typing import Optional, List
+from typing import Any, Callable, Deque, Dict, Optional, List, Tuple
+
+import pymysql
 from app.config import settings
 
 # 로거 설정
@@ -40,20 +44,239 @@ def get_mysql_connection():
     )
 
 
+# ══════════════════════════════════════════════════════════════
+# 커넥션 풀 (쿼리마다 TCP + 인증 핸드셰이크 반복 방지)
+# ══════════════════════════════════════════════════════════════
+
+class MySQLPoolTimeout(Exception):
+    """풀에서 커넥션을 제한 시간 안에 빌리지 못함"""
+
+
+class MySQLPool:
+    """
+    스레드 안전 커넥션 풀
+    - 최대 max_size개, 부족하면 timeout초 대기 후 MySQLPoolTimeout
+    - 대여 시 점검: max_lifetime 초과 커넥션은 재생성, ping_interval 이상 쉬었으면 ping (0이면 매번)
+    - 쿼리 중 연결 오류가 난 커넥션은 반납하지 않고 폐기
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any] = get_mysql_connection,
+        min_size: int = 1,
+        max_size: int = 10,
+        max_lifetime: float = 3600,
+        ping_interval: float = 30,
+        timeout: float = 10,
+    ):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_lifetime = max_lifetime
+        self.ping_interval = ping_interval
+        self.timeout = timeout
+        self._idle: Deque[Tuple[Any, float, float]] = deque()  # (conn, created_at, last_used)
+        self._created_at: Dict[int, float] = {}
+        self._cond = threading.Condition()
+        self._size = 0
+        self.in_use = 0
+        self.borrowed = 0
+        self.created = 0
+        self.recycled = 0
+        self.broken = 0
+        self.timeouts = 0
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+
+    def acquire(self):
+        start = time.time()
+        deadline = start + self.timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    item = self._idle.pop()  # LIFO: 최근 사용 커넥션 우선 (유휴 커넥션은 자연히 만료)
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    item = None
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.timeouts += 1
+                    raise MySQLPoolTimeout(f"MySQL 커넥션 대기 시간 초과 ({self.timeout}초, 사용 중 {self.in_use})")
+                self._cond.wait(remaining)
+            self.in_use += 1
+            self.borrowed += 1
+            wait_ms = (time.time() - start) * 1000
+            self.wait_ms_total += wait_ms
+            self.wait_ms_max = max(self.wait_ms_max, wait_ms)
+
+        try:
+            return self._checkout(item)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self.in_use -= 1
+                self._cond.notify()
+            raise
+
+    def _checkout(self, item: Optional[Tuple[Any, float, float]]):
+        now = time.time()
+        if item is not None:
+            conn, created_at, last_used = item
+            if self.max_lifetime and now - created_at > self.max_lifetime:
+                self.recycled += 1
+                self._close(conn)
+            elif now - last_used >= self.ping_interval and not self._ping(conn):
+                self.broken += 1
+                self._close(conn)
+            else:
+                return conn
+
+        conn = self._connect()
+        self.created += 1
+        self._created_at[id(conn)] = now
+        return conn
+
+    def release(self, conn, broken: bool = False) -> None:
+        created_at = self._created_at.get(id(conn), 0.0)
+        expired = bool(self.max_lifetime) and time.time() - created_at > self.max_lifetime
+        with self._cond:
+            self.in_use -= 1
+            if broken or expired:
+                self._size -= 1
+            else:
+                self._idle.append((conn, created_at, time.time()))
+            self._cond.notify()
+        if broken or expired:
+            if broken:
+                self.broken += 1
+            else:
+                self.recycled += 1
+            self._close(conn)
+
+    def fill(self) -> int:
+        """min_size까지 미리 연결 → 현재 유휴 커넥션 수"""
+        conns = []
+        try:
+            while len(conns) + len(self._idle) < self.min_size and self._size < self.max_size:
+                conns.append(self.acquire())
+        finally:
+            for conn in conns:
+                self.release(conn)
+        return len(self._idle)
+
+    def check(self) -> bool:
+        """연결 확인 (풀 커넥션 1개 대여 + ping)"""
+        try:
+            conn = self.acquire()
+        except Exception:
+            return False
+        ok = self._ping(conn)
+        self.release(conn, broken=not ok)
+        return ok
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle, self._idle = list(self._idle), deque()
+            self._size -= len(idle)
+        for conn, _, _ in idle:
+            self._close(conn)
+
+    @staticmethod
+    def _ping(conn) -> bool:
+        try:
+            conn.ping(reconnect=False)
+            return True
+        except Exception:
+            return False
+
+    def _close(self, conn) -> None:
+        self._created_at.pop(id(conn), None)
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self._size,
+            "idle": len(self._idle),
+            "in_use": self.in_use,
+            "max_size": self.max_size,
+            "borrowed": self.borrowed,
+            "created": self.created,
+            "recycled": self.recycled,
+            "broken": self.broken,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.wait_ms_total / self.borrowed, 2) if self.borrowed else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 2),
+        }
+
+
+_mysql_pool: Optional[MySQLPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_mysql_pool() -> MySQLPool:
+    """프로세스 공용 커넥션 풀"""
+    global _mysql_pool
+    if _mysql_pool is None:
+        with _pool_lock:
+            if _mysql_pool is None:
+                _mysql_pool = MySQLPool(
+                    min_size=settings.MYSQL_POOL_MIN,
+                    max_size=settings.MYSQL_POOL_MAX,
+                    max_lifetime=settings.MYSQL_POOL_MAX_LIFETIME,
+                    ping_interval=settings.MYSQL_POOL_PING_INTERVAL,
+                    timeout=settings.MYSQL_POOL_TIMEOUT,
+                )
+    return _mysql_pool
+
+
+def check_mysql_connection() -> bool:
+    """MySQL 연결 확인 (풀 커넥션 재사용)"""
+    return get_mysql_pool().check()
+
+
+class CommitUnknownError(Exception):
+    """COMMIT 도중 연결 오류 → 서버에 반영됐는지 알 수 없음 (같은 INSERT를 재시도하면 중복 위험)"""
+
+    retryable = False
+
+
 @contextmanager
 def mysql_cursor():
-    """MySQL 커서 컨텍스트 매니저"""
-    conn = get_mysql_connection()
+    """MySQL 커서 컨텍스트 매니저 (풀에서 대여 → commit/rollback 후 반납)"""
+    pool = get_mysql_pool()
+    conn = pool.acquire()
+    cursor = None
+    broken = False
     try:
         cursor = conn.cursor()
         yield cursor
-        conn.commit()
-    except Exception:
-        conn.rollback()
+        try:
+            conn.commit()
+        except (pymysql.err.OperationalError, pymysql.err.InterfaceError) as e:
+            broken = True
+            raise CommitUnknownError(f"COMMIT 결과 불명: {e}") from e
+    except CommitUnknownError:
+        raise
+    except Exception as e:
+        # 연결 자체가 끊긴 경우 풀에 되돌리지 않음
+        broken = isinstance(e, (pymysql.err.OperationalError, pymysql.err.InterfaceError))
+        try:
+            conn.rollback()
+        except Exception:
+            broken = True
         raise
     finally:
-        cursor.close()
-        conn.close()
+        if cursor is not None:
+            try:
+                cursor.close()
+            except Exception:
+                broken = True
+        pool.release(conn, broken=broken)
 
 
 def init_all_tables():
@@ -836,6 +1059,111 @@ def get_chat_voices(chat_id: int) -> list:
         return [_serialize_datetime(row) for row in cur.fetchall()]
 
 
+# ══════════════════════════════════════════════════════════════
+# 일괄 INSERT (services.persistence write-behind 큐 전용)
+# ══════════════════════════════════════════════════════════════
+
+_consecutive_ids: Optional[bool] = None
+
+
+def _multi_row_ids_consecutive(cur) -> bool:
+    """
+    multi-row INSERT의 id가 lastrowid부터 1씩 연속인지 (프로세스당 1번 확인)
+    auto_increment_increment = 1 이고 innodb_autoinc_lock_mode가 0/1일 때만 보장
+    (2 = interleaved면 동시 INSERT끼리 id가 섞일 수 있음)
+    """
+    global _consecutive_ids
+    if _consecutive_ids is None:
+        cur.execute("SELECT @@auto_increment_increment AS inc, @@innodb_autoinc_lock_mode AS lock_mode")
+        row = cur.fetchone()
+        _consecutive_ids = int(row["inc"]) == 1 and int(row["lock_mode"]) in (0, 1)
+        if not _consecutive_ids:
+            logger.warning(
+                f"auto_increment_increment={row['inc']}, innodb_autoinc_lock_mode={row['lock_mode']} "
+                f"→ 배치 INSERT를 행 단위 INSERT로 기록 (트랜잭션은 1회)"
+            )
+    return _consecutive_ids
+
+
+def _insert_many(cur, prefix: str, placeholder: str, rows: List[tuple]) -> List[int]:
+    """
+    배치 INSERT → 생성된 id 목록
+    id 연속이 보장되면 multi-row INSERT 1회 (lastrowid = 첫 행 id),
+    아니면 같은 커서/트랜잭션에서 행마다 INSERT 후 lastrowid 수집
+    """
+    if not _multi_row_ids_consecutive(cur):
+        ids = []
+        for row in rows:
+            cur.execute(prefix + placeholder, row)
+            ids.append(cur.lastrowid)
+        return ids
+
+    cur.execute(
+        prefix + ", ".join([placeholder] * len(rows)),
+        [value for row in rows for value in row],
+    )
+    first_id = cur.lastrowid
+    return list(range(first_id, first_id + len(rows)))
+
+
+def insert_sessions(member_ids: List[int]) -> List[int]:
+    """세션 일괄 생성 → session_id 목록"""
+    with mysql_cursor() as cur:
+        ids = _insert_many(cur, "INSERT INTO session (member_id) VALUES ", "(%s)", [(m,) for m in member_ids])
+    logger.info(f"💬 [session] BATCH INSERT {len(ids)}건")
+    return ids
+
+
+def insert_chat_messages(rows: List[tuple]) -> List[int]:
+    """채팅 메시지 일괄 추가 (member_id, session_id, role, text, type) → chat_id 목록"""
+    role_map = {"user": "USER", "assistant": "AGENT"}
+    rows = [
+        (member_id, session_id, role_map.get(role.lower(), role.upper()), text, msg_type)
+        for member_id, session_id, role, text, msg_type in rows
+    ]
+    with mysql_cursor() as cur:
+        ids = _insert_many(
+            cur,
+            "INSERT INTO chatbot (member_id, session_id, role, text, type) VALUES ",
+            "(%s, %s, %s, %s, %s)",
+            rows,
+        )
+    logger.info(f"💬 [chatbot] BATCH INSERT {len(ids)}건")
+    return ids
+
+
+def insert_generates(rows: List[tuple]) -> List[int]:
+    """생성 레시피 일괄 저장 (session_id, member_id, recipe_name, ingredients, steps, gen_type, gen_order) → generate_id 목록"""
+    rows = [
+        (session_id, member_id, recipe_name,
+         json.dumps(ingredients, ensure_ascii=False), json.dumps(steps, ensure_ascii=False),
+         gen_type, gen_order)
+        for session_id, member_id, recipe_name, ingredients, steps, gen_type, gen_order in rows
+    ]
+    with mysql_cursor() as cur:
+        ids = _insert_many(
+            cur,
+            "INSERT INTO generate (session_id, member_id, recipe_name, ingredients, steps, gen_type, gen_order) VALUES ",
+            "(%s, %s, %s, %s, %s, %s, %s)",
+            rows,
+        )
+    logger.info(f"🍳 [generate] BATCH INSERT {len(ids)}건")
+    return ids
+
+
+def upsert_voices(rows: List[tuple]) -> List[None]:
+    """음성 데이터 일괄 저장 (chat_id, member_id, voice_type, context, voice_file)"""
+    with mysql_cursor() as cur:
+        cur.execute(
+            "INSERT INTO voice (chat_id, member_id, voice_type, context, voice_file) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+            + " ON DUPLICATE KEY UPDATE context = VALUES(context), voice_file = VALUES(voice_file)",
+            [value for row in rows for value in row],
+        )
+    logger.info(f"🎤 [voice] BATCH UPSERT {len(rows)}건")
+    return [None] * len(rows)
+
+
 # ══════════════════════════════════════════════════════════════
 # 마이페이지 통합 로드
 # ══════════════════════════════════════════════════════════════
@@ -0,0 +1,100 @@
+"""
+services/circuit_breaker.py
+외부 API 호출용 서킷 브레이커 + 지연시간 통계
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict
+
+
+class CircuitBreaker:
+    """
+    연속 실패가 failure_threshold회 이상이면 OPEN → recovery_timeout 동안 호출 차단
+    이후 HALF_OPEN에서 1회 시도, 성공하면 CLOSED / 실패하면 다시 OPEN
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, recovery_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """호출 가능 여부 (HALF_OPEN이면 시험 호출 1회만 통과)"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN and time.time() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    print(f"[WARNING] {self.name} 서킷 OPEN ({self._failures}회 연속 실패, {self.recovery_timeout:.0f}초 차단)")
+                self._state = self.OPEN
+                self._opened_at = time.time()
+
+
+class LatencyStats:
+    """최근 N개 호출 기준 지연시간/성공률 통계"""
+
+    def __init__(self, window: int = 500):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.skipped = 0
+
+    def observe(self, elapsed_ms: float, ok: bool = True) -> None:
+        with self._lock:
+            self.calls += 1
+            if not ok:
+                self.errors += 1
+            self._samples.append(elapsed_ms)
+
+    def skip(self) -> None:
+        with self._lock:
+            self.skipped += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            samples = sorted(self._samples)
+
+        def pct(p: float) -> float:
+            if not samples:
+                return 0.0
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))], 1)
+
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "skipped": self.skipped,
+            "avg_ms": round(sum(samples) / len(samples), 1) if samples else 0.0,
+            "p50_ms": pct(0.5),
+            "p95_ms": pct(0.95),
+        }
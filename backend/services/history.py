@@ -0,0 +1,130 @@
+"""
+services/history.py
+대화 히스토리 압축 (프롬프트 토큰 상한)
+
+- 최근 keep_recent개 메시지는 그대로 유지
+- 그 이전 assistant 레시피 답변은 "제목 + 시간/난이도/인원 + 재료명"만 남긴 한 줄로 치환
+- 그래도 예산(토큰 추정치)을 넘으면 오래된 메시지부터 제거
+- 절약된 토큰은 로그 + core.metrics(record_history_saving)로 보고
+"""
+
+import math
+import re
+from typing import Dict, List, Optional, Tuple, Union
+
+from core.metrics import record_history_saving
+
+Message = Union[Dict, str]
+
+_HANGUL = re.compile(r"[가-힣]")
+_TITLE = re.compile(r"\*\*\[([^\]]+)\]\*\*|^\s*\[([^\]]+)\]", re.MULTILINE)
+_META = re.compile(r"⏱️\s*([^|\n]+?)\s*\|\s*📊\s*([^|\n]+?)\s*(?:\|\s*👥\s*([^\n]+?))?\s*$", re.MULTILINE)
+_INGREDIENTS = re.compile(r"재료\**\s*:?\s*\**\s*:?\s*([^\n]+)")
+_QUANTITY = re.compile(r"\s*[\d½¼¾./~]+\s*[^\s,]*$|\s*(?:약간|적당량|조금|한\s*줌)$")
+
+# 오래된 일반 assistant 메시지 최대 길이 (문자)
+OLD_MESSAGE_CHARS = 200
+# 요약에 남길 재료 수
+SUMMARY_INGREDIENTS = 8
+
+
+def estimate_tokens(text: str) -> int:
+    """토큰 수 추정 (한글 1글자 ≈ 1토큰, 그 외 ≈ 4글자당 1토큰)"""
+    if not text:
+        return 0
+    hangul = len(_HANGUL.findall(text))
+    return hangul + math.ceil((len(text) - hangul) / 4)
+
+
+def is_recipe_message(content: str) -> bool:
+    """레시피 답변 판별 (router / utils.intent 와 같은 기준: "재료" + ⏱️/📊)"""
+    return "재료" in content and ("⏱️" in content or "📊" in content)
+
+
+def summarize_recipe(content: str) -> str:
+    """레시피 답변 → 한 줄 요약 (제목 + 시간/난이도/인원 + 재료명)"""
+    titles = [a or b for a, b in _TITLE.findall(content)]
+    parts = [f"[이전 레시피] {', '.join(titles) if titles else '레시피'}"]
+
+    meta = _META.search(content)
+    if meta:
+        parts.append(f"({' | '.join(m.strip() for m in meta.groups() if m)})")
+
+    ingredients = _INGREDIENTS.search(content)
+    if ingredients:
+        names = [_QUANTITY.sub("", item).strip(" *") for item in ingredients.group(1).split(",")]
+        names = [name for name in names if name][:SUMMARY_INGREDIENTS]
+        if names:
+            parts.append(f"재료: {', '.join(names)}")
+
+    return " ".join(parts)
+
+
+def _split(message: Message) -> Tuple[str, str]:
+    if isinstance(message, dict):
+        return message.get("role", ""), message.get("content", "") or ""
+    role, sep, content = str(message).partition(": ")
+    return (role, content) if sep else ("", str(message))
+
+
+def _join(original: Message, role: str, content: str) -> Message:
+    if isinstance(original, dict):
+        return {**original, "content": content}
+    return f"{role}: {content}" if role else content
+
+
+def _size(message: Message) -> int:
+    role, content = _split(message)
+    return estimate_tokens(content) + estimate_tokens(role) + 1
+
+
+def compact_history(
+    messages: List[Message],
+    budget: int,
+    keep_recent: int = 4,
+    site: str = "",
+) -> List[Message]:
+    """
+    히스토리 압축 (입력과 같은 형태로 반환: {"role","content"} dict 또는 "role: content" 문자열)
+    budget: 토큰 예산 (추정치), keep_recent: 그대로 유지할 최근 메시지 수
+    """
+    messages = list(messages or [])
+    if not messages:
+        return messages
+
+    original = sum(_size(m) for m in messages)
+    split_at = max(len(messages) - keep_recent, 0)
+    older, recent = messages[:split_at], messages[split_at:]
+
+    compacted: List[Message] = []
+    for message in older:
+        role, content = _split(message)
+        if role == "assistant" and is_recipe_message(content):
+            content = summarize_recipe(content)
+        elif role == "assistant" and len(content) > OLD_MESSAGE_CHARS:
+            content = content[:OLD_MESSAGE_CHARS] + "..."
+        compacted.append(_join(message, role, content))
+
+    recent_size = sum(_size(m) for m in recent)
+    older_size = sum(_size(m) for m in compacted)
+    while compacted and recent_size + older_size > budget:
+        older_size -= _size(compacted.pop(0))
+
+    result = compacted + recent
+    record_history_saving(site or "history", original, recent_size + older_size)
+    if original > recent_size + older_size:
+        print(f"[History] {site or 'history'} 압축: {original:,} → {recent_size + older_size:,} tokens "
+              f"(절약 {original - recent_size - older_size:,}, 메시지 {len(messages)} → {len(result)})")
+    return result
+
+
+def format_history(messages: List[Message], budget: int, keep_recent: int = 4, site: str = "",
+                   max_items: Optional[int] = None) -> str:
+    """압축 후 "role: content" 줄바꿈 텍스트 (max_items: 압축 전 최근 N개로 자르기)"""
+    if max_items:
+        messages = list(messages or [])[-max_items:]
+    lines = []
+    for message in compact_history(messages, budget, keep_recent, site):
+        role, content = _split(message)
+        lines.append(f"{role}: {content}" if role else content)
+    return "\n".join(lines)
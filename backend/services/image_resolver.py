@@ -0,0 +1,140 @@
+"""
+services/image_resolver.py
+레시피 이미지 URL 일괄 조회 + 인메모리 캐시
+
+- recipe_id 여러 개 → recipe_id $in 쿼리 1번
+- 제목 여러 개 → 정규화(title_norm) 후 $in 쿼리 1번 (title_norm 인덱스 사용)
+- 결과는 크기 제한 TTL 캐시에 저장 (랭킹 캐시 로딩 시 prime()으로 미리 채움)
+"""
+
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import ASCENDING, UpdateOne
+
+from app.config import settings
+from services.cache import TTLCache
+from services.sparse import normalize_title
+
+TITLE_NORM_FIELD = "title_norm"
+
+_PROJECTION = {"recipe_id": 1, "title": 1, TITLE_NORM_FIELD: 1, "image": 1, "_id": 0}
+
+
+class ImageResolver:
+    """recipe_id / 제목 → 이미지 URL"""
+
+    def __init__(self):
+        self._by_id = TTLCache(settings.IMAGE_CACHE_SIZE, settings.IMAGE_CACHE_TTL, name="image_by_id")
+        self._by_title = TTLCache(settings.IMAGE_CACHE_SIZE, settings.IMAGE_CACHE_TTL, name="image_by_title")
+
+    def _store(self, recipe: Dict) -> None:
+        image = recipe.get("image") or ""
+        if recipe.get("recipe_id"):
+            self._by_id.set(str(recipe["recipe_id"]), image)
+        norm = recipe.get(TITLE_NORM_FIELD) or normalize_title(recipe.get("title", ""))
+        if norm:
+            self._by_title.set(norm, image)
+
+    def prime(self, recipes: Iterable[Dict]) -> int:
+        """이미 조회한 레시피(recipe_id/title/image)로 캐시 채우기"""
+        count = 0
+        for recipe in recipes:
+            self._store(recipe)
+            count += 1
+        return count
+
+    def resolve_ids(self, recipes_collection, recipe_ids: Iterable[str]) -> Dict[str, str]:
+        """recipe_id 목록 → {recipe_id: image} (없으면 "")"""
+        results: Dict[str, str] = {}
+        missing: List[str] = []
+        for rid in dict.fromkeys(str(r) for r in recipe_ids if r):
+            image = self._by_id.get(rid)
+            if image is None:
+                missing.append(rid)
+            else:
+                results[rid] = image
+
+        if missing:
+            for recipe in recipes_collection.find({"recipe_id": {"$in": missing}}, _PROJECTION):
+                self._store(recipe)
+                results[str(recipe["recipe_id"])] = recipe.get("image") or ""
+
+            for rid in missing:
+                if rid not in results:
+                    self._by_id.set(rid, "", ttl=settings.IMAGE_CACHE_NEGATIVE_TTL)
+                    results[rid] = ""
+
+        return results
+
+    def resolve_titles(self, recipes_collection, titles: Iterable[str]) -> Dict[str, str]:
+        """제목 목록 → {원본 제목: image} (공백/대소문자/특수문자 무시 정확 매칭)"""
+        norms = {title: normalize_title(title) for title in titles if title}
+        found: Dict[str, str] = {}
+        missing: List[str] = []
+        for norm in dict.fromkeys(n for n in norms.values() if n):
+            image = self._by_title.get(norm)
+            if image is None:
+                missing.append(norm)
+            else:
+                found[norm] = image
+
+        if missing:
+            for recipe in recipes_collection.find({TITLE_NORM_FIELD: {"$in": missing}}, _PROJECTION):
+                norm = recipe.get(TITLE_NORM_FIELD)
+                # 같은 제목이 여러 개면 이미지가 있는 첫 레시피 사용
+                if norm and not found.get(norm):
+                    self._store(recipe)
+                    found[norm] = recipe.get("image") or ""
+
+            for norm in missing:
+                if norm not in found:
+                    self._by_title.set(norm, "", ttl=settings.IMAGE_CACHE_NEGATIVE_TTL)
+                    found[norm] = ""
+
+        return {title: found.get(norm, "") for title, norm in norms.items()}
+
+    def resolve_id(self, recipes_collection, recipe_id: str) -> str:
+        return self.resolve_ids(recipes_collection, [recipe_id]).get(str(recipe_id), "")
+
+    def resolve_title(self, recipes_collection, title: str) -> str:
+        return self.resolve_titles(recipes_collection, [title]).get(title, "")
+
+    def clear(self) -> None:
+        self._by_id.clear()
+        self._by_title.clear()
+
+    def stats(self) -> List[Dict]:
+        return [self._by_id.stats(), self._by_title.stats()]
+
+
+def ensure_title_norm(recipes_collection, batch_size: int = 1000, limit: Optional[int] = None) -> int:
+    """
+    title_norm 인덱스 생성 + 필드가 없는 레시피 백필
+    정규화 규칙(normalize_title)이 Mongo 표현식으로 재현되지 않아 파이썬에서 계산 후 bulk_write
+    """
+    recipes_collection.create_index([(TITLE_NORM_FIELD, ASCENDING)])
+
+    cursor = recipes_collection.find(
+        {TITLE_NORM_FIELD: {"$exists": False}, "title": {"$type": "string"}},
+        {"_id": 1, "title": 1},
+    )
+    if limit:
+        cursor = cursor.limit(limit)
+
+    updated = 0
+    ops: List[UpdateOne] = []
+    for doc in cursor:
+        ops.append(UpdateOne({"_id": doc["_id"]}, {"$set": {TITLE_NORM_FIELD: normalize_title(doc["title"])}}))
+        if len(ops) >= batch_size:
+            updated += recipes_collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+    if ops:
+        updated += recipes_collection.bulk_write(ops, ordered=False).modified_count
+
+    if updated:
+        print(f"[OK] title_norm 백필 완료: {updated}개")
+    return updated
+
+
+# 프로세스 단위 싱글톤
+image_resolver = ImageResolver()
@@ -1,8 +1,19 @@
 # services/llm.py
 """
-LLM 헬퍼 함수
+LLM 헬퍼 함수 + 공용 LLM 클라이언트 레지스트리
 """
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import Any, List, Dict, Optional, Tuple
+from uuid import UUID
+
+import httpx
+from langchain_core.callbacks import BaseCallbackHandler
+
+from app.config import settings
+from core.metrics import current_node, record_tokens
+from services.circuit_breaker import LatencyStats
+from services.llm_cache import get_llm_response_cache
 
 
 def create_system_prompt(
@@ -33,4 +44,173 @@ def format_chat_history(messages: List[Dict], max_items: int = 4) -> str:
         f"{'사용자' if msg['role'] == 'user' else '어시스턴트'}: {msg['content'][:100]}"
         for msg in messages[-max_items:]
     ])
-    return history_text
\ No newline at end of file
+    return history_text
+
+
+# ─────────────────────────────────────────────
+# LLM 클라이언트 레지스트리
+# (model, temperature, max_tokens, 응답 캐시 사용 여부)별 ChatClovaX 1개 + 공용 keep-alive 커넥션 풀
+# ─────────────────────────────────────────────
+_llm_clients: Dict[Tuple[str, float, int, bool], Any] = {}
+_llm_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+_http_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _http_options() -> Dict[str, Any]:
+    return {
+        "timeout": httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+        "limits": httpx.Limits(
+            max_connections=settings.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_MAX_KEEPALIVE,
+        ),
+    }
+
+
+class LLMMetricsHandler(BaseCallbackHandler):
+    """모델별 호출 수 / 지연시간 / 토큰 누적 + 현재 요청/노드 토큰 기록 (core.metrics)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._started: Dict[UUID, Tuple[str, float]] = {}
+        self._latency: Dict[str, LatencyStats] = {}
+        self._tokens: Dict[str, Dict[str, int]] = {}
+        self._cache_hits: Dict[str, int] = {}
+
+    def _start(self, run_id: UUID, serialized: Optional[Dict], kwargs: Dict) -> None:
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model") or params.get("model_name") or (serialized or {}).get("name", "unknown")
+        with self._lock:
+            self._started[run_id] = (model, time.time())
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs) -> None:
+        self._start(run_id, serialized, kwargs)
+
+    def _finish(self, run_id: UUID, ok: bool, usage: Optional[Dict] = None, cache_hit: bool = False) -> None:
+        with self._lock:
+            model, start = self._started.pop(run_id, ("unknown", time.time()))
+            if cache_hit:
+                # 응답 캐시 hit은 업스트림 호출이 아님 → 지연시간 히스토그램에서 제외하고 따로 집계
+                self._cache_hits[model] = self._cache_hits.get(model, 0) + 1
+                return
+            stats = self._latency.setdefault(model, LatencyStats())
+            tokens = self._tokens.setdefault(model, {"prompt": 0, "completion": 0, "total": 0})
+            if usage:
+                tokens["prompt"] += usage.get("prompt", 0)
+                tokens["completion"] += usage.get("completion", 0)
+                tokens["total"] += usage.get("total", 0)
+        stats.observe((time.time() - start) * 1000, ok=ok)
+
+    @staticmethod
+    def _usage(response) -> Dict[str, int]:
+        """LLMResult → 토큰 사용량 (llm_output.token_usage 우선, 없으면 usage_metadata)"""
+        token_usage = (response.llm_output or {}).get("token_usage") or {}
+        if token_usage:
+            prompt = token_usage.get("prompt_tokens", 0) or 0
+            completion = token_usage.get("completion_tokens", 0) or 0
+            return {"prompt": prompt, "completion": completion,
+                    "total": token_usage.get("total_tokens") or prompt + completion}
+
+        for generations in response.generations:
+            for generation in generations:
+                meta = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if meta:
+                    return {"prompt": meta.get("input_tokens", 0), "completion": meta.get("output_tokens", 0),
+                            "total": meta.get("total_tokens", 0)}
+        return {}
+
+    @staticmethod
+    def _cache_hit(response) -> bool:
+        """services.llm_cache가 캐시 응답에 표시한 response_metadata["cache_hit"]"""
+        return any(
+            getattr(getattr(generation, "message", None), "response_metadata", {}).get("cache_hit")
+            for generations in response.generations
+            for generation in generations
+        )
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs) -> None:
+        usage = self._usage(response)
+        self._finish(run_id, True, usage, cache_hit=self._cache_hit(response))
+        if usage:
+            record_tokens(current_node(), usage.get("prompt", 0), usage.get("completion", 0), usage.get("total", 0))
+
+    def on_llm_error(self, error, *, run_id: UUID, **kwargs) -> None:
+        self._finish(run_id, False)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            models = list(self._latency.items())
+            tokens = {model: dict(t) for model, t in self._tokens.items()}
+            cache_hits = dict(self._cache_hits)
+        snapshot = {
+            model: {**stats.snapshot(), "tokens": tokens.get(model, {}), "cache_hits": cache_hits.pop(model, 0)}
+            for model, stats in models
+        }
+        # 캐시 hit만 있었던 모델
+        for model, hits in cache_hits.items():
+            snapshot[model] = {"tokens": {}, "cache_hits": hits}
+        return snapshot
+
+
+llm_metrics = LLMMetricsHandler()
+
+
+def _get_http_clients() -> Tuple[httpx.Client, httpx.AsyncClient]:
+    global _http_client, _http_async_client
+    if _http_client is None:
+        _http_client = httpx.Client(**_http_options())
+    if _http_async_client is None:
+        _http_async_client = httpx.AsyncClient(**_http_options())
+    return _http_client, _http_async_client
+
+
+def get_llm(model: str = "HCX-003", temperature: float = 0.2, max_tokens: int = 1000, cache: bool = False):
+    """
+    공용 ChatClovaX 클라이언트 (같은 설정이면 같은 인스턴스, 커넥션 풀 공유)
+    cache=True: 같은 프롬프트/파라미터 응답 재사용 (짧고 결정적인 분류/재작성 호출용)
+    """
+    response_cache = get_llm_response_cache() if cache else None
+    key = (model, float(temperature), int(max_tokens), response_cache is not None)
+    llm = _llm_clients.get(key)
+    if llm is not None:
+        return llm
+
+    with _llm_lock:
+        llm = _llm_clients.get(key)
+        if llm is None:
+            try:
+                from langchain_naver import ChatClovaX
+            except ImportError:
+                from langchain_community.chat_models import ChatClovaX
+
+            http_client, http_async_client = _get_http_clients()
+            llm = ChatClovaX(
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                callbacks=[llm_metrics],
+                cache=response_cache if response_cache is not None else False,
+            )
+            _llm_clients[key] = llm
+    return llm
+
+
+def get_llm_metrics() -> Dict[str, Any]:
+    """모델별 지연시간/토큰 통계 + 등록된 클라이언트 수"""
+    return {"clients": len(_llm_clients), "models": llm_metrics.snapshot()}
+
+
+async def aclose_llm_clients() -> None:
+    """서버 종료 시 공용 커넥션 풀 정리"""
+    global _http_client, _http_async_client
+    if _http_async_client is not None:
+        await _http_async_client.aclose()
+    if _http_client is not None:
+        _http_client.close()
+    _http_client = _http_async_client = None
+    _llm_clients.clear()
@@ -0,0 +1,144 @@
+"""
+services/llm_cache.py
+LLM 응답 정확 일치 캐시 (LangChain BaseCache)
+
+- 키: sha256(모델 파라미터 문자열 + 렌더링된 프롬프트) → 모델/temperature/max_tokens가 다르면 다른 키
+- 메모리 LRU+TTL 계층 → SQLite 영속 계층 (LLM_CACHE_PATH 설정 시, 재시작 후에도 유지)
+- get_llm(..., cache=True)로 만든 클라이언트만 사용 (호출 지점별 on/off)
+- 요청 헤더(LLM_CACHE_BYPASS_HEADER)가 있으면 조회를 건너뛰고 새 응답으로 덮어씀 (디버깅용)
+"""
+
+import hashlib
+import threading
+from contextvars import ContextVar
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.load import dumps, loads
+from langchain_core.outputs import ChatGeneration, Generation
+
+from app.config import settings
+from services.cache import SQLiteCache, TTLCache
+
+_bypass: ContextVar[bool] = ContextVar("llm_cache_bypass", default=False)
+
+
+def set_llm_cache_bypass(enabled: bool) -> None:
+    """현재 요청(컨텍스트)에서 LLM 캐시 조회 건너뛰기"""
+    _bypass.set(enabled)
+
+
+def is_bypass_value(value: Optional[str]) -> bool:
+    """헤더 값 → bypass 여부 ("1", "true", "yes")"""
+    return (value or "").strip().lower() in ("1", "true", "yes")
+
+
+def _strip_usage(generation: Generation) -> Generation:
+    """캐시 응답은 토큰을 쓰지 않으므로 사용량 메타데이터 제거 + cache_hit 표시"""
+    if not isinstance(generation, ChatGeneration):
+        return generation
+    metadata = {k: v for k, v in generation.message.response_metadata.items() if k != "token_usage"}
+    metadata["cache_hit"] = True
+    message = generation.message.model_copy(update={"usage_metadata": None, "response_metadata": metadata})
+    return ChatGeneration(message=message, generation_info=generation.generation_info)
+
+
+class LLMResponseCache(BaseCache):
+    """(모델 파라미터, 프롬프트) → 응답 Generation 목록"""
+
+    def __init__(self, path: str = "", maxsize: int = 2048, max_entries: int = 50000, ttl: Optional[float] = 86400):
+        self._memory = TTLCache(maxsize=maxsize, ttl=ttl, name="llm_response")
+        self._disk: Optional[SQLiteCache] = None
+        self._lock = threading.Lock()
+        self.disk_hits = 0
+        self.bypassed = 0
+        if path:
+            try:
+                self._disk = SQLiteCache(path, max_entries=max_entries, ttl=ttl, table="llm_response")
+                print(f"[OK] LLM 응답 캐시: {path}")
+            except Exception as e:
+                print(f"[WARNING] LLM 응답 디스크 캐시 비활성화: {e}")
+
+    @staticmethod
+    def _key(prompt: str, llm_string: str) -> str:
+        return hashlib.sha256(f"{llm_string}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[Sequence[Generation]]:
+        if _bypass.get():
+            with self._lock:
+                self.bypassed += 1
+            return None
+
+        key = self._key(prompt, llm_string)
+        generations = self._memory.get(key)
+        if generations is None and self._disk is not None:
+            payload = self._disk.get(key)
+            if payload is not None:
+                try:
+                    generations = [loads(item) for item in payload]
+                except Exception:
+                    generations = None
+                if generations is not None:
+                    self._memory.set(key, generations)
+                    with self._lock:
+                        self.disk_hits += 1
+
+        if generations is None:
+            return None
+        return [_strip_usage(g) for g in generations]
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._key(prompt, llm_string)
+        generations = list(return_val)
+        self._memory.set(key, generations)
+        if self._disk is not None:
+            try:
+                self._disk.set(key, [dumps(g) for g in generations])
+            except Exception as e:
+                print(f"[WARNING] LLM 응답 캐시 저장 실패: {e}")
+
+    def clear(self, **kwargs: Any) -> None:
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """메모리 계층 hit/miss 기준 (디스크 hit도 메모리 miss 후 hit로 집계)"""
+        stats = self._memory.stats()
+        hits = stats["hits"] + self.disk_hits
+        lookups = stats["hits"] + stats["misses"]
+        stats.update({
+            "hits": hits,
+            "misses": lookups - hits,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            "disk_hits": self.disk_hits,
+            "disk_size": len(self._disk) if self._disk is not None else 0,
+            "bypassed": self.bypassed,
+        })
+        return stats
+
+
+_llm_response_cache: Optional[LLMResponseCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_response_cache() -> Optional[LLMResponseCache]:
+    """프로세스 공용 LLM 응답 캐시 (LLM_CACHE_ENABLED=False면 None)"""
+    global _llm_response_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    if _llm_response_cache is None:
+        with _cache_lock:
+            if _llm_response_cache is None:
+                _llm_response_cache = LLMResponseCache(
+                    path=settings.LLM_CACHE_PATH,
+                    maxsize=settings.LLM_CACHE_SIZE,
+                    max_entries=settings.LLM_CACHE_MAX_ENTRIES,
+                    ttl=settings.LLM_CACHE_TTL,
+                )
+    return _llm_response_cache
+
+
+def get_llm_cache_stats() -> Optional[Dict[str, Any]]:
+    cache = _llm_response_cache
+    return cache.stats() if cache is not None else None
@@ -0,0 +1,237 @@
+"""
+services/persistence.py
+MySQL write-behind 큐 (session / chatbot / generate / voice INSERT)
+
+- 요청 핸들러는 submit_*()로 행을 넣고 바로 진행 (이벤트 루프 블로킹 없음)
+- 테이블별로 모아 multi-row INSERT 1회 (PERSIST_BATCH_SIZE개 차거나 PERSIST_FLUSH_INTERVAL초마다 flush)
+- 실패 시 지수 백오프로 재시도 (PERSIST_MAX_RETRIES), 최종 실패는 해당 future에 예외
+  단 retryable=False 예외(COMMIT 도중 연결 끊김 등, 이미 기록됐을 수 있음)는 중복 방지를 위해 재시도하지 않음
+- 생성 id가 필요한 호출부만 반환된 future를 await (session_id / chat_id / generate_id)
+- 서버 종료 시 aclose()로 남은 행 모두 기록
+"""
+
+import asyncio
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from app.config import settings
+
+Writer = Callable[[List[tuple]], List[Any]]
+
+
+def _writers() -> Dict[str, Writer]:
+    from models.mysql_db import insert_chat_messages, insert_generates, insert_sessions, upsert_voices
+    return {
+        "session": lambda rows: insert_sessions([row[0] for row in rows]),
+        "chatbot": insert_chat_messages,
+        "generate": insert_generates,
+        "voice": upsert_voices,
+    }
+
+
+def _consume(future: asyncio.Future) -> None:
+    # fire-and-forget 제출의 예외가 "never retrieved" 경고로 남지 않도록
+    if not future.cancelled():
+        future.exception()
+
+
+def _chain(source: asyncio.Future, target: asyncio.Future) -> None:
+    if target.done():
+        return
+    if source.cancelled():
+        target.cancel()
+    elif source.exception() is not None:
+        target.set_exception(source.exception())
+    else:
+        target.set_result(source.result())
+
+
+class WriteBehindQueue:
+    """테이블별 배치 INSERT 큐 (이벤트 루프 안에서만 submit)"""
+
+    def __init__(
+        self,
+        batch_size: int = 50,
+        flush_interval: float = 0.2,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        writers: Optional[Dict[str, Writer]] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._writers = writers
+        self._pending: Dict[str, List[Tuple[tuple, asyncio.Future]]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self.submitted = 0
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.flush_ms_total = 0.0
+
+    # ─────────────────────────────────────────────
+    # 제출
+    # ─────────────────────────────────────────────
+    def submit(self, table: str, row: tuple) -> asyncio.Future:
+        """행 1개 제출 → 생성 id future (voice는 None)"""
+        loop = asyncio.get_running_loop()
+        self._ensure_worker(loop)
+        future = loop.create_future()
+        future.add_done_callback(_consume)
+        items = self._pending.setdefault(table, [])
+        items.append((row, future))
+        self.submitted += 1
+        if len(items) >= self.batch_size or self._closing:
+            self._wakeup.set()
+        return future
+
+    def submit_session(self, member_id: int) -> asyncio.Future:
+        return self.submit("session", (member_id,))
+
+    def submit_chat(
+        self, member_id: int, session_id: int, role: str, text: str, msg_type: str = "GENERATE"
+    ) -> asyncio.Future:
+        return self.submit("chatbot", (member_id, session_id, role, text, msg_type))
+
+    def submit_generate(
+        self,
+        session_id: Optional[int],
+        member_id: int,
+        recipe_name: str,
+        ingredients: list,
+        steps: list,
+        gen_type: str = "FIRST",
+        gen_order: int = 1,
+    ) -> asyncio.Future:
+        return self.submit("generate", (session_id, member_id, recipe_name, ingredients, steps, gen_type, gen_order))
+
+    def submit_voice(
+        self,
+        chat_id: Union[int, asyncio.Future],
+        member_id: int,
+        voice_type: str,
+        context: Optional[str] = None,
+        voice_file: Optional[str] = None,
+    ) -> asyncio.Future:
+        """chat_id 자리에 submit_chat() future를 넘기면 chat_id가 정해진 뒤 제출"""
+        if not isinstance(chat_id, asyncio.Future):
+            return self.submit("voice", (chat_id, member_id, voice_type, context, voice_file))
+
+        result = asyncio.get_running_loop().create_future()
+        result.add_done_callback(_consume)
+
+        def _after_chat(chat_future: asyncio.Future) -> None:
+            if chat_future.cancelled() or chat_future.exception() is not None:
+                _chain(chat_future, result)
+                return
+            inner = self.submit("voice", (chat_future.result(), member_id, voice_type, context, voice_file))
+            inner.add_done_callback(lambda f: _chain(f, result))
+
+        chat_id.add_done_callback(_after_chat)
+        return result
+
+    # ─────────────────────────────────────────────
+    # 기록
+    # ─────────────────────────────────────────────
+    def _ensure_worker(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._task is not None and not self._task.done():
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._closing = False
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._closing and not self._pending:
+                return
+
+    async def flush(self) -> None:
+        """대기 중인 행 모두 기록 (테이블별 batch_size 단위, 테이블 내 제출 순서 유지)"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            while self._pending:
+                table, items = next(iter(self._pending.items()))
+                batch = items[:self.batch_size]
+                del items[:self.batch_size]
+                if not items:
+                    del self._pending[table]
+                await self._write(table, batch)
+
+    async def _write(self, table: str, batch: List[Tuple[tuple, asyncio.Future]]) -> None:
+        if self._writers is None:
+            self._writers = _writers()
+        writer = self._writers[table]
+        rows = [row for row, _ in batch]
+
+        start = time.time()
+        for attempt in range(self.max_retries + 1):
+            try:
+                ids = await asyncio.to_thread(writer, rows)
+                break
+            except Exception as e:
+                retryable = getattr(e, "retryable", True)
+                if attempt >= self.max_retries or not retryable:
+                    self.failed += len(batch)
+                    note = f"재시도 {attempt}회" if retryable else "결과 불명, 중복 방지로 재시도 안 함"
+                    print(f"[WARNING] {table} {len(batch)}건 기록 실패 ({note}): {e}")
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    return
+                self.retries += 1
+                await asyncio.sleep(self.retry_backoff * (2 ** attempt))
+
+        self.batches += 1
+        self.written += len(batch)
+        self.flush_ms_total += (time.time() - start) * 1000
+        for (_, future), row_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(row_id)
+
+    async def aclose(self) -> None:
+        """서버 종료: 남은 행 모두 기록 후 워커 종료"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        try:
+            await self._task
+        except Exception as e:
+            print(f"[WARNING] write-behind 큐 종료 중 오류: {e}")
+        await self.flush()
+        self._task = None
+        print(f"[OK] write-behind 큐 종료 (기록 {self.written}건, 실패 {self.failed}건)")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": sum(len(items) for items in self._pending.values()),
+            "submitted": self.submitted,
+            "written": self.written,
+            "batches": self.batches,
+            "retries": self.retries,
+            "failed": self.failed,
+            "avg_batch_rows": round(self.written / self.batches, 2) if self.batches else 0.0,
+            "avg_flush_ms": round(self.flush_ms_total / self.batches, 1) if self.batches else 0.0,
+        }
+
+
+# 프로세스 단위 싱글톤
+persistence = WriteBehindQueue(
+    batch_size=settings.PERSIST_BATCH_SIZE,
+    flush_interval=settings.PERSIST_FLUSH_INTERVAL,
+    max_retries=settings.PERSIST_MAX_RETRIES,
+    retry_backoff=settings.PERSIST_RETRY_BACKOFF,
+)
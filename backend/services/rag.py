@@ -3,9 +3,11 @@ services/rag.py
 CLOVA Studio Reranker API 사용 (API Key만 필요)
 """
 
+import asyncio
+import hashlib
 import json
 import os
-import http.client
+import httpx
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
@@ -13,9 +15,8 @@ from pymongo import MongoClient
 
 # LangChain CLOVA X
 try:
-    from langchain_naver import ChatClovaX, ClovaXEmbeddings
+    from langchain_naver import ClovaXEmbeddings
 except ImportError:
-    from langchain_community.chat_models import ChatClovaX
     from langchain_community.embeddings import ClovaXEmbeddings
 
 from langchain_core.prompts import ChatPromptTemplate
@@ -37,7 +38,28 @@ except ImportError:
 
 from pymilvus import connections, utility
 
+from pymilvus import AnnSearchRequest, RRFRanker
+
+try:
+    from pymilvus import AsyncMilvusClient
+except ImportError:
+    AsyncMilvusClient = None
+
 import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from services.cache import TTLCache, SQLiteCache, normalize_query
+from services.circuit_breaker import CircuitBreaker, LatencyStats
+from services.sparse import (
+    INGREDIENTS_FIELD,
+    SPARSE_FIELD,
+    encode_query as encode_sparse_query,
+    normalize_ingredient,
+)
+from services.image_resolver import image_resolver
+from services.llm import get_llm
+from services.title_index import title_index
 
 load_dotenv()
 
@@ -56,15 +78,148 @@ def _log_step(label: str, start: float, end: float):
     print(f"  ⏱️  [{label}] {elapsed_sec:.1f}초")
 
 
+# ─────────────────────────────────────────────
+# Query Embedding 캐시 (프로세스 단위)
+# ─────────────────────────────────────────────
+_embedding_cache = TTLCache(
+    maxsize=settings.EMBEDDING_CACHE_SIZE,
+    ttl=settings.EMBEDDING_CACHE_TTL,
+    name="embedding",
+)
+_embedding_disk_cache: Optional[SQLiteCache] = None
+_embedding_disk_failed = False
+
+
+def _get_embedding_disk_cache() -> Optional[SQLiteCache]:
+    """디스크 계층 (EMBEDDING_CACHE_PATH 설정 시에만 사용)"""
+    global _embedding_disk_cache, _embedding_disk_failed
+    if _embedding_disk_cache is None and settings.EMBEDDING_CACHE_PATH and not _embedding_disk_failed:
+        try:
+            _embedding_disk_cache = SQLiteCache(
+                settings.EMBEDDING_CACHE_PATH,
+                ttl=settings.EMBEDDING_CACHE_TTL,
+                table="query_embedding",
+            )
+            print(f"[OK] Embedding 디스크 캐시: {settings.EMBEDDING_CACHE_PATH}")
+        except Exception as e:
+            print(f"[WARNING] Embedding 디스크 캐시 비활성화: {e}")
+            _embedding_disk_failed = True
+    return _embedding_disk_cache
+
+
+# ─────────────────────────────────────────────
+# Rerank 결과 캐시 (query + 후보 문서 fingerprint)
+# ─────────────────────────────────────────────
+_rerank_cache = TTLCache(
+    maxsize=settings.RERANK_CACHE_SIZE,
+    ttl=settings.RERANK_CACHE_TTL,
+    name="rerank",
+)
+
+
+def _rerank_cache_key(query: str, documents: List[Document]) -> tuple:
+    """정규화된 쿼리 + 순서가 있는 후보 id 목록의 해시"""
+    fingerprint = hashlib.sha1()
+    for doc in documents:
+        content_hash = hashlib.sha1(doc.page_content[:2000].encode("utf-8")).hexdigest()[:12]
+        fingerprint.update(f"{doc.metadata.get('recipe_id', '')}:{content_hash}|".encode("utf-8"))
+    return normalize_query(query), fingerprint.hexdigest()
+
+
+def get_rerank_cache_stats() -> Dict[str, Any]:
+    return _rerank_cache.stats()
+
+
+# title 검색과 동시에 돌릴 벡터 검색 전용 스레드풀
+_retrieval_executor = ThreadPoolExecutor(
+    max_workers=settings.RETRIEVAL_WORKERS,
+    thread_name_prefix="rag-vector",
+)
+
+
+def get_embedding_cache_stats() -> Dict[str, Any]:
+    """Embedding 캐시 hit/miss 통계"""
+    stats = _embedding_cache.stats()
+    disk = _get_embedding_disk_cache()
+    stats["disk_entries"] = len(disk) if disk else 0
+    return stats
+
+
 class ClovaStudioReranker:
-    """CLOVA Studio Reranker API Wrapper"""
-    
+    """
+    CLOVA Studio Reranker API Wrapper
+    - keep-alive 커넥션 풀 (sync/async 클라이언트 각각 1개 공유)
+    - connect/read 타임아웃
+    - 서킷 브레이커: OPEN이면 호출 생략 → 호출부는 벡터 순서로 fallback
+    """
+
+    PATH = '/v1/api-tools/reranker'
+
     def __init__(self, api_key: str, request_id: str = "recipe-rag-rerank"):
         self.host = 'clovastudio.stream.ntruss.com'
         self.api_key = f'Bearer {api_key}'
         self.request_id = request_id
-        
-    
+
+        self._timeout = httpx.Timeout(
+            settings.RERANKER_READ_TIMEOUT,
+            connect=settings.RERANKER_CONNECT_TIMEOUT,
+        )
+        self._limits = httpx.Limits(
+            max_connections=settings.RERANKER_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.RERANKER_MAX_CONNECTIONS,
+        )
+        self._client = httpx.Client(
+            base_url=f"https://{self.host}",
+            headers=self._headers(),
+            timeout=self._timeout,
+            limits=self._limits,
+        )
+        self._async_client: Optional[httpx.AsyncClient] = None
+
+        self.breaker = CircuitBreaker(
+            "Reranker",
+            failure_threshold=settings.RERANKER_BREAKER_FAILURES,
+            recovery_timeout=settings.RERANKER_BREAKER_RESET,
+        )
+        self.latency = LatencyStats()
+
+    def _headers(self) -> Dict[str, str]:
+        return {
+            'Content-Type': 'application/json; charset=utf-8',
+            'Authorization': self.api_key,
+            'X-NCP-CLOVASTUDIO-REQUEST-ID': self.request_id
+        }
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=f"https://{self.host}",
+                headers=self._headers(),
+                timeout=self._timeout,
+                limits=self._limits,
+            )
+        return self._async_client
+
+    def _parse_result(self, result: Dict) -> Optional[Dict]:
+        if result.get('status', {}).get('code') == '20000':
+            self.breaker.record_success()
+            return result.get('result', {})
+        print(f"[WARNING] Reranker API 오류: {result}")
+        self.breaker.record_failure()
+        return None
+
+    def _before_call(self) -> bool:
+        if self.breaker.allow():
+            return True
+        self.latency.skip()
+        print("[WARNING] Reranker 서킷 OPEN → rerank 생략")
+        return False
+
+    def _on_error(self, start: float, e: Exception):
+        self.latency.observe((time.time() - start) * 1000, ok=False)
+        self.breaker.record_failure()
+        print(f"[ERROR] Reranker API 호출 실패: {type(e).__name__}: {e}")
+
     def rerank(self, query: str, documents: List[Dict[str, str]], max_tokens: int = 1024) -> Dict:
         """
         문서 재순위화
@@ -75,37 +230,92 @@ class ClovaStudioReranker:
             max_tokens: 최대 토큰 수
         
         Returns:
-            CLOVA Studio Reranker API 응답
+            CLOVA Studio Reranker API 응답 (실패/서킷 OPEN 시 None)
         """
-        headers = {
-            'Content-Type': 'application/json; charset=utf-8',
-            'Authorization': self.api_key,
-            'X-NCP-CLOVASTUDIO-REQUEST-ID': self.request_id
+        if not self._before_call():
+            return None
+
+        request_data = {
+            "documents": documents,
+            "query": query,
+            "maxTokens": max_tokens
         }
         
+        start = time.time()
+        try:
+            response = self._client.post(self.PATH, json=request_data)
+            body = response.json()
+        except Exception as e:
+            self._on_error(start, e)
+            return None
+
+        # 응답 파싱까지 성공한 호출만 정상 지연시간으로 기록 (실패는 _on_error에서 1번)
+        self.latency.observe((time.time() - start) * 1000)
+        return self._parse_result(body)
+
+    async def arerank(self, query: str, documents: List[Dict[str, str]], max_tokens: int = 1024) -> Dict:
+        """문서 재순위화 (async)"""
+        if not self._before_call():
+            return None
+
         request_data = {
             "documents": documents,
             "query": query,
             "maxTokens": max_tokens
         }
-        
+
+        start = time.time()
         try:
-            conn = http.client.HTTPSConnection(self.host)
-            conn.request('POST', '/v1/api-tools/reranker', json.dumps(request_data), headers)
-            response = conn.getresponse()
-            result = json.loads(response.read().decode(encoding='utf-8'))
-            conn.close()
-            
-            if result.get('status', {}).get('code') == '20000':
-                return result.get('result', {})
-            else:
-                print(f"[WARNING] Reranker API 오류: {result}")
-                return None
-                
+            response = await self._get_async_client().post(self.PATH, json=request_data)
+            body = response.json()
         except Exception as e:
-            print(f"[ERROR] Reranker API 호출 실패: {e}")
+            self._on_error(start, e)
             return None
 
+        # 응답 파싱까지 성공한 호출만 정상 지연시간으로 기록 (실패는 _on_error에서 1번)
+        self.latency.observe((time.time() - start) * 1000)
+        return self._parse_result(body)
+
+    def metrics(self) -> Dict[str, Any]:
+        """지연시간 + 서킷 상태"""
+        stats = self.latency.snapshot()
+        stats["breaker"] = self.breaker.state
+        return stats
+
+    async def aclose(self):
+        self._client.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+
+
+OUTPUT_FIELDS = ["text", "title", "level", "cook_time", "source", "recipe_id"]
+# hybrid는 RRF 점수만 돌려주므로 dense 거리 계산용 벡터도 함께 조회
+HYBRID_OUTPUT_FIELDS = OUTPUT_FIELDS + ["vector"]
+
+
+def _hit_to_document(fields: Dict[str, Any]) -> Document:
+    """Milvus 검색/쿼리 결과 필드 → Document"""
+    return Document(
+        page_content=fields.get("text", ""),
+        metadata={
+            "title": fields.get("title", "N/A"),
+            "level": fields.get("level", "N/A"),
+            "cook_time": fields.get("cook_time", "N/A"),
+            "source": fields.get("source", "N/A"),
+            "recipe_id": fields.get("recipe_id", ""),
+            "image_url": "",
+        }
+    )
+
+
+def _hybrid_hit(fields: Dict[str, Any], score: float, query_embedding: List[float]) -> tuple:
+    """hybrid 결과 → (Document, RRF 점수), dense 구간 L2² 거리는 metadata["dense_distance"] (관련성 평가용)"""
+    doc = _hit_to_document(fields)
+    vector = fields.get("vector")
+    if vector is not None:
+        doc.metadata["dense_distance"] = float(sum((a - b) ** 2 for a, b in zip(query_embedding, vector)))
+    return doc, score
+
 
 class RecipeRAGLangChain:
     """
@@ -131,6 +341,7 @@ class RecipeRAGLangChain:
         self.milvus_uri = f"http://{milvus_host}:{milvus_port}"
         self.collection_name = collection_name
         self.use_reranker = use_reranker
+        self.embedding_model = embedding_model
 
         print("\n" + "="*60)
         print("Recipe RAG System (LangChain + CLOVA X)")
@@ -143,7 +354,7 @@ class RecipeRAGLangChain:
 
         # 2. CLOVA X Chat 모델 초기화
         print(f"\n[2/5] CLOVA X Chat 모델 초기화 중 (model: {chat_model})")
-        self.chat_model = ChatClovaX(
+        self.chat_model = get_llm(
             model=chat_model,
             temperature=temperature,
             max_tokens=max_tokens,
@@ -172,6 +383,9 @@ class RecipeRAGLangChain:
         # 4. Milvus Vectorstore 연결
         print(f"\n[4/5] Milvus 연결 중 ({self.milvus_uri})")
         self.vectorstore = None
+        self._async_milvus = None
+        self.has_sparse = False
+        self.has_ingredients = False
         self._connect_milvus()
 
         # 4. MongoDB 연결
@@ -204,38 +418,108 @@ class RecipeRAGLangChain:
             else:
                 print(f"[WARNING] Milvus 연결됨, 하지만 문서가 없을 수 있습니다.")
 
+            field_names = {f.name for f in self.vectorstore.col.schema.fields}
+            self.has_sparse = SPARSE_FIELD in field_names
+            self.has_ingredients = INGREDIENTS_FIELD in field_names
+            if self.has_sparse:
+                print(f"[OK] Hybrid 검색 사용 가능 ({SPARSE_FIELD})")
+            elif settings.RETRIEVAL_MODE != "title_vector":
+                print(f"[WARNING] {SPARSE_FIELD} 필드 없음 → title_vector 모드로 동작")
+
         except Exception as e:
             print(f"[ERROR] Milvus 연결 실패: {e}")
             raise
 
-    def _rerank_documents(
-        self,
-        query: str,
-        documents: List[Document],
-        top_n: int = 5
-    ) -> List[tuple[Document, float]]:
-        """CLOVA Studio Reranker를 사용한 문서 재순위화"""
-        
-        if not self.reranker or not documents:
-            return [(doc, 1.0) for doc in documents[:top_n]]
-        
-        # CLOVA Studio Reranker 형식으로 변환
-        rerank_docs = []
-        for i, doc in enumerate(documents):
-            rerank_docs.append({
+    def _cached_embedding(self, query: str) -> tuple:
+        """캐시 조회 → (key, embedding or None)"""
+        key = (self.embedding_model, normalize_query(query))
+
+        embedding = _embedding_cache.get(key)
+        if embedding is not None:
+            print(f"  ⚡ [Embedding 캐시 hit] {query[:30]}")
+            return key, embedding
+
+        disk = _get_embedding_disk_cache()
+        if disk:
+            embedding = disk.get(f"{key[0]}:{key[1]}")
+            if embedding is not None:
+                _embedding_cache.set(key, embedding)
+                print(f"  ⚡ [Embedding 디스크 캐시 hit] {query[:30]}")
+                return key, embedding
+
+        return key, None
+
+    @staticmethod
+    def _store_embedding(key: tuple, embedding: List[float]):
+        _embedding_cache.set(key, embedding)
+        disk = _get_embedding_disk_cache()
+        if disk:
+            disk.set(f"{key[0]}:{key[1]}", embedding)
+
+    def _embed_query(self, query: str) -> List[float]:
+        """Query embedding (캐시 hit이면 API 호출 생략)"""
+        key, embedding = self._cached_embedding(query)
+        if embedding is not None:
+            return embedding
+
+        t_emb_start = _t()
+        embedding = self.embeddings.embed_query(query)
+        _log_step("Embedding 생성", t_emb_start, _t())
+
+        self._store_embedding(key, embedding)
+        return embedding
+
+    async def _aembed_query(self, query: str) -> List[float]:
+        """Query embedding (async)"""
+        key, embedding = self._cached_embedding(query)
+        if embedding is not None:
+            return embedding
+
+        t_emb_start = _t()
+        embedding = await self.embeddings.aembed_query(query)
+        _log_step("Embedding 생성 (async)", t_emb_start, _t())
+
+        self._store_embedding(key, embedding)
+        return embedding
+
+    async def aembed_query(self, query: str) -> List[float]:
+        """질문 임베딩 (검색과 같은 임베딩 캐시 사용 → 이후 검색 시 API 재호출 없음)"""
+        return await self._aembed_query(query)
+
+    def _get_async_milvus(self):
+        """AsyncMilvusClient (이벤트 루프 안에서 최초 호출 시 생성)"""
+        if self._async_milvus is None:
+            if AsyncMilvusClient is None:
+                raise RuntimeError("pymilvus AsyncMilvusClient 사용 불가 (pymilvus>=2.5 필요)")
+            self._async_milvus = AsyncMilvusClient(uri=self.milvus_uri)
+        return self._async_milvus
+
+    # ─────────────────────────────────────────────
+    # Rerank
+    # ─────────────────────────────────────────────
+    @staticmethod
+    def _build_rerank_docs(documents: List[Document]) -> List[Dict[str, str]]:
+        """CLOVA Studio Reranker 형식으로 변환"""
+        return [
+            {
                 "id": f"doc{i}",
                 "doc": doc.page_content[:2000]  # 토큰 제한
-            })
-        
-        # Reranker API 호출
-        result = self.reranker.rerank(query, rerank_docs, max_tokens=1024)
-        
+            }
+            for i, doc in enumerate(documents)
+        ]
+
+    @staticmethod
+    def _parse_rerank_result(
+        result: Optional[Dict],
+        documents: List[Document],
+        top_n: int
+    ) -> List[tuple[Document, float]]:
+        """Reranker 응답 파싱 (실패 시 원본 순서 유지)"""
         if not result:
             # API 실패 시 원본 순서 유지
             print("[WARNING] Reranker 실패, 원본 순서 사용")
             return [(doc, 1.0) for doc in documents[:top_n]]
-        
-        # 결과 파싱
+
         reranked = []
         for item in result.get('topPassages', [])[:top_n]:
             doc_id = item.get('id', '')
@@ -254,88 +538,251 @@ class RecipeRAGLangChain:
             return [(doc, 1.0) for doc in documents[:top_n]]
         
         return reranked
+
+    def _rerank_documents(
+        self,
+        query: str,
+        documents: List[Document],
+        top_n: int = 5
+    ) -> List[tuple[Document, float]]:
+        """CLOVA Studio Reranker를 사용한 문서 재순위화"""
+        
+        if not self.reranker or not documents:
+            return [(doc, 1.0) for doc in documents[:top_n]]
+
+        cache_key = _rerank_cache_key(query, documents)
+        result = _rerank_cache.get(cache_key)
+        if result is not None:
+            print(f"  ⚡ [Rerank 캐시 hit] {query[:30]}")
+            return self._parse_rerank_result(result, documents, top_n)
+        
+        result = self.reranker.rerank(query, self._build_rerank_docs(documents), max_tokens=1024)
+        if result:
+            _rerank_cache.set(cache_key, result)
+        return self._parse_rerank_result(result, documents, top_n)
+
+    async def _arerank_documents(
+        self,
+        query: str,
+        documents: List[Document],
+        top_n: int = 5
+    ) -> List[tuple[Document, float]]:
+        """문서 재순위화 (async)"""
+
+        if not self.reranker or not documents:
+            return [(doc, 1.0) for doc in documents[:top_n]]
+
+        cache_key = _rerank_cache_key(query, documents)
+        result = _rerank_cache.get(cache_key)
+        if result is not None:
+            print(f"  ⚡ [Rerank 캐시 hit] {query[:30]}")
+            return self._parse_rerank_result(result, documents, top_n)
+
+        result = await self.reranker.arerank(query, self._build_rerank_docs(documents), max_tokens=1024)
+        if result:
+            _rerank_cache.set(cache_key, result)
+        return self._parse_rerank_result(result, documents, top_n)
     
-    def _get_image_from_mongodb(self, recipe_id: str) -> str:
-        """MongoDB에서 이미지 URL 가져오기"""
+    def _attach_images(self, results: List[Dict]) -> List[Dict]:
+        """최종 검색 결과 전체의 이미지 URL을 한 번에 채움 (캐시 miss만 $in 쿼리 1번)"""
+        recipe_ids = [r["recipe_id"] for r in results if r.get("recipe_id") not in (None, "", "N/A")]
+        if not recipe_ids or self.recipes_collection is None:
+            return results
         try:
-            recipe = self.recipes_collection.find_one(
-                {"recipe_id": recipe_id},
-                {"image": 1, "_id": 0}
-            )
-            
-            if recipe and "image" in recipe:
-                image_url = recipe["image"]
-                print(f"[RAG] MongoDB 이미지: {image_url[:60]}...")
-                return image_url
-            else:
-                print(f"[RAG] MongoDB에 이미지 없음: {recipe_id}")
-                return ""
+            images = image_resolver.resolve_ids(self.recipes_collection, recipe_ids)
         except Exception as e:
-            print(f"[RAG] MongoDB 조회 실패: {e}")
-            return ""
+            print(f"[RAG] MongoDB 이미지 조회 실패: {e}")
+            return results
+        for result in results:
+            result["image"] = result.get("image") or images.get(str(result.get("recipe_id")), "")
+        return results
 
-    def _milvus_title_search(self, query: str, k: int) -> List[tuple]:
+    @staticmethod
+    def _exclude_expr(exclude_ingredients: Optional[List[str]]) -> Optional[str]:
+        """제외 재료 → Milvus 필터 (ingredients ARRAY 필드, 적재 시와 같은 정규화)"""
+        values = sorted({normalize_ingredient(i) for i in (exclude_ingredients or []) if normalize_ingredient(i)})
+        if not values:
+            return None
+        return f"not array_contains_any(ingredients, {json.dumps(values, ensure_ascii=False)})"
+
+    def _filter_expr(self, exclude_ingredients: Optional[List[str]]) -> Optional[str]:
+        if not exclude_ingredients:
+            return None
+        if not self.has_ingredients:
+            print("  [WARNING] ingredients 필드 없음 → Milvus 제외 필터 생략")
+            return None
+        return self._exclude_expr(exclude_ingredients)
+
+    @staticmethod
+    def _and_expr(*exprs: Optional[str]) -> str:
+        parts = [e for e in exprs if e]
+        if len(parts) == 1:
+            return parts[0]
+        return " and ".join(f"({e})" for e in parts)
+
+    @staticmethod
+    def _title_expr(query: str) -> str:
+        safe_query = query.replace('"', '\\"')
+        return f'title like "%{safe_query}%"'
+
+    @staticmethod
+    def _title_query_plan(query: str, k: int, group: bool = False) -> Optional[tuple]:
+        """
+        title 검색 조건 → (expr, limit, recipe_ids) / 매칭 없음이면 None
+        제목 인덱스가 준비되어 있으면 인덱스로 recipe_id를 먼저 찾고 Milvus는 id 조회만 한다.
+        group=True면 청크 중복을 감안해 더 많이 가져온다.
+        """
+        if not title_index.ready:
+            return RecipeRAGLangChain._title_expr(query), k * 3 if group else k, None
+
+        t_index_start = _t()
+        matches = title_index.search(query, k)
+        _log_step("제목 인덱스 조회", t_index_start, _t())
+        if not matches:
+            return None
+
+        recipe_ids = [recipe_id for _, recipe_id in matches]
+        return f"recipe_id in {json.dumps(recipe_ids, ensure_ascii=False)}", k * 3, recipe_ids
+
+    @staticmethod
+    def _order_title_hits(
+        rows: List[Dict],
+        recipe_ids: Optional[List[str]],
+        k: int,
+        group: bool = False,
+    ) -> List[Dict]:
+        """인덱스 순서대로 정렬 + recipe_id당 1개 (청크 중복 제거)"""
+        if recipe_ids is None and not group:
+            return rows
+        rank = {rid: i for i, rid in enumerate(recipe_ids or [])}
+        ordered, seen = [], set()
+        for row in sorted(rows, key=lambda r: rank.get(r.get("recipe_id"), len(rank))):
+            if row.get("recipe_id") not in seen:
+                seen.add(row.get("recipe_id"))
+                ordered.append(row)
+        return ordered[:k]
+
+    @staticmethod
+    def _log_title_hits(title_results: List[Dict]) -> List[tuple]:
+        print(f"  🎯 [title 매칭] {len(title_results)}개 발견!")
+        docs_with_scores = []
+        for hit in title_results:
+            docs_with_scores.append((_hit_to_document(hit), 0.0))  # title 매칭은 최고 점수
+            print(f"    - {hit.get('title', 'N/A')}")
+        return docs_with_scores
+
+    def _milvus_title_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
         """title 필드 기반 키워드 매칭 검색 (벡터 검색 보완용)"""
         try:
+            plan = self._title_query_plan(query, k, group)
+            if plan is None:
+                return []
+            title_expr, limit, recipe_ids = plan
+
             collection = self.vectorstore.col
-            output_fields = ["text", "title", "level", "cook_time", "source", "recipe_id"]
 
             # title에 쿼리 포함된 문서 필터 검색
-            safe_query = query.replace('"', '\\"')
-            expr = f'title like "%{safe_query}%"'
-
             t_title_start = _t()
             title_results = collection.query(
-                expr=expr,
-                output_fields=output_fields,
-                limit=k
+                expr=self._and_expr(title_expr, expr),
+                output_fields=OUTPUT_FIELDS,
+                limit=limit
             )
             _log_step("Milvus title 검색", t_title_start, _t())
 
             if not title_results:
                 return []
 
-            print(f"  🎯 [title 매칭] {len(title_results)}개 발견!")
-            docs_with_scores = []
-            for hit in title_results:
-                doc = Document(
-                    page_content=hit.get("text", ""),
-                    metadata={
-                        "title": hit.get("title", "N/A"),
-                        "level": hit.get("level", "N/A"),
-                        "cook_time": hit.get("cook_time", "N/A"),
-                        "source": hit.get("source", "N/A"),
-                        "recipe_id": hit.get("recipe_id", ""),
-                        "image_url": "",
-                    }
-                )
-                docs_with_scores.append((doc, 0.0))  # title 매칭은 최고 점수
-                print(f"    - {hit.get('title', 'N/A')}")
-
-            return docs_with_scores
+            return self._log_title_hits(self._order_title_hits(title_results, recipe_ids, k, group))
 
         except Exception as e:
             print(f"  [WARNING] title 검색 실패: {e}")
             return []
 
-    def _milvus_search(self, query: str, k: int) -> List[tuple]:
-        """pymilvus 직접 호출 - title 매칭 우선, 부족하면 벡터 검색 보완"""
-        from pymilvus import Collection
+    async def _amilvus_title_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """title 키워드 매칭 검색 (async)"""
+        try:
+            plan = self._title_query_plan(query, k, group)
+            if plan is None:
+                return []
+            title_expr, limit, recipe_ids = plan
 
-        collection = self.vectorstore.col
-        output_fields = ["text", "title", "level", "cook_time", "source", "recipe_id"]
+            client = self._get_async_milvus()
 
-        # ── 1단계: title 키워드 매칭 먼저 시도 ──
-        title_results = self._milvus_title_search(query, k)
+            t_title_start = _t()
+            title_results = await client.query(
+                collection_name=self.collection_name,
+                filter=self._and_expr(title_expr, expr),
+                output_fields=OUTPUT_FIELDS,
+                limit=limit,
+            )
+            _log_step("Milvus title 검색 (async)", t_title_start, _t())
 
-        if len(title_results) >= k:
-            # title 매칭으로 충분하면 벡터 검색 스킵
-            return title_results[:k]
+            if not title_results:
+                return []
 
-        # ── 2단계: 벡터 검색 (title 매칭 부족할 때) ──
-        t_emb_start = _t()
-        query_embedding = self.embeddings.embed_query(query)
-        _log_step("Embedding 생성", t_emb_start, _t())
+            return self._log_title_hits(self._order_title_hits(title_results, recipe_ids, k, group))
+
+        except Exception as e:
+            print(f"  [WARNING] title 검색 실패: {e}")
+            return []
+
+    @staticmethod
+    def _group_kwargs(group: bool) -> Dict[str, Any]:
+        """Milvus group-by 검색 옵션 (limit = 그룹(레시피) 수)"""
+        if not group:
+            return {}
+        return {
+            "group_by_field": "recipe_id",
+            "group_size": settings.GROUP_SIZE,
+            "strict_group_size": False,
+        }
+
+    @staticmethod
+    def _group_hits(hits: List[tuple], k: int, higher_is_better: bool = False) -> List[tuple]:
+        """
+        청크 결과를 recipe_id별로 묶기 → 레시피당 최고 청크 1개
+        metadata에 group_score(매칭 청크 점수 평균), matched_chunks 기록
+        """
+        groups: Dict[str, List[tuple]] = {}
+        for doc, score in hits:
+            key = doc.metadata.get("recipe_id") or doc.metadata.get("title")
+            groups.setdefault(key, []).append((doc, float(score)))
+
+        grouped = []
+        for members in groups.values():
+            members.sort(key=lambda m: m[1], reverse=higher_is_better)
+            best_doc, best_score = members[0]
+            best_doc.metadata["group_score"] = sum(sc for _, sc in members) / len(members)
+            best_doc.metadata["matched_chunks"] = len(members)
+            grouped.append((best_doc, best_score))
+
+        grouped.sort(key=lambda g: g[1], reverse=higher_is_better)
+        return grouped[:k]
+
+    def _milvus_vector_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """Embedding + ANN 벡터 검색 (group=True면 recipe_id별 group-by)"""
+        collection = self.vectorstore.col
+
+        query_embedding = self._embed_query(query)
 
         ef = max(k * 2, 50)
         search_params = {"metric_type": "L2", "params": {"ef": ef}}
@@ -346,57 +793,287 @@ class RecipeRAGLangChain:
             anns_field="vector",
             param=search_params,
             limit=k,
-            output_fields=output_fields
+            expr=expr,
+            output_fields=OUTPUT_FIELDS,
+            **self._group_kwargs(group),
         )
         _log_step("Milvus ANN 검색", t_search_start, _t())
 
-        vector_results = []
-        for hit in results[0]:
-            recipe_id = hit.entity.get("recipe_id", "")
-            doc = Document(
-                page_content=hit.entity.get("text", ""),
-                metadata={
-                    "title": hit.entity.get("title", "N/A"),
-                    "level": hit.entity.get("level", "N/A"),
-                    "cook_time": hit.entity.get("cook_time", "N/A"),
-                    "source": hit.entity.get("source", "N/A"),
-                    "recipe_id": recipe_id,
-                    "image_url": "",
-                }
+        hits = [(_hit_to_document(hit.entity), hit.score) for hit in results[0]]
+        return self._group_hits(hits, k) if group else hits
+
+    async def _amilvus_vector_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """Embedding + ANN 벡터 검색 (async)"""
+        client = self._get_async_milvus()
+
+        query_embedding = await self._aembed_query(query)
+
+        ef = max(k * 2, 50)
+        search_params = {"metric_type": "L2", "params": {"ef": ef}}
+
+        t_search_start = _t()
+        results = await client.search(
+            collection_name=self.collection_name,
+            data=[query_embedding],
+            anns_field="vector",
+            search_params=search_params,
+            limit=k,
+            filter=expr or "",
+            output_fields=OUTPUT_FIELDS,
+            **self._group_kwargs(group),
+        )
+        _log_step("Milvus ANN 검색 (async)", t_search_start, _t())
+
+        hits = [(_hit_to_document(hit["entity"]), hit["distance"]) for hit in results[0]]
+        return self._group_hits(hits, k) if group else hits
+
+    def _hybrid_requests(
+        self,
+        query: str,
+        query_embedding: List[float],
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List:
+        """dense(vector) + sparse(title_sparse) 검색 요청"""
+        limit = k * settings.GROUP_SIZE * 2 if group else k * 2
+        ef = max(limit, 50)
+        requests = [
+            AnnSearchRequest(
+                data=[query_embedding],
+                anns_field="vector",
+                param={"metric_type": "L2", "params": {"ef": ef}},
+                limit=limit,
+                expr=expr,
+            )
+        ]
+        sparse_query = encode_sparse_query(query)
+        if sparse_query:
+            requests.append(
+                AnnSearchRequest(
+                    data=[sparse_query],
+                    anns_field=SPARSE_FIELD,
+                    param={"metric_type": "IP", "params": {}},
+                    limit=limit,
+                    expr=expr,
+                )
             )
-            vector_results.append((doc, hit.score))
+        return requests
+
+    def _milvus_hybrid_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """title sparse + dense 벡터 검색 → RRF 융합 (score는 RRF 점수, 높을수록 관련)"""
+        collection = self.vectorstore.col
+        query_embedding = self._embed_query(query)
+
+        t_search_start = _t()
+        results = collection.hybrid_search(
+            self._hybrid_requests(query, query_embedding, k, expr, group),
+            rerank=RRFRanker(settings.HYBRID_RRF_K),
+            limit=k * settings.GROUP_SIZE * 2 if group else k * 2,
+            output_fields=HYBRID_OUTPUT_FIELDS,
+        )
+        _log_step("Milvus hybrid 검색", t_search_start, _t())
+
+        hits = [_hybrid_hit(hit.entity, hit.score, query_embedding) for hit in results[0]]
+        if group:
+            # hybrid는 over-fetch 후 클라이언트에서 그룹핑 (RRF 점수는 높을수록 관련)
+            return self._group_hits(hits, k, higher_is_better=True)
+        return self._merge_results([], hits, k)
 
-        # ── title 결과 + 벡터 결과 합치기 (중복 제거) ──
-        seen_titles = {doc.metadata.get("title") for doc, _ in title_results}
+    async def _amilvus_hybrid_search(
+        self,
+        query: str,
+        k: int,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """hybrid 검색 (async)"""
+        client = self._get_async_milvus()
+        query_embedding = await self._aembed_query(query)
+
+        t_search_start = _t()
+        results = await client.hybrid_search(
+            collection_name=self.collection_name,
+            reqs=self._hybrid_requests(query, query_embedding, k, expr, group),
+            ranker=RRFRanker(settings.HYBRID_RRF_K),
+            limit=k * settings.GROUP_SIZE * 2 if group else k * 2,
+            output_fields=HYBRID_OUTPUT_FIELDS,
+        )
+        _log_step("Milvus hybrid 검색 (async)", t_search_start, _t())
+
+        hits = [_hybrid_hit(hit["entity"], hit["distance"], query_embedding) for hit in results[0]]
+        if group:
+            return self._group_hits(hits, k, higher_is_better=True)
+        return self._merge_results([], hits, k)
+
+    def _use_hybrid(self, mode: Optional[str]) -> bool:
+        mode = mode or settings.RETRIEVAL_MODE
+        return mode in ("auto", "hybrid") and self.has_sparse
+
+    @staticmethod
+    def _merge_results(
+        title_results: List[tuple],
+        vector_results: List[tuple],
+        k: int,
+        key: str = "title",
+    ) -> List[tuple]:
+        """title 결과 + 벡터 결과 합치기 (key 기준 중복 제거: title 또는 recipe_id)"""
+        seen = {doc.metadata.get(key) for doc, _ in title_results}
         merged = list(title_results)
         for doc, score in vector_results:
-            if doc.metadata.get("title") not in seen_titles and len(merged) < k:
+            if doc.metadata.get(key) not in seen and len(merged) < k:
                 merged.append((doc, score))
-                seen_titles.add(doc.metadata.get("title"))
+                seen.add(doc.metadata.get(key))
 
         return merged
 
+    def _milvus_search(
+        self,
+        query: str,
+        k: int,
+        concurrent: Optional[bool] = None,
+        mode: Optional[str] = None,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """
+        pymilvus 직접 호출 - title 매칭 우선, 부족하면 벡터 검색 보완
+
+        concurrent=True면 title 검색과 벡터 검색(embedding 포함)을 동시에 시작하고,
+        title 결과만으로 k개가 채워지면 벡터 결과는 버린다.
+        title_sparse 필드가 있고 mode가 "auto"/"hybrid"면 title like 스캔 대신 sparse+dense RRF 검색을 사용한다.
+        expr는 모든 검색 경로에 동일하게 적용되는 Milvus 필터 (제외 재료 등)
+        group=True면 recipe_id별로 묶어 서로 다른 레시피 k개를 반환한다.
+        """
+        if self._use_hybrid(mode):
+            return self._milvus_hybrid_search(query, k, expr, group)
+
+        merge_key = "recipe_id" if group else "title"
+
+        concurrent = settings.CONCURRENT_RETRIEVAL if concurrent is None else concurrent
+
+        if not concurrent:
+            # ── 1단계: title 키워드 매칭 먼저 시도 ──
+            title_results = self._milvus_title_search(query, k, expr, group)
+
+            if len(title_results) >= k:
+                # title 매칭으로 충분하면 벡터 검색 스킵
+                return title_results[:k]
+
+            # ── 2단계: 벡터 검색 (title 매칭 부족할 때) ──
+            vector_results = self._milvus_vector_search(query, k, expr, group)
+            return self._merge_results(title_results, vector_results, k, merge_key)
+
+        # ── 동시 실행: 벡터 검색은 스레드풀, title 검색은 현재 스레드 ──
+        t_start = _t()
+        vector_future = _retrieval_executor.submit(self._milvus_vector_search, query, k, expr, group)
+        title_results = self._milvus_title_search(query, k, expr, group)
+
+        if len(title_results) >= k:
+            # 아직 시작 전이면 취소, 이미 실행 중이면 결과만 버림
+            vector_future.cancel()
+            print("  ✂️  [동시 검색] title 매칭으로 충분 → 벡터 결과 폐기")
+            return title_results[:k]
+
+        vector_results = vector_future.result()
+        _log_step("title+벡터 동시 검색", t_start, _t())
+        return self._merge_results(title_results, vector_results, k, merge_key)
+
+    async def _amilvus_search(
+        self,
+        query: str,
+        k: int,
+        mode: Optional[str] = None,
+        expr: Optional[str] = None,
+        group: bool = False,
+    ) -> List[tuple]:
+        """title 검색 + 벡터 검색 동시 실행 (async)"""
+        if self._use_hybrid(mode):
+            return await self._amilvus_hybrid_search(query, k, expr, group)
+
+        merge_key = "recipe_id" if group else "title"
+        t_start = _t()
+        vector_task = asyncio.create_task(self._amilvus_vector_search(query, k, expr, group))
+        title_results = await self._amilvus_title_search(query, k, expr, group)
+
+        if len(title_results) >= k:
+            vector_task.cancel()
+            print("  ✂️  [동시 검색] title 매칭으로 충분 → 벡터 결과 폐기")
+            return title_results[:k]
+
+        vector_results = await vector_task
+        _log_step("title+벡터 동시 검색 (async)", t_start, _t())
+        return self._merge_results(title_results, vector_results, k, merge_key)
+
+    @staticmethod
+    def _to_result_dict(
+        doc: Document, vector_score: float, rerank_score: Optional[float] = None, hybrid: bool = False
+    ) -> Dict:
+        """hybrid=True면 vector_score가 거리 대신 RRF 점수 (dense 거리는 dense_distance)"""
+        result = {
+            "content": doc.page_content,
+            "vector_score": float(vector_score),
+            "hybrid": hybrid,
+            "title": doc.metadata.get("title", "N/A"),
+            "author": doc.metadata.get("author", "N/A"),
+            "source": doc.metadata.get("source", "N/A"),
+            "cook_time": doc.metadata.get("cook_time", "N/A"),
+            "level": doc.metadata.get("level", "N/A"),
+            "recipe_id": doc.metadata.get("recipe_id", "N/A"),
+            "image": doc.metadata.get("image_url", ""),
+        }
+        if rerank_score is not None:
+            result["rerank_score"] = float(rerank_score)
+        if "dense_distance" in doc.metadata:
+            result["dense_distance"] = doc.metadata["dense_distance"]
+        if "group_score" in doc.metadata:
+            result["group_score"] = doc.metadata["group_score"]
+            result["matched_chunks"] = doc.metadata["matched_chunks"]
+        return result
+
     def search_recipes(
         self,
         query: str,
         k: int = 3,
-        use_rerank: bool = False
+        use_rerank: bool = False,
+        mode: Optional[str] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        group_by_recipe: Optional[bool] = None,
     ) -> List[Dict]:
-        """레시피 검색 (with optional CLOVA Studio reranking + image)"""
+        """
+        레시피 검색 (with optional CLOVA Studio reranking + image)
+
+        mode: "auto" | "title_vector" | "hybrid" (None이면 RETRIEVAL_MODE 설정 따름)
+        exclude_ingredients: 알레르기/비선호 재료 → Milvus 필터로 검색 단계에서 제외
+        group_by_recipe: 청크를 recipe_id별로 묶어 서로 다른 레시피 k개 반환 (None이면 GROUP_BY_RECIPE 설정)
+        """
 
         t_total_start = _t()
 
         use_rerank = use_rerank if use_rerank is not None else self.use_reranker
+        expr = self._filter_expr(exclude_ingredients)
+        group = settings.GROUP_BY_RECIPE if group_by_recipe is None else group_by_recipe
+        hybrid = self._use_hybrid(mode)
         print(f"\n  📍 [search_recipes] 시작 (k={k}, rerank={use_rerank})")
 
         if use_rerank and self.reranker:
             search_k = min(k * 3, 20)
 
             # ── 타이밍: Milvus 검색 (embedding 포함) ──
-            t_milvus_start = _t()
-            docs_with_scores = self._milvus_search(query, search_k)
-            total_end = _t()
-            _log_step("search_recipes 합계", t_total_start, total_end)
+            docs_with_scores = self._milvus_search(query, search_k, mode=mode, expr=expr, group=group)
+            _log_step("Milvus 전체 (rerank 후보)", t_total_start, _t())
             
             docs = [doc for doc, score in docs_with_scores]
             vector_scores = {id(doc): float(score) for doc, score in docs_with_scores}
@@ -406,55 +1083,88 @@ class RecipeRAGLangChain:
             reranked_results = self._rerank_documents(query, docs, top_n=k)
             _log_step("Reranker API", t_rerank_start, _t())
             
-            results = []
-            for doc, rerank_score in reranked_results:
-                results.append({
-                    "content": doc.page_content,
-                    "vector_score": vector_scores.get(id(doc), 0.0),
-                    "rerank_score": float(rerank_score),
-                    "title": doc.metadata.get("title", "N/A"),
-                    "author": doc.metadata.get("author", "N/A"),
-                    "source": doc.metadata.get("source", "N/A"),
-                    "cook_time": doc.metadata.get("cook_time", "N/A"),
-                    "level": doc.metadata.get("level", "N/A"),
-                    "recipe_id": doc.metadata.get("recipe_id", "N/A"),
-                    "image": doc.metadata.get("image_url", ""),
-                })
+            results = [
+                self._to_result_dict(doc, vector_scores.get(id(doc), 0.0), rerank_score, hybrid)
+                for doc, rerank_score in reranked_results
+            ]
         else:
             # ── 타이밍: Milvus 검색만 (rerank 없음) ──
             t_milvus_start = _t()
-            docs_with_scores = self._milvus_search(query, k)
+            docs_with_scores = self._milvus_search(query, k, mode=mode, expr=expr, group=group)
             _log_step("Milvus 전체 (rerank 없음)", t_milvus_start, _t())
 
-            results = []
-            for doc, score in docs_with_scores:
-                results.append({
-                    "content": doc.page_content,
-                    "vector_score": float(score),
-                    "title": doc.metadata.get("title", "N/A"),
-                    "author": doc.metadata.get("author", "N/A"),
-                    "source": doc.metadata.get("source", "N/A"),
-                    "cook_time": doc.metadata.get("cook_time", "N/A"),
-                    "level": doc.metadata.get("level", "N/A"),
-                    "recipe_id": doc.metadata.get("recipe_id", "N/A"),
-                    "image": doc.metadata.get("image_url", ""),
-                })
+            results = [self._to_result_dict(doc, score, hybrid=hybrid) for doc, score in docs_with_scores]
 
+        self._attach_images(results)
         _log_step("search_recipes 합계", t_total_start, _t())
         print(f"  📍 [search_recipes] 완료\n")
         return results
 
-    def generate_answer(
+    async def asearch_recipes(
         self,
         query: str,
-        context_docs: List[Dict],
-        system_prompt: Optional[str] = None
-    ) -> str:
-        """LangChain을 사용한 답변 생성"""
+        k: int = 3,
+        use_rerank: bool = False,
+        mode: Optional[str] = None,
+        exclude_ingredients: Optional[List[str]] = None,
+        group_by_recipe: Optional[bool] = None,
+    ) -> List[Dict]:
+        """레시피 검색 (async) - Milvus/Embedding/Reranker 모두 await"""
 
-        print(f"  📍 [generate_answer] 시작")
         t_total_start = _t()
 
+        use_rerank = use_rerank if use_rerank is not None else self.use_reranker
+        expr = self._filter_expr(exclude_ingredients)
+        group = settings.GROUP_BY_RECIPE if group_by_recipe is None else group_by_recipe
+        hybrid = self._use_hybrid(mode)
+        print(f"\n  📍 [asearch_recipes] 시작 (k={k}, rerank={use_rerank})")
+
+        if use_rerank and self.reranker:
+            search_k = min(k * 3, 20)
+
+            docs_with_scores = await self._amilvus_search(query, search_k, mode=mode, expr=expr, group=group)
+            _log_step("Milvus 전체 (rerank 후보)", t_total_start, _t())
+
+            docs = [doc for doc, score in docs_with_scores]
+            vector_scores = {id(doc): float(score) for doc, score in docs_with_scores}
+
+            t_rerank_start = _t()
+            reranked_results = await self._arerank_documents(query, docs, top_n=k)
+            _log_step("Reranker API", t_rerank_start, _t())
+
+            results = [
+                self._to_result_dict(doc, vector_scores.get(id(doc), 0.0), rerank_score, hybrid)
+                for doc, rerank_score in reranked_results
+            ]
+        else:
+            t_milvus_start = _t()
+            docs_with_scores = await self._amilvus_search(query, k, mode=mode, expr=expr, group=group)
+            _log_step("Milvus 전체 (rerank 없음)", t_milvus_start, _t())
+
+            results = [self._to_result_dict(doc, score, hybrid=hybrid) for doc, score in docs_with_scores]
+
+        await asyncio.to_thread(self._attach_images, results)
+        _log_step("asearch_recipes 합계", t_total_start, _t())
+        print(f"  📍 [asearch_recipes] 완료\n")
+        return results
+
+    @staticmethod
+    def _to_documents(context_docs: List[Dict]) -> List[Document]:
+        """검색 결과 dict → Document 객체로 변환"""
+        return [
+            Document(
+                page_content=doc_dict.get("content", ""),
+                metadata={
+                    "title": doc_dict.get("title", "N/A"),
+                    "author": doc_dict.get("author", "N/A"),
+                    "source": doc_dict.get("source", "N/A"),
+                }
+            )
+            for doc_dict in context_docs
+        ]
+
+    def _build_answer_chain(self, system_prompt: Optional[str] = None):
+        """generate_answer용 체인"""
         if system_prompt is None:
             system_prompt = """당신은 한국 요리 전문가이자 친절한 레시피 어시스턴트입니다.
 
@@ -478,33 +1188,33 @@ class RecipeRAGLangChain:
 
 {context}"""
 
-        # Document 객체로 변환
-        documents = []
-        for doc_dict in context_docs:
-            doc = Document(
-                page_content=doc_dict.get("content", ""),
-                metadata={
-                    "title": doc_dict.get("title", "N/A"),
-                    "author": doc_dict.get("author", "N/A"),
-                    "source": doc_dict.get("source", "N/A"),
-                }
-            )
-            documents.append(doc)
-        
         prompt = ChatPromptTemplate.from_messages([
             ("system", system_prompt),
             ("human", "{input}"),
         ])
 
         # 체인 생성
-        question_answer_chain = create_stuff_documents_chain(self.chat_model, prompt)
+        return create_stuff_documents_chain(self.chat_model, prompt)
+
+    def generate_answer(
+        self,
+        query: str,
+        context_docs: List[Dict],
+        system_prompt: Optional[str] = None
+    ) -> str:
+        """LangChain을 사용한 답변 생성"""
+
+        print(f"  📍 [generate_answer] 시작")
+        t_total_start = _t()
+
+        question_answer_chain = self._build_answer_chain(system_prompt)
 
         # ── 타이밍: LLM 호출 ──
         t_llm_start = _t()
         try:
             result = question_answer_chain.invoke({
                 "input": query,
-                "context": documents
+                "context": self._to_documents(context_docs)
             })
             _log_step("LLM 호출 (generate_answer)", t_llm_start, _t())
             _log_step("generate_answer 합계", t_total_start, _t())
@@ -517,19 +1227,43 @@ class RecipeRAGLangChain:
             traceback.print_exc()
             return f"답변 생성 중 오류가 발생했습니다: {str(e)}"
 
-    def generate_recipe_json(
+    async def agenerate_answer(
         self,
-        user_message: str,
+        query: str,
         context_docs: List[Dict],
+        system_prompt: Optional[str] = None
+    ) -> str:
+        """답변 생성 (async)"""
+
+        print(f"  📍 [agenerate_answer] 시작")
+        t_total_start = _t()
+
+        question_answer_chain = self._build_answer_chain(system_prompt)
+
+        t_llm_start = _t()
+        try:
+            result = await question_answer_chain.ainvoke({
+                "input": query,
+                "context": self._to_documents(context_docs)
+            })
+            _log_step("LLM 호출 (agenerate_answer)", t_llm_start, _t())
+            _log_step("agenerate_answer 합계", t_total_start, _t())
+            print(f"  📍 [agenerate_answer] 완료\n")
+            return result
+        except Exception as e:
+            _log_step("LLM 호출 (FAILED)", t_llm_start, _t())
+            print(f"답변 생성 오류: {e}")
+            import traceback
+            traceback.print_exc()
+            return f"답변 생성 중 오류가 발생했습니다: {str(e)}"
+
+    def _build_recipe_json_chain(
+        self,
         constraints_text: str = "",
         conversation_history: str = "",
         system_prompt: Optional[str] = None,
-    ) -> dict:
-        """JSON 구조화된 레시피 생성"""
-
-        print(f"  📍 [generate_recipe_json] 시작")
-        t_total_start = _t()
-        
+    ):
+        """generate_recipe_json용 체인"""
         if system_prompt is None:
             system_prompt = """당신은 한국 요리 전문가입니다. 
 
@@ -572,19 +1306,6 @@ class RecipeRAGLangChain:
             context="{context}"
         )
 
-        # Document 객체로 변환
-        documents = []
-        for doc_dict in context_docs:
-            doc = Document(
-                page_content=doc_dict.get("content", ""),
-                metadata={
-                    "title": doc_dict.get("title", "N/A"),
-                    "author": doc_dict.get("author", "N/A"),
-                    "source": doc_dict.get("source", "N/A"),
-                }
-            )
-            documents.append(doc)
-
         # 프롬프트 생성
         prompt = ChatPromptTemplate.from_messages([
             ("system", formatted_system_prompt),
@@ -592,26 +1313,10 @@ class RecipeRAGLangChain:
         ])
 
         # 체인 생성
-        question_answer_chain = create_stuff_documents_chain(self.chat_model, prompt)
+        return create_stuff_documents_chain(self.chat_model, prompt)
 
-        # ── 타이밍: LLM 호출 ──
-        t_llm_start = _t()
-        try:
-            result = question_answer_chain.invoke({
-                "input": user_message,
-                "context": documents,
-            })
-            _log_step("LLM 호출 (generate_recipe_json)", t_llm_start, _t())
-
-            response_text = result if isinstance(result, str) else str(result)
-
-        except Exception as e:
-            _log_step("LLM 호출 (FAILED)", t_llm_start, _t())
-            print(f"LLM 호출 오류: {e}")
-            _log_step("generate_recipe_json 합계", t_total_start, _t())
-            return self._get_default_recipe()
-
-        # ── 타이밍: JSON 파싱 ──
+    def _parse_recipe_json(self, response_text: str, t_total_start: float) -> dict:
+        """LLM 응답 → 레시피 JSON (실패 시 기본 레시피)"""
         t_parse_start = _t()
         try:
             clean_result = response_text.strip()
@@ -635,6 +1340,84 @@ class RecipeRAGLangChain:
             _log_step("generate_recipe_json 합계", t_total_start, _t())
             return self._get_default_recipe()
 
+    def generate_recipe_json(
+        self,
+        user_message: str,
+        context_docs: List[Dict],
+        constraints_text: str = "",
+        conversation_history: str = "",
+        system_prompt: Optional[str] = None,
+    ) -> dict:
+        """JSON 구조화된 레시피 생성"""
+
+        print(f"  📍 [generate_recipe_json] 시작")
+        t_total_start = _t()
+
+        question_answer_chain = self._build_recipe_json_chain(
+            constraints_text, conversation_history, system_prompt
+        )
+
+        # ── 타이밍: LLM 호출 ──
+        t_llm_start = _t()
+        try:
+            result = question_answer_chain.invoke({
+                "input": user_message,
+                "context": self._to_documents(context_docs),
+            })
+            _log_step("LLM 호출 (generate_recipe_json)", t_llm_start, _t())
+
+            response_text = result if isinstance(result, str) else str(result)
+
+        except Exception as e:
+            _log_step("LLM 호출 (FAILED)", t_llm_start, _t())
+            print(f"LLM 호출 오류: {e}")
+            _log_step("generate_recipe_json 합계", t_total_start, _t())
+            return self._get_default_recipe()
+
+        return self._parse_recipe_json(response_text, t_total_start)
+
+    async def agenerate_recipe_json(
+        self,
+        user_message: str,
+        context_docs: List[Dict],
+        constraints_text: str = "",
+        conversation_history: str = "",
+        system_prompt: Optional[str] = None,
+    ) -> dict:
+        """JSON 구조화된 레시피 생성 (async)"""
+
+        print(f"  📍 [agenerate_recipe_json] 시작")
+        t_total_start = _t()
+
+        question_answer_chain = self._build_recipe_json_chain(
+            constraints_text, conversation_history, system_prompt
+        )
+
+        t_llm_start = _t()
+        try:
+            result = await question_answer_chain.ainvoke({
+                "input": user_message,
+                "context": self._to_documents(context_docs),
+            })
+            _log_step("LLM 호출 (agenerate_recipe_json)", t_llm_start, _t())
+
+            response_text = result if isinstance(result, str) else str(result)
+
+        except Exception as e:
+            _log_step("LLM 호출 (FAILED)", t_llm_start, _t())
+            print(f"LLM 호출 오류: {e}")
+            _log_step("generate_recipe_json 합계", t_total_start, _t())
+            return self._get_default_recipe()
+
+        return self._parse_recipe_json(response_text, t_total_start)
+
+    async def aclose(self):
+        """종료 시 커넥션 정리"""
+        if self.reranker:
+            await self.reranker.aclose()
+        if self._async_milvus is not None:
+            await self._async_milvus.close()
+
     def _get_default_recipe(self) -> dict:
         """기본 레시피 반환 (오류 시)"""
         return {
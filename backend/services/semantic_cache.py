@@ -0,0 +1,206 @@
+"""
+services/semantic_cache.py
+Chat Agent 답변 시맨틱 캐시
+
+- 재작성된 질문의 임베딩으로 최근 (질문, 제약조건, 답변, 문서) 항목 중 가장 가까운 것을 찾음
+- 코사인 유사도 >= SEMANTIC_CACHE_THRESHOLD 이고 제약조건(알러지/비선호/인원수)이 같을 때만 hit
+- 크기 제한 LRU + TTL, 임베딩 DAG가 새 레시피를 적재하면(/title-index/refresh) 전체 무효화
+- 여러 워커(SESSION_BACKEND="redis")면 무효화 epoch를 Redis 카운터로 공유
+  → 다른 워커는 SEMANTIC_CACHE_EPOCH_CHECK초 이내에 변경을 감지하고 자기 캐시를 비움
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from operator import mul
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.config import settings
+
+
+def constraints_key(user_constraints: Optional[Dict]) -> Tuple:
+    """알러지/비선호 집합 + 인원수 → 캐시 구분 키 (순서/대소문자 무시)"""
+    user_constraints = user_constraints or {}
+
+    def _norm(items: Iterable[str]) -> frozenset:
+        return frozenset(str(item).strip().lower() for item in items or [] if str(item).strip())
+
+    servings = len(user_constraints.get("names") or []) or 1
+    return (
+        _norm(user_constraints.get("allergies")),
+        _norm(user_constraints.get("dislikes")),
+        servings,
+    )
+
+
+class SharedEpoch:
+    """워커 간 공유 무효화 카운터 (Redis INCR/GET, 조회는 check_interval초마다 1번)"""
+
+    def __init__(self, client, key: str = "semantic_cache:epoch", check_interval: float = 5.0):
+        self.client = client
+        self.key = key
+        self.check_interval = check_interval
+        self._value: Optional[int] = None
+        self._checked_at = 0.0
+
+    def current(self) -> Optional[int]:
+        now = time.time()
+        if now - self._checked_at < self.check_interval:
+            return self._value
+        self._checked_at = now
+        try:
+            self._value = int(self.client.get(self.key) or 0)
+        except Exception as e:
+            print(f"[WARNING] 시맨틱 캐시 공유 epoch 조회 실패: {e}")
+        return self._value
+
+    def bump(self) -> Optional[int]:
+        try:
+            self._value = int(self.client.incr(self.key))
+            self._checked_at = time.time()
+        except Exception as e:
+            print(f"[WARNING] 시맨틱 캐시 공유 epoch 갱신 실패: {e}")
+        return self._value
+
+
+def _normalize(vector: List[float]) -> Tuple[float, ...]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return tuple(v / norm for v in vector)
+
+
+def _dot(a: Tuple[float, ...], b: Tuple[float, ...]) -> float:
+    return sum(map(mul, a, b))
+
+
+class SemanticCache:
+    """임베딩 최근접 답변 캐시 (스레드 안전)"""
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        ttl: Optional[float] = 21600,
+        threshold: float = 0.95,
+        shared_epoch: Optional[SharedEpoch] = None,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.epoch = 0  # clear()마다 증가 → 무효화 이전에 시작한 요청의 결과는 저장하지 않음
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.shared_epoch = shared_epoch
+        self._remote_epoch: Optional[int] = None
+
+    def _sync_shared(self) -> None:
+        """다른 워커가 무효화했으면 로컬 캐시도 비움"""
+        if self.shared_epoch is None:
+            return
+        remote = self.shared_epoch.current()
+        if remote is None or remote == self._remote_epoch:
+            return
+        with self._lock:
+            if self._remote_epoch is not None:
+                self._entries.clear()
+                self.epoch += 1
+                self.invalidations += 1
+            self._remote_epoch = remote
+
+    def lookup(self, embedding: List[float], constraints: Tuple) -> Optional[Dict[str, Any]]:
+        """가장 가까운 항목 (threshold 미만 / 제약조건 불일치면 None)"""
+        self._sync_shared()
+        query = _normalize(embedding)
+        now = time.time()
+        with self._lock:
+            best_id, best_score = None, -1.0
+            for entry_id, entry in list(self._entries.items()):
+                if self.ttl and entry["created_at"] + self.ttl < now:
+                    del self._entries[entry_id]
+                    continue
+                if entry["constraints"] != constraints:
+                    continue
+                score = _dot(query, entry["embedding"])
+                if score > best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None or best_score < self.threshold:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(best_id)
+            self.hits += 1
+            entry = self._entries[best_id]
+            return {**entry, "score": best_score}
+
+    def store(
+        self,
+        embedding: List[float],
+        constraints: Tuple,
+        question: str,
+        answer: str,
+        documents: List[Any],
+        epoch: Optional[int] = None,
+    ) -> bool:
+        """항목 저장 (epoch가 바뀌었으면 = 도중에 무효화됐으면 버림)"""
+        self._sync_shared()
+        with self._lock:
+            if epoch is not None and epoch != self.epoch:
+                return False
+            self._next_id += 1
+            self._entries[self._next_id] = {
+                "embedding": _normalize(embedding),
+                "constraints": constraints,
+                "question": question,
+                "answer": answer,
+                "documents": list(documents),
+                "created_at": time.time(),
+            }
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> int:
+        """전체 무효화 (공유 epoch가 있으면 다른 워커에도 전파) → 삭제된 항목 수"""
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self.epoch += 1
+            self.invalidations += 1
+        if self.shared_epoch is not None:
+            remote = self.shared_epoch.bump()
+            with self._lock:
+                self._remote_epoch = remote
+        return count
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": "semantic_answer",
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+            "invalidations": self.invalidations,
+        }
+
+
+def _create_shared_epoch() -> Optional[SharedEpoch]:
+    """세션 저장소가 Redis면 같은 클라이언트로 epoch 공유 (단일 워커/메모리 백엔드면 None)"""
+    from core.session_store import RedisSessionStore, session_store
+    if isinstance(session_store, RedisSessionStore):
+        return SharedEpoch(session_store.client, check_interval=settings.SEMANTIC_CACHE_EPOCH_CHECK)
+    return None
+
+
+# 프로세스 단위 싱글톤
+semantic_cache = SemanticCache(
+    maxsize=settings.SEMANTIC_CACHE_SIZE,
+    ttl=settings.SEMANTIC_CACHE_TTL,
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    shared_epoch=_create_shared_epoch(),
+)
@@ -0,0 +1,61 @@
+"""
+services/sparse.py
+제목 sparse 벡터 인코더 (hybrid 검색용)
+
+- 공백/특수문자를 제거한 뒤 글자 bigram으로 토큰화 → "돼지 불고기" == "돼지불고기"
+- 문서 쪽은 BM25 TF 포화 가중치, 쿼리 쪽은 토큰당 1.0 (IP metric)
+- airflow/dags/lib/sparse_encoder.py 와 반드시 같은 로직을 유지해야 함 (인덱스 해시 포함)
+"""
+
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List
+
+SPARSE_FIELD = "title_sparse"
+INGREDIENTS_FIELD = "ingredients"
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+AVG_TITLE_TOKENS = 10.0
+
+_NON_WORD = re.compile(r"[^0-9a-z가-힣]")
+
+
+def normalize_title(text: str) -> str:
+    """소문자화 + 공백/특수문자 제거"""
+    return _NON_WORD.sub("", (text or "").lower())
+
+
+def _tokenize(text: str) -> List[str]:
+    norm = normalize_title(text)
+    if len(norm) <= 1:
+        return [norm] if norm else []
+    return [norm[i:i + 2] for i in range(len(norm) - 1)]
+
+
+def _index(token: str) -> int:
+    return zlib.crc32(token.encode("utf-8")) & 0x7FFFFFFF
+
+
+def encode_document(title: str) -> Dict[int, float]:
+    """제목 → sparse 벡터 (BM25 TF 가중치)"""
+    tokens = _tokenize(title)
+    if not tokens:
+        return {}
+
+    length_norm = 1 - BM25_B + BM25_B * len(tokens) / AVG_TITLE_TOKENS
+    return {
+        _index(token): tf * (BM25_K1 + 1) / (tf + BM25_K1 * length_norm)
+        for token, tf in Counter(tokens).items()
+    }
+
+
+def encode_query(query: str) -> Dict[int, float]:
+    """검색어 → sparse 벡터"""
+    return {_index(token): 1.0 for token in set(_tokenize(query))}
+
+
+def normalize_ingredient(name: str) -> str:
+    """재료명 정규화 (ingredients ARRAY 필드 값과 같은 규칙)"""
+    return normalize_title(name)
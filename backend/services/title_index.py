@@ -0,0 +1,160 @@
+"""
+services/title_index.py
+레시피 제목 인메모리 인덱스 (Milvus title like 스캔 대체)
+
+- 정규화: services.sparse.normalize_title (소문자 + 공백/특수문자 제거)
+- 접두어: trie (자동완성)
+- 부분문자열: 글자 bigram posting list 교집합 후 검증
+- build()는 새 구조를 만든 뒤 한 번에 교체하므로 조회 중 재빌드해도 안전
+"""
+
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from services.sparse import normalize_title
+
+_END = "\0"
+
+
+class _Snapshot:
+    """빌드 결과 (불변)"""
+
+    def __init__(self):
+        self.entries: List[Tuple[str, str, str]] = []  # (title, recipe_id, normalized)
+        self.trie: Dict = {}
+        self.postings: Dict[str, Set[int]] = {}
+
+
+class TitleIndex:
+    """제목 → recipe_id 인덱스"""
+
+    def __init__(self):
+        self._snapshot = _Snapshot()
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._snapshot.entries)
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def build(self, items: Iterable[Tuple[str, str]]) -> int:
+        """(title, recipe_id) 목록으로 인덱스 재생성"""
+        snap = _Snapshot()
+        seen = set()
+
+        for title, recipe_id in items:
+            norm = normalize_title(title)
+            if not norm or (norm, recipe_id) in seen:
+                continue
+            seen.add((norm, recipe_id))
+
+            idx = len(snap.entries)
+            snap.entries.append((title, str(recipe_id), norm))
+
+            node = snap.trie
+            for ch in norm:
+                node = node.setdefault(ch, {})
+            node.setdefault(_END, []).append(idx)
+
+            for i in range(len(norm) - 1):
+                snap.postings.setdefault(norm[i:i + 2], set()).add(idx)
+
+        with self._lock:
+            self._snapshot = snap
+            self.built_at = time.time()
+        return len(snap.entries)
+
+    def build_from_mongo(self, recipes_collection) -> int:
+        """Mongo recipes 컬렉션 중 임베딩 완료된 레시피로 빌드"""
+        cursor = recipes_collection.find(
+            {"embedded": True},
+            {"title": 1, "recipe_id": 1, "_id": 0},
+        )
+        count = self.build(
+            (doc.get("title", ""), doc.get("recipe_id", ""))
+            for doc in cursor
+        )
+        print(f"[OK] 제목 인덱스 빌드 완료: {count}개")
+        return count
+
+    def search(self, query: str, k: int = 10) -> List[Tuple[str, str]]:
+        """제목에 query(정규화)가 포함된 레시피 [(title, recipe_id)] (짧은 제목 우선)"""
+        snap = self._snapshot
+        q = normalize_title(query)
+        if len(q) < 2:
+            return []
+
+        candidates: Optional[Set[int]] = None
+        grams = sorted(
+            {q[i:i + 2] for i in range(len(q) - 1)},
+            key=lambda g: len(snap.postings.get(g, ())),
+        )
+        for gram in grams:
+            posting = snap.postings.get(gram)
+            if not posting:
+                return []
+            candidates = set(posting) if candidates is None else candidates & posting
+            if not candidates:
+                return []
+
+        matched = [snap.entries[i] for i in candidates if q in snap.entries[i][2]]
+        matched.sort(key=lambda e: (e[2] != q, len(e[2])))
+        return [(title, recipe_id) for title, recipe_id, _ in matched[:k]]
+
+    def matches_title(self, query: str, min_prefix: int = 3) -> bool:
+        """query(정규화)가 제목 전체와 같거나, min_prefix글자 이상으로 제목의 접두어인지"""
+        q = normalize_title(query)
+        if not q:
+            return False
+        node = self._snapshot.trie
+        for ch in q:
+            node = node.get(ch)
+            if node is None:
+                return False
+        return _END in node or len(q) >= min_prefix
+
+    def autocomplete(self, prefix: str, k: int = 10) -> List[Dict[str, str]]:
+        """자동완성: 접두어 일치 우선, 부족하면 부분문자열 일치로 채움"""
+        snap = self._snapshot
+        p = normalize_title(prefix)
+        if not p:
+            return []
+
+        node = snap.trie
+        for ch in p:
+            node = node.get(ch)
+            if node is None:
+                break
+
+        results: List[int] = []
+        if node is not None:
+            # BFS → 짧은 제목부터
+            queue = [node]
+            while queue and len(results) < k:
+                current = queue.pop(0)
+                results.extend(current.get(_END, []))
+                queue.extend(child for ch, child in current.items() if ch != _END)
+
+        items = [
+            {"title": snap.entries[i][0], "recipe_id": snap.entries[i][1]}
+            for i in results[:k]
+        ]
+
+        if len(items) < k:
+            seen = {item["recipe_id"] for item in items}
+            for title, recipe_id in self.search(prefix, k * 2):
+                if recipe_id not in seen:
+                    items.append({"title": title, "recipe_id": recipe_id})
+                    seen.add(recipe_id)
+                if len(items) >= k:
+                    break
+
+        return items
+
+
+# 프로세스 단위 싱글톤
+title_index = TitleIndex()
@@ -2,10 +2,16 @@
 """
 의도 감지 유틸
 """
-from typing import List
-from langchain_naver import ChatClovaX
+import re
+import threading
+from typing import Dict, List, Optional
+
 from langchain_core.messages import HumanMessage
 
+from app.config import settings
+from services.llm import get_llm
+from services.title_index import title_index
+
 
 class Intent:
     # 조리 모드 의도
@@ -24,6 +30,122 @@ class Intent:
     UNKNOWN = "unknown"
 
 
+# ─────────────────────────────────────────────
+# 룰 기반 fast path (확실한 경우만 판정, 애매하면 None → LLM)
+# ─────────────────────────────────────────────
+# 레시피가 있을 때 수정 요청으로 확실한 명령형 표현 (extract_allergy_dislike의 수정 키워드와 동일 계열)
+# "없이/대신/더 ~게"는 "물 없이 만드는 케이크", "더덕구이 맵게" 같은 새 검색과 섞여 LLM에 맡김 (공백 제거 후 매칭)
+_MODIFY_PATTERN = re.compile(r"[빼뺴](?:줘|주세요|고)|말고|바꿔(?:줘|주세요)|제외해(?:줘|주세요)")
+# 요리 지식 질문 (요리명이 있어도 RECIPE_SEARCH로 단정하지 않음)
+_QUESTION_PATTERN = re.compile(r"보관|칼로리|영양|유통기한|차이|왜|어떻게|언제|얼마나|몇\s*분|손질|해동|상했|괜찮")
+# 요리/음식 맥락 단서
+_COOKING_PATTERN = re.compile(r"레시피|요리|음식|먹|맛|만들|조리|굽|끓|볶|튀기|재료|간식|메뉴|반찬|식사|안주|야식|도시락")
+# 요리 무관 주제
+_OFF_TOPIC_PATTERN = re.compile(r"영화|날씨|여행|운동|음악|게임|드라마|뉴스|정치|경제|주식|코인|연예인|축구|야구|숙제|코딩")
+# 개인정보 (전화번호 / 이메일)
+_PII_PATTERN = re.compile(r"01[016789][-\s.]?\d{3,4}[-\s.]?\d{4}|[\w.+-]+@[\w-]+\.[\w.]+")
+# 알러지/비선호 진술 단서 (없으면 LLM 호출 없이 NONE)
+_ALLERGY_PATTERN = re.compile(
+    r"알러지|알레르기|알러르기|싫|안\s*먹|못\s*먹|배\s*아|두드러기|가려|거부감|체질|안\s*맞"
+    r"|별로|안\s*좋아|좋아하지\s*않|질색|꺼려|입에\s*안|비선호"
+)
+# Kiwi가 없을 때 어절 끝 조사 제거
+_JOSA_SUFFIX = re.compile(r"(?:으로|에서|하고|이랑|랑|을|를|이|가|은|는|도|만|로|와|과|의)$")
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Dict[str, int]] = {
+    "chat_intent": {"fast": 0, "llm": 0},
+    "allergy_detect": {"fast": 0, "llm": 0},
+}
+
+
+def _count(classifier: str, field: str) -> None:
+    with _stats_lock:
+        bucket = _stats[classifier]
+        bucket[field] = bucket.get(field, 0) + 1
+
+
+def get_intent_stats() -> List[Dict]:
+    """분류기별 fast path 적중 / LLM 호출 횟수 (/metrics 노출용)"""
+    with _stats_lock:
+        snapshot = {name: dict(bucket) for name, bucket in _stats.items()}
+    rows = []
+    for name, bucket in snapshot.items():
+        total = bucket["fast"] + bucket["llm"]
+        rows.append({
+            "name": name,
+            **bucket,
+            "hit_rate": round(bucket["fast"] / total, 4) if total else 0.0,
+        })
+    return rows
+
+
+def _has_recipe(chat_history: Optional[list]) -> bool:
+    """최근 assistant 메시지 중 레시피("재료" + ⏱️/📊)가 있는지"""
+    if not chat_history:
+        return False
+    for msg in reversed(chat_history):
+        if isinstance(msg, dict) and msg.get("role") == "assistant":
+            content = msg.get("content", "")
+            if "재료" in content and ("⏱️" in content or "📊" in content):
+                return True
+    return False
+
+
+def _noun_candidates(text: str) -> List[str]:
+    """
+    제목 인덱스 조회용 명사 후보
+    Kiwi 명사(NNG/NNP) + 연속 명사 결합("김치"+"찌개" → "김치찌개"), Kiwi가 없으면 조사 뗀 어절
+    """
+    try:
+        from features.voice.text_analyzer import get_kiwi
+        tokens = get_kiwi().tokenize(text)
+    except Exception:
+        words = [_JOSA_SUFFIX.sub("", w) for w in re.findall(r"[가-힣A-Za-z]+", text)]
+        return [w for w in words if len(w) >= 2]
+
+    candidates: List[str] = []
+    run: List[str] = []
+    for token in tokens + [None]:
+        if token is not None and token.tag in ("NNG", "NNP"):
+            run.append(token.form)
+            continue
+        if len(run) > 1:
+            candidates.append("".join(run))
+        candidates.extend(run)
+        run = []
+    return [c for c in dict.fromkeys(candidates) if len(c) >= 2]
+
+
+def _mentions_dish(text: str) -> bool:
+    """
+    명사 중 레시피 제목과 (거의) 같은 것이 있는지 (제목 인덱스 미빌드 시 False)
+    제목 전체 일치 또는 3글자 이상 접두어 일치만 인정 - 부분 문자열로 보면 "주말"/"아이"/"저녁" 같은 일반 명사도 걸림
+    """
+    if not title_index.ready:
+        return False
+    return any(title_index.matches_title(noun) for noun in _noun_candidates(text))
+
+
+def fast_chat_intent(text: str, has_recipe: bool) -> Optional[str]:
+    """확실한 경우만 의도 반환, 애매하면 None"""
+    if _PII_PATTERN.search(text):
+        return Intent.NOT_COOKING
+
+    compact = text.replace(" ", "")
+    if has_recipe and _MODIFY_PATTERN.search(compact):
+        return Intent.RECIPE_MODIFY
+
+    has_dish = _mentions_dish(text)
+    if _OFF_TOPIC_PATTERN.search(compact) and not has_dish and not _COOKING_PATTERN.search(compact):
+        return Intent.NOT_COOKING
+
+    if has_dish and not has_recipe and not _QUESTION_PATTERN.search(compact) and not _MODIFY_PATTERN.search(compact):
+        return Intent.RECIPE_SEARCH
+
+    return None
+
+
 def detect_intent(text: str) -> str:
     """조리 모드 의도 감지 (LLM 기반)"""
 
@@ -43,7 +165,7 @@ def detect_intent(text: str) -> str:
 출력:"""
 
     try:
-        llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=20)
+        llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=20, cache=True)
         result = llm.invoke([HumanMessage(content=prompt)])
         decision = result.content.strip().upper()
 
@@ -103,14 +225,7 @@ def extract_allergy_dislike(text: str, chat_history: list = None) -> dict:
     """
 
     # 대화에 레시피가 있으면 "빼고"는 RECIPE_MODIFY 의도이므로 None 반환
-    has_recipe = False
-    if chat_history:
-        for msg in reversed(chat_history):
-            if isinstance(msg, dict) and msg.get("role") == "assistant":
-                content = msg.get("content", "")
-                if "재료" in content and ("⏱️" in content or "📊" in content):
-                    has_recipe = True
-                    break
+    has_recipe = _has_recipe(chat_history)
 
     # 레시피가 있고 "빼고/제외" 같은 수정 키워드가 있으면 → RECIPE_MODIFY 의도
     modify_keywords = ["빼고", "뺴고", "빼줘", "뺴줘", "제외", "말고", "대신"]
@@ -128,6 +243,12 @@ def extract_allergy_dislike(text: str, chat_history: list = None) -> dict:
         print(f"[AllergyDetect] 레시피 존재 + 수정 키워드 감지 → RECIPE_MODIFY 의도로 판단, 알러지 감지 스킵")
         return {"type": None, "items": [], "original_text": text}
 
+    # 알러지/비선호 진술 단서가 없으면 LLM 호출 없이 NONE
+    if settings.INTENT_FAST_PATH and not _ALLERGY_PATTERN.search(text):
+        _count("allergy_detect", "fast")
+        return {"type": None, "items": [], "original_text": text}
+    _count("allergy_detect", "llm")
+
     prompt = f"""사용자가 **직접적으로** 알러지나 비선호 음식을 언급했는지 분석:
 
 입력: "{text}"
@@ -153,7 +274,7 @@ def extract_allergy_dislike(text: str, chat_history: list = None) -> dict:
 재료: 재료1, 재료2 (없으면 "없음")"""
 
     try:
-        llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=50)
+        llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=50, cache=True)
         result = llm.invoke([HumanMessage(content=prompt)])
         response = result.content.strip()
 
@@ -310,7 +431,7 @@ def extract_ingredients_from_modification(text: str, mod_type: str = "remove") -
 출력:"""
 
         try:
-            llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=50)
+            llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=50, cache=True)
             result = llm.invoke([HumanMessage(content=prompt)])
             response = result.content.strip()
 
@@ -372,7 +493,7 @@ def extract_ingredients_from_modification(text: str, mod_type: str = "remove") -
 재료:"""
 
         try:
-            llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=50)
+            llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=50, cache=True)
             result = llm.invoke([HumanMessage(content=prompt)])
             response = result.content.strip()
 
@@ -436,19 +557,24 @@ def extract_ingredients_from_modification(text: str, mod_type: str = "remove") -
 
 
 def detect_chat_intent(text: str, chat_history: list = None) -> str:
-    """LLM 기반 채팅 의도 감지 - 레시피 검색/수정/일반질문/무관 구분"""
+    """채팅 의도 감지 - 룰 기반 fast path → 애매하면 LLM (레시피 검색/수정/일반질문/무관 구분)"""
 
     # 대화 히스토리에서 최근 레시피 확인 (assistant 메시지 중 레시피 찾을 때까지)
-    has_recipe = False
-    if chat_history:
-        # 최근 메시지부터 역순으로 검색, 레시피 찾을 때까지 계속
-        for msg in reversed(chat_history):
-            if isinstance(msg, dict) and msg.get("role") == "assistant":
-                content = msg.get("content", "")
-                # "재료:" 또는 "**재료:**"가 있으면 레시피로 판단
-                if "재료" in content and ("⏱️" in content or "📊" in content):
-                    has_recipe = True
-                    break  # 레시피 발견하면 중단
+    has_recipe = _has_recipe(chat_history)
+
+    # 룰 기반 fast path (확실한 경우만, 나머지는 LLM)
+    if settings.INTENT_FAST_PATH:
+        try:
+            fast = fast_chat_intent(text, has_recipe)
+        except Exception as e:
+            print(f"[Intent] fast path 실패 (LLM 사용): {e}")
+            fast = None
+        if fast:
+            _count("chat_intent", "fast")
+            _count("chat_intent", f"fast_{fast}")
+            print(f"[Intent] Fast path → {fast} (입력: {text})")
+            return fast
+    _count("chat_intent", "llm")
 
     # LLM 프롬프트 (간결하고 명확하게)
     prompt = f"""의도 분류:
@@ -480,7 +606,7 @@ def detect_chat_intent(text: str, chat_history: list = None) -> str:
 출력:"""
 
     try:
-        llm = ChatClovaX(model="HCX-003", temperature=0.2, max_tokens=20)
+        llm = get_llm(model="HCX-003", temperature=0.2, max_tokens=20, cache=True)
         result = llm.invoke([HumanMessage(content=prompt)])
         decision = result.content.strip().upper().replace(" ", "")
 
@@ -26,10 +26,24 @@ export const useChatAgent = (sessionId) => {
       const data = JSON.parse(event.data);
       console.log("[ChatAgent] Received:", data);
 
-      if (data.type === "agent_message") {
-        // Agent 응답 메시지
+      if (data.type === "agent_delta") {
+        // 토큰 스트리밍: 스트리밍 중인 마지막 메시지에 이어 붙이기
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          if (last && last.streaming) {
+            return [...prev.slice(0, -1), { ...last, content: last.content + data.content }];
+          }
+          return [
+            ...prev,
+            { role: "assistant", content: data.content, timestamp: new Date().toISOString(), streaming: true },
+          ];
+        });
+        setIsThinking(false);
+        setCurrentProgress("");
+      } else if (data.type === "agent_message") {
+        // Agent 응답 메시지 (스트리밍 메시지를 최종 답변으로 교체)
         setMessages((prev) => [
-          ...prev,
+          ...prev.filter((msg) => !msg.streaming),
           {
             role: "assistant",
             content: data.content,
@@ -79,6 +93,8 @@ export const useChatAgent = (sessionId) => {
         setCurrentProgress(data.message);
       } else if (data.type === "error") {
         console.error("Chat Agent Error:", data.message);
+        // 스트리밍 중이던 미완성 답변은 제거
+        setMessages((prev) => prev.filter((msg) => !msg.streaming));
         alert(data.message);
         setIsThinking(false);
       }
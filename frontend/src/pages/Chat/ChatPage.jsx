@@ -488,9 +488,31 @@ export default function ChatPage() {
         return;
       }
 
+      if (data.type === "agent_delta") {
+        // 토큰 스트리밍: 스트리밍 중인 마지막 메시지에 이어 붙이기
+        setMessages((prev) => {
+          const last = prev[prev.length - 1];
+          if (last && last.streaming) {
+            return [...prev.slice(0, -1), { ...last, content: last.content + data.content }];
+          }
+          return [
+            ...prev,
+            {
+              role: "assistant",
+              content: data.content,
+              timestamp: new Date().toISOString(),
+              streaming: true,
+            },
+          ];
+        });
+        setIsThinking(false);
+        return;
+      }
+
       if (data.type === "agent_message") {
+        // 최종 답변(후처리 완료)으로 스트리밍 메시지 교체
         setMessages((prev) => [
-          ...prev,
+          ...prev.filter((msg) => !msg.streaming),
           {
             role: "assistant",
             content: data.content,
@@ -598,6 +620,8 @@ export default function ChatPage() {
         console.log("[Progress]", data.message);
       } else if (data.type === "error") {
         console.error("Error:", data.message);
+        // 스트리밍 중이던 미완성 답변은 제거
+        setMessages((prev) => prev.filter((msg) => !msg.streaming));
         alert(data.message);
         setIsThinking(false);
       }